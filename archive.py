@@ -0,0 +1,170 @@
+"""Move completed saudas out of the hot collections.
+
+    python archive.py --older-than-days 90 [--db sauda-demo]
+
+Completed deals whose `end_at` (or `updated_at` when unset) is older than the
+cutoff move, with their lots and shipments, into `deal_archive`,
+`lot_archive` and `shipment_archive`. Ledger entries stay where they are.
+Every step upserts before deleting, so an interrupted run is safe to repeat.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+
+from pymongo import ReplaceOne
+from pymongo.asynchronous.mongo_client import AsyncMongoClient
+
+from models import SaudaStatus
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+HOT_COLLECTIONS = ("deal", "lot", "shipment")
+
+
+def archive_name(collection: str) -> str:
+    return f"{collection}_archive"
+
+
+async def find_one_with_archive(hot_collection, query: dict, projection: dict):
+    """`find_one` on a hot collection, falling back to its archive.
+
+    Returns (document, archived) so routes can flag archived results.
+    """
+    document = await hot_collection.find_one(query, projection=projection)
+    if document is not None:
+        return document, False
+    archive = hot_collection.database.get_collection(archive_name(hot_collection.name))
+    return await archive.find_one(query, projection=projection), True
+
+
+async def find_many_with_archive(hot_collection, public_ids: list, projection: dict) -> dict:
+    """Documents for `public_ids` keyed by public_id, each flagged `archived`.
+
+    One `$in` query on the hot collection, then one on the archive for the ids
+    it did not have. `projection` must keep `public_id`.
+    """
+    found = {}
+    async for document in hot_collection.find(
+        {"public_id": {"$in": public_ids}}, projection=projection
+    ):
+        found[document["public_id"]] = document | {"archived": False}
+    missing = [public_id for public_id in public_ids if public_id not in found]
+    if missing:
+        archive = hot_collection.database.get_collection(archive_name(hot_collection.name))
+        async for document in archive.find(
+            {"public_id": {"$in": missing}}, projection=projection
+        ):
+            found[document["public_id"]] = document | {"archived": True}
+    return found
+
+
+async def deal_archived(deal_collection, public_deal_id: str) -> bool:
+    """Whether a deal's lots and shipments are read from the archive.
+
+    Decided from the deal, not from an empty hot read: a deal with no lots yet
+    is still hot, and unknown ids read (empty) from the hot side.
+    """
+    if await deal_collection.find_one({"public_id": public_deal_id}, projection={"_id": True}):
+        return False
+    archive = deal_collection.database.get_collection(archive_name(deal_collection.name))
+    return await archive.find_one({"public_id": public_deal_id}, projection={"_id": True}) is not None
+
+
+def flag_archived(documents: list, archived: bool) -> list:
+    for document in documents:
+        document["archived"] = archived
+    return documents
+
+
+async def working_set(db) -> dict:
+    """Data and index bytes of the hot collections."""
+    sizes = {}
+    for name in HOT_COLLECTIONS:
+        try:
+            cursor = await db.get_collection(name).aggregate([{"$collStats": {"storageStats": {}}}])
+            stats = (await cursor.to_list())[0]["storageStats"]
+        except Exception:  # Collection does not exist yet.
+            stats = {}
+        sizes[name] = {
+            "count": stats.get("count", 0),
+            "data_bytes": stats.get("size", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+        }
+    sizes["total_bytes"] = sum(s["data_bytes"] + s["index_bytes"] for s in sizes.values())
+    return sizes
+
+
+async def _move(db, collection: str, query: dict, batch_size: int) -> int:
+    source = db.get_collection(collection)
+    target = db.get_collection(archive_name(collection))
+    moved = 0
+    while True:
+        documents = await source.find(query, limit=batch_size).to_list()
+        if not documents:
+            return moved
+        await target.bulk_write(
+            [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in documents], ordered=False
+        )
+        result = await source.delete_many({"_id": {"$in": [d["_id"] for d in documents]}})
+        moved += result.deleted_count
+
+
+async def archive_completed_deals(
+    db, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> dict:
+    for name in HOT_COLLECTIONS:
+        await db.get_collection(archive_name(name)).create_index("public_id")
+    await db.get_collection(archive_name("lot")).create_index("sauda_id")
+    await db.get_collection(archive_name("shipment")).create_index("sauda_id")
+
+    before = await working_set(db)
+    cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=older_than_days)
+    query = {
+        "status": SaudaStatus.COMPLETED.value,
+        "$or": [
+            {"end_at": {"$lt": cutoff}},
+            {"end_at": None, "updated_at": {"$lt": cutoff}},
+        ],
+    }
+    moved = {"deal": 0, "lot": 0, "shipment": 0}
+    while True:
+        deals = await db.deal.find(
+            query, projection={"public_id": True}, limit=batch_size
+        ).to_list()
+        if not deals:
+            break
+        for deal in deals:
+            # Children first: a half-archived deal is still readable from the hot side.
+            moved["shipment"] += await _move(db, "shipment", {"sauda_id": deal["public_id"]}, batch_size)
+            moved["lot"] += await _move(db, "lot", {"sauda_id": deal["public_id"]}, batch_size)
+            moved["deal"] += await _move(db, "deal", {"_id": deal["_id"]}, batch_size)
+
+    return {
+        "cutoff": str(cutoff),
+        "moved": moved,
+        "working_set_before": before,
+        "working_set_after": await working_set(db),
+    }
+
+
+async def main(args: argparse.Namespace):
+    client = AsyncMongoClient(args.mongo_url)
+    try:
+        report = await archive_completed_deals(
+            client.get_database(args.db), args.older_than_days, args.batch_size
+        )
+    finally:
+        await client.close()
+    print(f"Moved {report['moved']} (cutoff {report['cutoff']})")
+    for label in ("working_set_before", "working_set_after"):
+        print(f"{label}: {report[label]['total_bytes']:,} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default=os.getenv("MONGO_DB", "sauda-demo"))
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    asyncio.run(main(parser.parse_args()))
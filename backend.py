@@ -1,8 +1,10 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
 from fastapi.requests import Request
 import os
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pymongo.asynchronous.mongo_client import AsyncMongoClient
+from pymongo.errors import PyMongoError
 from models import (
     SaudaModel,
     SaudaStatus,
@@ -11,19 +13,71 @@ from models import (
     BrokerModel,
     ShipmentModel,
     BrokerLedgerEntry,
+    bulk_documents,
 )
 from starlette.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_410_GONE,
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE,
     HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_501_NOT_IMPLEMENTED,
 )
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, Literal
 import datetime
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import tempfile
+from bson import ObjectId
+from fanout import create_fanouts
+from coalesce import create_lot_writer, lot_set_update
+from events import EventBus, event_stream
+from shipment_store import SHIPMENT_PROJECTION, ShipmentLimitError, create_shipment_store
+from jobs import (
+    create_archive_job,
+    create_delete_deal_job,
+    resume_jobs,
+    run_archive_job,
+    run_delete_deal_job,
+    spawn,
+)
+from archive import (
+    ARCHIVE_AFTER_DAYS,
+    archive_name,
+    deal_archived,
+    find_many_with_archive,
+    find_one_with_archive,
+    flag_archived,
+)
+from indexes import ensure_indexes
+from idempotency import idempotent
+from export import EXPORT_COLLECTIONS, ExportUnavailable, export_parquet
+from reports import ReportUnavailable, write_status_workbook
+from search import (
+    MAX_SEARCH_LIMIT,
+    SEARCH_LIMIT,
+    SEARCHERS,
+    _prefix,
+    search,
+    search_keys,
+    with_search_keys,
+)
+from fieldsets import sparse_projection
+from progress import analytics_stages, deal_progress, lot_analytics
+from ricepass import SheetError, UnsupportedSheet, delivery_fields, import_rice_pass
+from sync import changes_since, expired, record_deletes
+
+try:
+    from mcp_server import mount_mcp
+except ImportError:  # The MCP tools need the `mcp` package.
+    mount_mcp = None
 
 
 # Input Models
@@ -103,6 +157,7 @@ class LotUpdate(BaseModel):
         default=None, ge=0, description="Other miscellaneous costs"
     )
     brokerage: Optional[float] = Field(default=None, ge=0, description="Brokerage fees")
+    nett_amount: Optional[float] = Field(default=None, ge=0, description="Nett amount")
 
 
 class BatchLotUpdate(BaseModel):
@@ -132,6 +187,16 @@ class StatusUpdate(BaseModel):
     status: str
 
 
+MAX_BATCH_READ = int(os.getenv("MAX_BATCH_READ", 100))
+
+
+class BatchReadInput(BaseModel):
+    public_ids: List[str] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_READ, description="Public ids to read"
+    )
+    fields: Optional[str] = Field(default=None, description="Comma separated fields")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
@@ -142,12 +207,26 @@ async def lifespan(app: FastAPI):
             maxPoolSize=150,
             minPoolSize=8,
         )
-        sauda_database = mongodb_client.get_database("sauda-demo")
+        sauda_database = mongodb_client.get_database(
+            os.getenv("MONGO_DB", "sauda-demo")
+        )
         app.state.deal_collection = sauda_database.get_collection("deal")
         app.state.lot_collection = sauda_database.get_collection("lot")
         app.state.shipment_collection = sauda_database.get_collection("shipment")
         app.state.broker_collection = sauda_database.get_collection("broker")
         app.state.ledger_collection = sauda_database.get_collection("ledger") 
+        app.state.fanout = create_fanouts()
+        app.state.shipment_store = create_shipment_store(
+            app.state.shipment_collection, app.state.lot_collection
+        )
+        app.state.job_collection = sauda_database.get_collection("job")
+        app.state.idempotency_collection = sauda_database.get_collection("idempotency")
+        app.state.tombstone_collection = sauda_database.get_collection("tombstone")
+        app.state.lot_writer = create_lot_writer(app.state.lot_collection)
+        app.state.events = EventBus()
+        await ensure_indexes(sauda_database)
+        app.state.background_tasks = set()
+        await resume_jobs(app)
         print("Connected to MongoDB!")
         yield
     finally:
@@ -163,44 +242,63 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if mount_mcp is not None:
+    mount_mcp(app)
 
 
 # Read Routes - Done
+# Default projections of the read routes; `fields=` narrows them further.
+DEAL_PROJECTION = {
+    "_id": False,
+    "end_at": False,
+    "created_at": False,
+    "updated_at": False,
+    "delete_job_id": False,
+    "search": False,
+}
+LOT_PROJECTION = {
+    "_id": False,
+    "created_at": False,
+    "updated_at": False,
+    "shipments": False,
+    "search": False,
+}
+LEDGER_PROJECTION = {"_id": False, "updated_at": False}
+
+
 @app.get("/deals/read/all")
-async def get_all_deals(req: Request) -> JSONResponse:
+async def get_all_deals(req: Request, fields: Optional[str] = None) -> JSONResponse:
     deals = await req.app.state.deal_collection.find(
-        {},
-        projection={
-            "_id": False,
-            "end_at": False,
-            "created_at": False,
-            "updated_at": False,
-        },
+        {"status": {"$ne": SaudaStatus.DELETING.value}},
+        projection=sparse_projection(SaudaModel, fields, DEAL_PROJECTION, always=("public_id",)),
     ).to_list()
     for deal in deals:
-        deal["purchase_date"] = str(deal["purchase_date"])
+        if "purchase_date" in deal:
+            deal["purchase_date"] = str(deal["purchase_date"])
     return JSONResponse(content={"response": deals}, status_code=HTTP_200_OK)
 
 
 @app.get("/deals/read/{public_lot_id}") 
-async def get_single_deal(req: Request, public_lot_id: str) -> JSONResponse:
-    deal = await req.app.state.deal_collection.find_one(
+async def get_single_deal(
+    req: Request, public_lot_id: str, fields: Optional[str] = None
+) -> JSONResponse:
+    deal, archived = await find_one_with_archive(
+        req.app.state.deal_collection,
         {"public_id": public_lot_id},
-        projection={
-            "_id": False,
-            "end_at": False,
-            "created_at": False,
-            "updated_at": False,
-        },
+        projection=sparse_projection(SaudaModel, fields, DEAL_PROJECTION, always=("public_id",)),
     )
-    deal["purchase_date"] = str(deal["purchase_date"])
+    if not deal:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Deal not found")
+    if "purchase_date" in deal:
+        deal["purchase_date"] = str(deal["purchase_date"])
+    deal["archived"] = archived
     return JSONResponse(content={"response": deal}, status_code=HTTP_200_OK)
 
 
 @app.get("/brokers/read/all")
 async def get_all_brokers(req: Request) -> JSONResponse:
     brokers = await req.app.state.broker_collection.find(
-        {}, projection={"_id": False, "created_at": False, "updated_at": False}
+        {}, projection={"_id": False, "created_at": False, "updated_at": False, "search": False}
     ).to_list()
     return JSONResponse({"response": brokers}, status_code=HTTP_200_OK)
 
@@ -216,69 +314,237 @@ async def get_all_broker_deals(req: Request, broker_id: str) -> JSONResponse:
 
 
 @app.get("/brokers/read/{broker_id}/ledger")
-async def get_ledger_data(req: Request, broker_id: str) -> JSONResponse:
-    entries = req.app.state.ledger_collection.find({"broker_id": broker_id}, projection={"_id": False})
+async def get_ledger_data(
+    req: Request, broker_id: str, fields: Optional[str] = None
+) -> JSONResponse:
+    entries = req.app.state.ledger_collection.find(
+        {"broker_id": broker_id},
+        projection=sparse_projection(BrokerLedgerEntry, fields, LEDGER_PROJECTION),
+    )
     total_entries = []
     async for entry in entries:
-        entry['date'] = str(entry['date'])
+        if "date" in entry:
+            entry['date'] = str(entry['date'])
         total_entries.append(entry)
     return JSONResponse(status_code=HTTP_200_OK, content={"response": total_entries})   
 
 
 
 @app.get("/deals/read/{public_deal_id}/lot/all")  # For generating tables
-async def get_all_deal_lots(req: Request, public_deal_id: str) -> JSONResponse:
-    lots = await req.app.state.lot_collection.find(
-        {"sauda_id": public_deal_id},
-        projection={
-            "_id": False,
-            "created_at": False,
-            "updated_at": False,
-        }, 
+async def get_all_deal_lots(
+    req: Request, public_deal_id: str, fields: Optional[str] = None
+) -> JSONResponse:
+    projection = sparse_projection(LotModel, fields, LOT_PROJECTION, always=("public_id",))
+    lots_collection = req.app.state.lot_collection
+    archived = await deal_archived(req.app.state.deal_collection, public_deal_id)
+    if archived:
+        lots_collection = lots_collection.database.get_collection(archive_name("lot"))
+    lots = await lots_collection.find(
+        {"sauda_id": public_deal_id}, projection=projection
     ).to_list()
-    for lot in lots:
-        if lot["rice_pass_date"]:
+    for lot in flag_archived(lots, archived):
+        if lot.get("rice_pass_date"):
             lot["rice_pass_date"] = str(lot["rice_pass_date"])
     return JSONResponse(content={"response": lots}, status_code=HTTP_200_OK)
 
 
+LOT_PAGE_SIZE = 60
+MAX_LOT_PAGE_SIZE = 500
+LOT_STATUS_FILTERS = {
+    "not_shipped": {"shipped_bora_count": {"$in": [0, None]}},
+    "partial": {"shipped_bora_count": {"$gt": 0}, "remaining_bora_count": {"$gt": 0}},
+    "shipped": {"$or": [{"remaining_bora_count": {"$lte": 0}}, {"is_fully_shipped": True}]},
+}
+
+
+@app.get("/deals/read/{public_deal_id}/lot/page")  # For paginated grids
+async def get_deal_lot_page(
+    req: Request,
+    public_deal_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(LOT_PAGE_SIZE, ge=1, le=MAX_LOT_PAGE_SIZE),
+    status: Optional[Literal["not_shipped", "partial", "shipped"]] = None,
+    lot_no: Optional[str] = Query(None, max_length=50),
+    fields: Optional[str] = None,
+) -> JSONResponse:
+    """One page of a deal's lots in creation order, with the filtered total."""
+    query = {"sauda_id": public_deal_id}
+    if status:
+        query |= LOT_STATUS_FILTERS[status]
+    if lot_no:
+        query |= _prefix("rice_lot_no", lot_no)
+    lots_collection = req.app.state.lot_collection
+    archived = await deal_archived(req.app.state.deal_collection, public_deal_id)
+    if archived:
+        lots_collection = lots_collection.database.get_collection(archive_name("lot"))
+    lots, total = await asyncio.gather(
+        lots_collection.find(
+            query,
+            projection=sparse_projection(LotModel, fields, LOT_PROJECTION, always=("public_id",)),
+            sort=[("_id", 1)],
+            skip=(page - 1) * page_size,
+            limit=page_size,
+        ).to_list(),
+        lots_collection.count_documents(query),
+    )
+    for lot in flag_archived(lots, archived):
+        if lot.get("rice_pass_date"):
+            lot["rice_pass_date"] = str(lot["rice_pass_date"])
+    return JSONResponse(
+        content={
+            "response": {"items": lots, "total": total, "page": page, "page_size": page_size}
+        },
+        status_code=HTTP_200_OK,
+    )
+
+
 @app.get("/deals/read/lot/{public_lot_id}") # For MCP use only
 async def get_lot_details(
-    req: Request, public_lot_id: str
+    req: Request, public_lot_id: str, fields: Optional[str] = None
 ) -> JSONResponse:  # Bug fix - shipment details error
-    lot = await req.app.state.lot_collection.find_one(
+    lot, archived = await find_one_with_archive(
+        req.app.state.lot_collection,
         {"public_id": public_lot_id},
-        projection={"_id": False, "created_at": False, "updated_at": False},
+        projection=sparse_projection(LotModel, fields, LOT_PROJECTION, always=("public_id",)),
     )
     if not lot:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Lot not found")
-    if lot["rice_pass_date"]:
+    if lot.get("rice_pass_date"):
         lot["rice_pass_date"] = str(lot["rice_pass_date"])
+    lot["archived"] = archived
     return JSONResponse(content={"response": lot}, status_code=HTTP_200_OK)
 
 @app.get("/deals/read/{public_deal_id}/lot/{public_lot_id}")
 async def get_lot_details(
-    req: Request, public_deal_id: str, public_lot_id: str
+    req: Request, public_deal_id: str, public_lot_id: str, fields: Optional[str] = None
 ) -> JSONResponse:  # Bug fix - shipment details error
-    lot = await req.app.state.lot_collection.find_one(
+    lot, archived = await find_one_with_archive(
+        req.app.state.lot_collection,
         {"sauda_id": public_deal_id, "public_id": public_lot_id},
-        projection={"_id": False, "created_at": False, "updated_at": False},
+        projection=sparse_projection(LotModel, fields, LOT_PROJECTION, always=("public_id",)),
     )
     if not lot:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Lot not found")
-    if lot["rice_pass_date"]:
+    if lot.get("rice_pass_date"):
         lot["rice_pass_date"] = str(lot["rice_pass_date"])
+    lot["archived"] = archived
     return JSONResponse(content={"response": lot}, status_code=HTTP_200_OK)
 
 
+def ordered_batch(public_ids: List[str], found: dict) -> dict:
+    """Found documents in request order (duplicates once) plus the missing ids."""
+    public_ids = list(dict.fromkeys(public_ids))
+    return {
+        "items": [found[public_id] for public_id in public_ids if public_id in found],
+        "missing": [public_id for public_id in public_ids if public_id not in found],
+    }
+
+
+@app.post("/deals/read/batch")
+async def read_deal_batch(req: Request, data: BatchReadInput) -> JSONResponse:
+    found = await find_many_with_archive(
+        req.app.state.deal_collection,
+        data.public_ids,
+        sparse_projection(SaudaModel, data.fields, DEAL_PROJECTION, always=("public_id",)),
+    )
+    for deal in found.values():
+        if "purchase_date" in deal:
+            deal["purchase_date"] = str(deal["purchase_date"])
+    return JSONResponse(
+        content={"response": ordered_batch(data.public_ids, found)}, status_code=HTTP_200_OK
+    )
+
+
+@app.post("/deals/read/lot/batch")
+async def read_lot_batch(req: Request, data: BatchReadInput) -> JSONResponse:
+    found = await find_many_with_archive(
+        req.app.state.lot_collection,
+        data.public_ids,
+        sparse_projection(LotModel, data.fields, LOT_PROJECTION, always=("public_id",)),
+    )
+    for lot in found.values():
+        if lot.get("rice_pass_date"):
+            lot["rice_pass_date"] = str(lot["rice_pass_date"])
+    return JSONResponse(
+        content={"response": ordered_batch(data.public_ids, found)}, status_code=HTTP_200_OK
+    )
+
+
+@app.get("/search")
+async def search_everything(
+    req: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    types: str = "deal,lot,broker",
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+) -> JSONResponse:
+    """Ranked search over deal names, parties, agreements, lot numbers and brokers."""
+    wanted = [t.strip() for t in types.split(",") if t.strip()]
+    unknown = set(wanted) - set(SEARCHERS)
+    if unknown:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Unknown search types: {', '.join(sorted(unknown))}",
+        )
+    hits = await search(req.app.state.deal_collection.database, q.strip(), wanted, limit)
+    return JSONResponse(content={"response": hits}, status_code=HTTP_200_OK)
+
+
+@app.get("/sync/changes")
+async def get_sync_changes(
+    req: Request,
+    since: Optional[datetime.datetime] = None,
+    started: Optional[datetime.datetime] = None,
+) -> JSONResponse:
+    """Deals, lots, shipments, brokers and ledger entries changed after `since`.
+
+    Deletes come back under `deleted` as tombstones. Pass the returned
+    `watermark` as the next `since`, and call again straight away while
+    `has_more` is true, passing the returned `started` along with it.
+    Without `since` everything is returned.
+    """
+    state = req.app.state
+    if expired(since, started):
+        raise HTTPException(
+            status_code=HTTP_410_GONE,
+            detail="Watermark is older than the kept deletes, sync again without `since`.",
+        )
+    embedded = state.shipment_store.embedded
+    sources = {
+        "deal": (state.deal_collection, {"_id": False, "search": False}),
+        "lot": (state.lot_collection, {"_id": False, "search": False}),
+        "broker": (state.broker_collection, {"_id": False, "search": False}),
+        # Ledger entries have no public id, their `_id` is the key.
+        "ledger": (state.ledger_collection, {}),
+    }
+    if not embedded:
+        sources["shipment"] = (state.shipment_collection, {"_id": False})
+    result = await changes_since(sources, state.tombstone_collection, since, started=started)
+
+    changes = result["changes"]
+    if embedded:
+        # Shipments change with their lot, so they ride along with it.
+        changes["shipment"] = [
+            {k: v for k, v in shipment.items() if k != "_id"}
+            for lot in changes["lot"]
+            for shipment in lot.pop("shipments", None) or []
+        ]
+    for entry in changes["ledger"]:
+        entry["id"] = str(entry.pop("_id"))
+    return JSONResponse(
+        content={"response": jsonable_encoder(result, custom_encoder={ObjectId: str})},
+        status_code=HTTP_200_OK,
+    )
+
+
 # Create Routes - Done
 @app.post("/deals/create/")
+@idempotent
 async def create_deal(req: Request, deal: SaudaInput) -> JSONResponse:
 
     new_sauda = SaudaModel(**deal.model_dump())
     try:
         inserted_deal = await req.app.state.deal_collection.insert_one(
-            new_sauda.model_dump(by_alias=True)
+            with_search_keys("deal", new_sauda.model_dump(by_alias=True))
         )
     except Exception:
         return JSONResponse(
@@ -288,11 +554,12 @@ async def create_deal(req: Request, deal: SaudaInput) -> JSONResponse:
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
         )
     # Create empty lots
-    lots_to_create = []
-    for i in range(deal.total_lots):
-        new_lot = LotModel(sauda_id=new_sauda.public_id)
-        new_lot.rice_lot_no = f"LOT{i+1}"
-        lots_to_create.append(new_lot.model_dump(by_alias=True))
+    lots_to_create = bulk_documents(
+        LotModel,
+        {"sauda_id": new_sauda.public_id},
+        [{"rice_lot_no": f"LOT{i+1}"} for i in range(deal.total_lots)],
+    )
+    lots_to_create = [with_search_keys("lot", lot) for lot in lots_to_create]
 
     try:
         await req.app.state.lot_collection.insert_many(lots_to_create)
@@ -306,7 +573,11 @@ async def create_deal(req: Request, deal: SaudaInput) -> JSONResponse:
 
     # Update broker's sauda_ids
     await req.app.state.broker_collection.update_one(
-        {"broker_id": deal.broker_id}, {"$push": {"sauda_ids": new_sauda.public_id}}
+        {"broker_id": deal.broker_id},
+        {
+            "$push": {"sauda_ids": new_sauda.public_id},
+            "$set": {"updated_at": datetime.datetime.now(datetime.UTC)},
+        },
     )
 
     return JSONResponse(
@@ -330,7 +601,7 @@ async def create_broker(req: Request, broker: BrokerInput) -> JSONResponse:
 
     new_broker = BrokerModel(**broker.model_dump())
     inserted = await req.app.state.broker_collection.insert_one(
-        new_broker.model_dump(by_alias=True)
+        with_search_keys("broker", new_broker.model_dump(by_alias=True))
     )
 
     return JSONResponse(
@@ -356,15 +627,24 @@ class BrokerLedgerEntryInput(BaseModel):
 
 
 @app.post("/brokers/{broker_id}/ledger-create")
+@idempotent
 async def create_ledger_entry(req: Request, broker_id: str, entry: BrokerLedgerEntryInput) -> JSONResponse:
     entry = BrokerLedgerEntry(broker_id=broker_id, **entry.model_dump())
     await req.app.state.ledger_collection.insert_one(entry.model_dump(by_alias=True))
+    touched = {"$set": {"updated_at": entry.updated_at}}
     if entry.entry_type == "CREDIT":
-        await req.app.state.broker_collection.update_one({"broker_id": broker_id}, {"$inc": {"total_credits": entry.amount}})
+        await req.app.state.broker_collection.update_one({"broker_id": broker_id}, {"$inc": {"total_credits": entry.amount}} | touched)
     elif entry.entry_type == "DEBIT":
-        await req.app.state.broker_collection.update_one({"broker_id": broker_id}, {"$inc": {"total_debits": entry.amount}})
+        await req.app.state.broker_collection.update_one({"broker_id": broker_id}, {"$inc": {"total_debits": entry.amount}} | touched)
     else:
-        await req.app.state.broker_collection.update_one({"broker_id": broker_id}, {"$inc": {"total_debits": entry.amount, "total_credits": entry.amount}})
+        await req.app.state.broker_collection.update_one({"broker_id": broker_id}, {"$inc": {"total_debits": entry.amount, "total_credits": entry.amount}} | touched)
+    req.app.state.events.publish(
+        "ledger.posted",
+        entry.deal_id,
+        broker_id=broker_id,
+        entry_type=entry.entry_type,
+        amount=entry.amount,
+    )
     return JSONResponse(status_code=HTTP_200_OK, content={"message": "Entry Inserted Successfully!"})
 
 
@@ -387,7 +667,9 @@ async def update_deal(
     update_data = {k: v for k, v in deal_update.model_dump().items() if v is not None}
     try:
         await req.app.state.deal_collection.update_one(
-            {"_id": db_data["_id"]}, {"$set": update_data}, upsert=False
+            {"_id": db_data["_id"]},
+            {"$set": update_data | search_keys("deal", update_data)},
+            upsert=False,
         )
     except Exception:
         raise HTTPException(
@@ -410,9 +692,12 @@ async def update_broker(
             status_code=HTTP_404_NOT_FOUND, detail="Broker does not exist."
         )
     update_data = {k: v for k, v in broker_update.model_dump().items() if v is not None}
+    update_data["updated_at"] = datetime.datetime.now(datetime.UTC)
     try:
         await req.app.state.broker_collection.update_one(
-            {"_id": db_data["_id"]}, {"$set": update_data}, upsert=False
+            {"_id": db_data["_id"]},
+            {"$set": update_data | search_keys("broker", update_data)},
+            upsert=False,
         )
     except Exception:
         raise HTTPException(
@@ -435,14 +720,18 @@ async def update_single_lot(
     if not lot:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Lot not found")
     update_data = {k: v for k, v in lot_update.model_dump().items() if v is not None}
-    if update_data["total_bora_count"]:  # Revisit this logic.
-        update_data["remaining_bora_count"] = update_data["total_bora_count"]
+    update_data |= search_keys("lot", update_data)
     update_data["updated_at"] = datetime.datetime.now(datetime.UTC)
+    # Remaining follows a new total, shipments already sent still count.
+    recompute_remaining = update_data.get("total_bora_count") is not None
 
     try:
-        await req.app.state.lot_collection.update_one(
-            {"_id": lot["_id"]}, {"$set": update_data}
-        )
+        if req.app.state.lot_writer is not None:
+            await req.app.state.lot_writer.submit(lot["_id"], update_data, recompute_remaining)
+        else:
+            await req.app.state.lot_collection.update_one(
+                {"_id": lot["_id"]}, lot_set_update(update_data, recompute_remaining)
+            )
     except Exception:
         raise HTTPException(
             HTTP_500_INTERNAL_SERVER_ERROR, "Cannot update the deal, mongodb error."
@@ -459,13 +748,17 @@ async def update_batch_lot(
     update_data = {
         k: v for k, v in batch_update.update_data.model_dump().items() if v is not None
     }
-    print(update_data)
     if update_data.get("total_bora_count", None) is not None:
-        print("if triggered") 
         update_data["remaining_bora_count"] = update_data["total_bora_count"]
-        await req.app.state.shipment_collection.delete_many(
-            {"lot_id": {"$in": batch_update.public_lot_ids}}
+        update_data["shipped_bora_count"] = 0
+        update_data["shipment_details"] = []
+        deleted = await req.app.state.shipment_store.delete_for_lots(
+            batch_update.public_lot_ids
         )  # Deleting shipments that were created with old total count to maintain data integrity.
+        await record_deletes(
+            req.app.state.tombstone_collection, "shipment", deleted, public_deal_id
+        )
+    update_data |= search_keys("lot", update_data)
     update_data["updated_at"] = datetime.datetime.now(datetime.UTC)
     try:
         if batch_update.rice_lot_no is None or len(batch_update.rice_lot_no) == 0:
@@ -477,8 +770,8 @@ async def update_batch_lot(
         else:
             results = []
             for lottt, pub_id in zip(batch_update.rice_lot_no, batch_update.public_lot_ids):
-                results.append(req.app.state.lot_collection.update_one({"public_id": pub_id}, {"$set": update_data | {"rice_lot_no": lottt}}, upsert=False))
-            await asyncio.gather(*results)
+                results.append(req.app.state.lot_collection.update_one({"public_id": pub_id}, {"$set": update_data | {"rice_lot_no": lottt} | search_keys("lot", {"rice_lot_no": lottt})}, upsert=False))
+            await req.app.state.fanout["lot_update"].gather(results)
     except Exception:
         raise HTTPException(
             HTTP_500_INTERNAL_SERVER_ERROR, "Cannot update the deals, mongodb error."
@@ -506,6 +799,7 @@ async def update_deal_status(
             }
         },
     )
+    req.app.state.events.publish("deal.status", public_id, status=request.status)
     return JSONResponse(
         content={"public_id": public_id, "status": request.status},
         status_code=HTTP_200_OK,
@@ -515,33 +809,73 @@ async def update_deal_status(
 # Delete Routes
 @app.delete("/deals/delete/{public_deal_id}")
 async def delete_deal(req: Request, public_deal_id: str) -> JSONResponse:
-    # Find the deal to get broker_id
+    """Mark the deal as deleting and cascade-delete it in a background job."""
     deal = await req.app.state.deal_collection.find_one(
-        {"public_id": public_deal_id}, projection={"_id": True, "broker_id": True}
+        {"public_id": public_deal_id},
+        projection={"_id": False, "public_id": True, "broker_id": True, "delete_job_id": True},
     )
     if not deal:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Deal not found")
 
-    # Delete lots associated with the deal
-    await req.app.state.lot_collection.delete_many({"sauda_id": public_deal_id})
+    job_id = deal.get("delete_job_id")
+    if job_id is None:
+        job_id = await create_delete_deal_job(req.app, deal)
+        if job_id is not None:
+            spawn(req.app, run_delete_deal_job(req.app, job_id))
+        else:  # Lost the race to a concurrent delete.
+            deal = await req.app.state.deal_collection.find_one(
+                {"public_id": public_deal_id}, projection={"delete_job_id": True}
+            )
+            if deal is None:  # ...whose job already finished and removed the deal.
+                job = await req.app.state.job_collection.find_one(
+                    {"type": "delete_deal", "deal_id": public_deal_id},
+                    projection={"job_id": True},
+                    sort=[("created_at", -1)],
+                )
+                if job is None:
+                    raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Deal not found")
+                job_id = job["job_id"]
+            else:
+                job_id = deal["delete_job_id"]
+    else:
+        # Repeated delete: resume a failed job, otherwise report the running one.
+        retried = await req.app.state.job_collection.update_one(
+            {"job_id": job_id, "status": "failed"},
+            {"$set": {"status": "running", "error": None}},
+        )
+        if retried.modified_count:
+            spawn(req.app, run_delete_deal_job(req.app, job_id))
 
-    # Remove deal_id from broker's sauda_ids
-    await req.app.state.broker_collection.update_one(
-        {"broker_id": deal["broker_id"]}, {"$pull": {"sauda_ids": public_deal_id}}
+    return JSONResponse(
+        content={"message": "Deal deletion started.", "job_id": job_id},
+        status_code=HTTP_202_ACCEPTED,
     )
 
-    # Delete related shipments
-    await req.app.state.shipment_collection.delete_many({"sauda_id": public_deal_id})
-
-    # Delete the deal itself
-    await req.app.state.deal_collection.delete_one({"_id": deal["_id"]})
 
+@app.post("/admin/archive")
+async def start_archive(req: Request, older_than_days: int = ARCHIVE_AFTER_DAYS) -> JSONResponse:
+    """Move completed deals older than `older_than_days` to the archive collections."""
+    job_id = await create_archive_job(req.app, older_than_days)
+    spawn(req.app, run_archive_job(req.app, job_id))
     return JSONResponse(
-        content={"message": "Deal and associated lots deleted successfully!"},
-        status_code=HTTP_200_OK,
+        content={"message": "Archiving started.", "job_id": job_id},
+        status_code=HTTP_202_ACCEPTED,
     )
 
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(req: Request, job_id: str) -> JSONResponse:
+    job = await req.app.state.job_collection.find_one(
+        {"job_id": job_id}, projection={"_id": False}
+    )
+    if not job:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
+    for field in ("created_at", "updated_at", "finished_at"):
+        if job.get(field):
+            job[field] = str(job[field])
+    return JSONResponse(content={"response": job}, status_code=HTTP_200_OK)
+
+
 # Shipment Crud ------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
@@ -605,24 +939,7 @@ async def create_shipment(
         sauda_id=public_deal_id, lot_id=public_lot_id, **shipment_data.model_dump()
     )
     try:
-        await req.app.state.shipment_collection.insert_one(
-            data.model_dump(by_alias=True)
-        )
-        up_res = await req.app.state.lot_collection.update_one(
-            {"public_id": public_lot_id},
-            [
-                {
-                    "$set": {
-                        "remaining_bora_count": {
-                            "$subtract": ["$remaining_bora_count", data.sent_bora_count]
-                        },
-                        "shipment_details": {
-                            "$concatArrays": ["$shipment_details", [data.public_id]]
-                        },
-                    }
-                }
-            ],
-        )
+        await req.app.state.shipment_store.add(data.model_dump(by_alias=True))
         await req.app.state.deal_collection.update_one(
             {"public_id": public_deal_id},
             {
@@ -632,14 +949,25 @@ async def create_shipment(
                 }
             },
         )
+        req.app.state.events.publish(
+            "shipment.created",
+            public_deal_id,
+            lot_ids=[public_lot_id],
+            shipment_ids=[data.public_id],
+            status=SaudaStatus.IN_TRANSPORT.value,
+        )
         return JSONResponse(
             content={"message": "Shipment created successfully and lot updated."}
         )
-    except Exception as e:
-        raise e
+    except ShipmentLimitError:
+        raise HTTPException(
+            status_code=HTTP_409_CONFLICT,
+            detail="Lot not found or it already holds the maximum number of shipments.",
+        )
 
 
 @app.post("/deals/{public_deal_id}/lots/shipment/create-batch")
+@idempotent
 async def create_shipment_batch(
     req: Request, public_deal_id: str, batch_insert: BatchShipmentInput
 ) -> JSONResponse:
@@ -648,91 +976,96 @@ async def create_shipment_batch(
         batch_insert.public_ids,
         batch_insert.data.model_dump(by_alias=True),
     )
-    data_objs = []
-    for i in range(n):
-        data_objs.append(
-            ShipmentModel(
-                sauda_id=public_deal_id, lot_id=public_ids[i], **data
-            ).model_dump(by_alias=True)
-        )
-    tasks = []
-    for shipment in data_objs:
-        tasks.append(
-            req.app.state.lot_collection.update_one(
-                {"public_id": shipment["lot_id"]},
-                [
-                    {
-                        "$set": {
-                            "remaining_bora_count": {
-                                "$subtract": [
-                                    "$remaining_bora_count",
-                                    data["sent_bora_count"],
-                                ]
-                            },
-                            "shipment_details": {
-                                "$concatArrays": [
-                                    "$shipment_details",
-                                    [shipment["public_id"]],
-                                ]
-                            },
-                        }
+    data_objs = bulk_documents(
+        ShipmentModel,
+        {"sauda_id": public_deal_id, **data},
+        [{"lot_id": public_ids[i]} for i in range(n)],
+    )
+    limit_error = None
+    try:
+        try:
+            await req.app.state.shipment_store.add_many(
+                data_objs, req.app.state.fanout["shipment"]
+            )
+            added = data_objs
+        except ShipmentLimitError as e:
+            # The rest of the batch went in; its lots and the deal still move on.
+            limit_error, added = e, e.added
+        if added:
+            await req.app.state.deal_collection.update_one(
+                {"public_id": public_deal_id},
+                {
+                    "$set": {
+                        "status": SaudaStatus.IN_TRANSPORT.value,
+                        "updated_at": datetime.datetime.now(datetime.UTC),
                     }
-                ],
+                },
+            )
+            req.app.state.events.publish(
+                "shipment.created",
+                public_deal_id,
+                lot_ids=[shipment["lot_id"] for shipment in added],
+                shipment_ids=[shipment["public_id"] for shipment in added],
+                status=SaudaStatus.IN_TRANSPORT.value,
             )
-        )
-    try:
-        await req.app.state.shipment_collection.insert_many(data_objs)
-        await asyncio.gather(*tasks)
-        await req.app.state.deal_collection.update_one(
-            {"public_id": public_deal_id},
-            {
-                "$set": {
-                    "status": SaudaStatus.IN_TRANSPORT.value,
-                    "updated_at": datetime.datetime.now(datetime.UTC),
-                }
-            },
-        )
-        return JSONResponse(
-            content={"message": "Shipment created successfully and lot updated."}
-        )
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error batch updating shipment.",
         )
+    if limit_error is not None:
+        raise HTTPException(
+            status_code=HTTP_409_CONFLICT,
+            detail=f"Some shipments were not added: {limit_error}",
+        )
+    return JSONResponse(
+        content={"message": "Shipment created successfully and lot updated."}
+    )
 
 
 # Read
+LOT_BORA_PROJECTION = {
+    "_id": False,
+    "rice_lot_no": True,
+    "total_bora_count": True,
+    "shipped_bora_count": True,
+    "remaining_bora_count": True,
+}
+
+
+def stringify_shipment_dates(shipment: dict) -> dict:
+    for field in ("bora_date", "flap_sticker_date", "gate_pass_date"):
+        if shipment.get(field):
+            shipment[field] = str(shipment[field])
+    if shipment.get("frk_bheja") and shipment["frk_bheja"].get("frk_date"):
+        shipment["frk_bheja"]["frk_date"] = str(shipment["frk_bheja"]["frk_date"])
+    return shipment
+
+
 @app.post(
     "/deals/{public_deal_id}/lots/{public_lot_id}/shipment/{public_shipment_id}/read"
 )  # Exact Shipment
 async def read_sinlge_shipment(
-    req: Request, public_deal_id: str, public_lot_id: str, public_shipment_id: str
+    req: Request,
+    public_deal_id: str,
+    public_lot_id: str,
+    public_shipment_id: str,
+    fields: Optional[str] = None,
 ) -> JSONResponse:
+    projection = sparse_projection(
+        ShipmentModel, fields, SHIPMENT_PROJECTION, always=("public_id", "lot_id")
+    )
     try:
-        result = await req.app.state.shipment_collection.find_one(
-            {"public_id": public_shipment_id},
-            projection={"_id": False, "created_at": False, "updated_at": False},
+        store = req.app.state.shipment_store
+        result = await store.get(public_shipment_id, projection)
+        archived = result is None
+        if archived:
+            store = store.archive()
+            result = await store.get(public_shipment_id, projection)
+        result2 = await store.lots.find_one(
+            {"public_id": result["lot_id"]}, LOT_BORA_PROJECTION
         )
-        result2 = await req.app.state.lot_collection.find_one(
-            {"public_id": result["lot_id"]},
-            {
-                "_id": False,
-                "rice_lot_no": True,
-                "total_bora_count": True,
-                "shipped_bora_count": True,
-                "remaining_bora_count": True,
-            },
-        )
-        if result["bora_date"]:
-            result["bora_date"] = str(result["bora_date"])
-        if result["flap_sticker_date"]:
-            result["flap_sticker_date"] = str(result["flap_sticker_date"])
-        if result["gate_pass_date"]:
-            result["gate_pass_date"] = str(result["gate_pass_date"])
-        if result.get('frk_bheja', {}).get('frk_date'):
-            result['frk_bheja']['frk_date'] = str(result['frk_bheja']['frk_date'])
-        final = result | result2
+        final = stringify_shipment_dates(result) | result2 | {"archived": archived}
         return JSONResponse(content={"response": final}, status_code=HTTP_200_OK)
     except Exception as e:
         raise HTTPException(
@@ -743,74 +1076,57 @@ async def read_sinlge_shipment(
 
 @app.post("/deals/{public_deal_id}/lots/{public_lot_id}/shipment/read-lot")
 async def read_all_lot_shipments(
-    req: Request, public_deal_id: str, public_lot_id: str
+    req: Request, public_deal_id: str, public_lot_id: str, fields: Optional[str] = None
 ) -> JSONResponse:  # Read all the shipments for a `LOT`
+    projection = sparse_projection(
+        ShipmentModel, fields, SHIPMENT_PROJECTION, always=("public_id", "lot_id")
+    )
     try:
-        results = req.app.state.shipment_collection.find(
-            {"sauda_id": public_deal_id, "lot_id": public_lot_id},
-            projection={"_id": False, "created_at": False, "updated_at": False},
+        store = req.app.state.shipment_store
+        lot, shipments = await store.lot_with_shipments(
+            public_deal_id, public_lot_id, LOT_BORA_PROJECTION, projection
         )
-        final_result = []
-        async for result in results:
-            result2 = await req.app.state.lot_collection.find_one(
-                {"public_id": result["lot_id"]},
-                {
-                    "_id": False,
-                    "rice_lot_no": True,
-                    "total_bora_count": True,
-                    "shipped_bora_count": True,
-                    "remaining_bora_count": True,
-                },
+        archived = lot is None
+        if archived:
+            lot, shipments = await store.archive().lot_with_shipments(
+                public_deal_id, public_lot_id, LOT_BORA_PROJECTION, projection
             )
-            if result["bora_date"]:
-                result["bora_date"] = str(result["bora_date"])
-            if result["flap_sticker_date"]:
-                result["flap_sticker_date"] = str(result["flap_sticker_date"])
-            if result["gate_pass_date"]:
-                result["gate_pass_date"] = str(result["gate_pass_date"])
-            if result['frk_bheja'].get('frk_date'):
-                result['frk_bheja']['frk_date'] = str(result['frk_bheja']['frk_date'])
-            final_result.append(result | result2)
+        final_result = [
+            stringify_shipment_dates(shipment) | (lot or {}) | {"archived": archived}
+            for shipment in shipments
+        ]
         return JSONResponse(content={"response": final_result}, status_code=HTTP_200_OK)
-    except Exception as e: 
-        print(e)
+    except PyMongoError as e:
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error reading a single shipment detail.",
-        )
+            detail="Error reading the lot shipments.",
+        ) from e
 
 
 @app.get(
     "/deals/{public_deal_id}/lots/shipment/read-deal"
 )  # Read all shipments for a `SAUDA`
-async def read_all_deal_shipments(req: Request, public_deal_id: str) -> JSONResponse:
+async def read_all_deal_shipments(
+    req: Request, public_deal_id: str, fields: Optional[str] = None
+) -> JSONResponse:
+    projection = sparse_projection(
+        ShipmentModel, fields, SHIPMENT_PROJECTION, always=("public_id", "lot_id")
+    )
     # try:
-    results = req.app.state.shipment_collection.find(
-        {"sauda_id": public_deal_id},
-        projection={"_id": False, "created_at": False, "updated_at": False},
-    )
-    final_result = []
-    async for result in results:
-        result2 = await req.app.state.lot_collection.find_one(
-            {"public_id": result["lot_id"]},
-            {
-                "_id": False,
-                "rice_lot_no": True,
-                "total_bora_count": True,
-                "shipped_bora_count": True,
-                "remaining_bora_count": True,
-            },
-        )
-        if result.get("bora_date", False):
-            result["bora_date"] = str(result["bora_date"])
-        if result.get("flap_sticker_date", False):
-            result["flap_sticker_date"] = str(result["flap_sticker_date"])
-        if result.get("gate_pass_date", False):
-            result["gate_pass_date"] = str(result["gate_pass_date"])
-        if result.get('frk_bheja'):
-            if result.get('frk_bheja').get('frk_date'):
-                result['frk_bheja']['frk_date'] = str(result['frk_bheja']['frk_date'])
-        final_result.append(result | result2)
+    store = req.app.state.shipment_store
+    archived = await deal_archived(req.app.state.deal_collection, public_deal_id)
+    if archived:
+        store = store.archive()
+    shipments = await store.list(public_deal_id, projection=projection)
+    lots = await store.lots.find(
+        {"public_id": {"$in": list({s["lot_id"] for s in shipments})}},
+        projection=LOT_BORA_PROJECTION | {"public_id": True},
+    ).to_list()
+    lots_map = {lot.pop("public_id"): lot for lot in lots}
+    final_result = [
+        stringify_shipment_dates(shipment) | lots_map.get(shipment["lot_id"], {})
+        for shipment in flag_archived(shipments, archived)
+    ]
     return JSONResponse(content={"response": final_result}, status_code=HTTP_200_OK)
 
 
@@ -818,6 +1134,25 @@ async def read_all_deal_shipments(req: Request, public_deal_id: str) -> JSONResp
 #     raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail="Error reading a all shipment detail.")
 
 
+@app.post("/deals/lots/shipment/read/batch")
+async def read_shipment_batch(req: Request, data: BatchReadInput) -> JSONResponse:
+    projection = sparse_projection(
+        ShipmentModel, data.fields, SHIPMENT_PROJECTION, always=("public_id", "lot_id")
+    )
+    store = req.app.state.shipment_store
+    shipments = flag_archived(await store.get_many(data.public_ids, projection), False)
+    hot = {shipment["public_id"] for shipment in shipments}
+    missing = [public_id for public_id in data.public_ids if public_id not in hot]
+    if missing:
+        shipments += flag_archived(await store.archive().get_many(missing, projection), True)
+    found = {
+        shipment["public_id"]: stringify_shipment_dates(shipment) for shipment in shipments
+    }
+    return JSONResponse(
+        content={"response": ordered_batch(data.public_ids, found)}, status_code=HTTP_200_OK
+    )
+
+
 # Update - Done
 @app.patch(
     "/deals/lots/shipment/{public_shipment_id}/update"
@@ -826,16 +1161,13 @@ async def update_single_shipment(
     req: Request, public_shipment_id: str, data: ShipmentUpdate
 ) -> JSONResponse:
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
-    try:
-        res = await req.app.state.shipment_collection.update_one(
-            {"public_id": public_shipment_id}, {"$set": update_data}
-        )
-        return JSONResponse(
-            content={"message": "Shipment Data updated successfully."},
-            status_code=HTTP_200_OK,
-        )
-    except Exception as e:
-        raise e
+    update_data["updated_at"] = datetime.datetime.now(datetime.UTC)
+    if not await req.app.state.shipment_store.update(public_shipment_id, update_data):
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Shipment not found")
+    return JSONResponse(
+        content={"message": "Shipment Data updated successfully."},
+        status_code=HTTP_200_OK,
+    )
 
 
 @app.patch("/deals/lots/shipment/update/batch-update")  # Per Lot Shipment Updates
@@ -845,11 +1177,7 @@ async def update_multiple_shipments(
     update_data = {k: v for k, v in data.update.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.datetime.now(datetime.UTC)
     try:
-        result = await req.app.state.shipment_collection.update_many(
-            {"public_id": {"$in": data.public_ids}},
-            {"$set": update_data},
-            upsert=False,
-        )
+        await req.app.state.shipment_store.update_many(data.public_ids, update_data)
         return JSONResponse(
             content={"message": "Shipment created successfully and lot updated."}
         )
@@ -868,26 +1196,20 @@ async def delete_shipment(
     req: Request, public_deal_id: str, public_lot_id: str, public_shipment_id: str
 ) -> JSONResponse:
 
-        b_count = await req.app.state.shipment_collection.find_one(
-            {
-                "public_id": public_shipment_id,
-                "lot_id": public_lot_id,
-            },
-            projection={"_id": True, "sent_bora_count": True},
-        )
-        await req.app.state.shipment_collection.delete_one(
-            {
-                "public_id": public_shipment_id,
-                "lot_id": public_lot_id,
-                "sauda_id": public_deal_id,
-            }
+        if not await req.app.state.shipment_store.delete(
+            public_deal_id, public_lot_id, public_shipment_id
+        ):
+            raise HTTPException(
+                status_code=HTTP_404_NOT_FOUND, detail="Shipment not found"
+            )
+        await record_deletes(
+            req.app.state.tombstone_collection, "shipment", [public_shipment_id], public_deal_id
         )
-        await req.app.state.lot_collection.update_one(
-            {"public_id": public_lot_id},
-            {
-                "$pull": {"shipment_details": public_lot_id},
-                "$inc": {"remaining_bora_count": b_count.get("sent_bora_count", 0)},
-            },
+        req.app.state.events.publish(
+            "shipment.deleted",
+            public_deal_id,
+            lot_ids=[public_lot_id],
+            shipment_ids=[public_shipment_id],
         )
         return JSONResponse(
             content={"message": "Shipment details deleted successfully."},
@@ -918,20 +1240,7 @@ async def update_delivery_details(
         if d.rice_lot_no in lots_map:
             update_tasks.append(
                 req.app.state.lot_collection.update_one(
-                    {"rice_lot_no": d.rice_lot_no},
-                    [{
-                        "$set": {
-                            "rice_pass_date": d.rice_pass_date,
-                            "rice_deposit_centre": d.rice_deposit_centre,
-                            "qtl": d.qtl,
-                            "rice_bags_quantity": d.rice_bags_quantity,
-                            "moisture_cut": d.moisture_cut,
-                            "is_fully_shipped": True,
-                            "updated_at": datetime.datetime.now(datetime.UTC),
-                            "shipped_bora_count": "$remaining_bora_count",
-                            "remaining_bora_count": 0
-                        }
-                    }],
+                    {"rice_lot_no": d.rice_lot_no}, {"$set": delivery_fields(d)}
                 )
             )
 
@@ -941,7 +1250,15 @@ async def update_delivery_details(
     #         detail="Some lots were not parsed / found properly. FATAL ERROR",
     #     )
 
-    await asyncio.gather(*update_tasks)
+    await req.app.state.fanout["delivery"].gather(update_tasks)
+
+    updated = {}
+    for d in batch_update.data:
+        if d.rice_lot_no in lots_map:
+            lot = lots_map[d.rice_lot_no]
+            updated.setdefault(lot["sauda_id"], []).append(lot["public_id"])
+    for sauda_id, lot_ids in updated.items():
+        req.app.state.events.publish("lot.delivery_updated", sauda_id, lot_ids=lot_ids)
 
     return JSONResponse(
         content={"message": f"Batch Delivery Status Update Successful!"},
@@ -954,6 +1271,26 @@ async def update_delivery_details(
     #     )
 
 
+@app.post("/deals/update/lots/update-delivery-details/upload")
+async def upload_delivery_details(req: Request, file: UploadFile = File(...)) -> JSONResponse:
+    """Apply a govt rice-pass sheet (.csv or .xlsx), one row per lot.
+
+    Rows are validated like `update-delivery-details` input and written in
+    chunks; the report lists every row that was rejected, by sheet row number.
+    """
+    try:
+        report = await import_rice_pass(
+            file.file, file.filename or "", DeliveryUpdate, req.app.state.lot_collection
+        )
+    except UnsupportedSheet as e:
+        raise HTTPException(status_code=HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    except SheetError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    for sauda_id, lot_ids in report.lots_by_deal.items():
+        req.app.state.events.publish("lot.delivery_updated", sauda_id, lot_ids=lot_ids)
+    return JSONResponse(content={"response": report.as_dict()}, status_code=HTTP_200_OK)
+
+
 class CostEstimate(BaseModel):
     qi_expense: Optional[float]
     lot_dalali_expense: Optional[float]
@@ -1013,7 +1350,7 @@ async def batch_cost_estimate_lot(
     tasks = []
     total_nett_amount = 0
     async for lot in cursor:
-        frk_details = await req.app.state.shipment_collection.find_one({"lot_id": lot['public_id']}, projection={"_id": False, "frk": True, "frk_bheja": True})
+        frk_details = await req.app.state.shipment_store.first_for_lot(lot['public_id'])
         if frk_details and frk_details.get("frk", False):
             frk_bheja = frk_details.get('frk_bheja') or {}
             frk_qty = frk_bheja.get("frk_qty", 0)
@@ -1036,11 +1373,12 @@ async def batch_cost_estimate_lot(
                  "qi_expense": data.update.qi_expense,
                  "lot_dalali_expense": data.update.lot_dalali_expense,
                  "other_expenses": data.update.other_expenses,
-                 "brokerage": data.update.brokerage}}
+                 "brokerage": data.update.brokerage,
+                 "updated_at": datetime.datetime.now(datetime.UTC)}}
             )
         )
     try:
-        results = await asyncio.gather(*tasks)
+        results = await req.app.state.fanout["cost_estimate"].gather(tasks)
         await req.app.state.ledger_collection.insert_one(
             BrokerLedgerEntry(
                 broker_id=data.broker_id,
@@ -1052,7 +1390,14 @@ async def batch_cost_estimate_lot(
                 remarks="Total Sauda value calculated." # Ask bhaiya
             ).model_dump(by_alias=True)
             )
-        await req.app.state.broker_collection.update_one({"broker_id": data.broker_id}, {"$inc": {"total_debits": total_nett_amount}})
+        await req.app.state.broker_collection.update_one({"broker_id": data.broker_id}, {"$inc": {"total_debits": total_nett_amount}, "$set": {"updated_at": datetime.datetime.now(datetime.UTC)}})
+        req.app.state.events.publish(
+            "ledger.posted",
+            public_deal_id,
+            broker_id=data.broker_id,
+            entry_type="DEBIT",
+            amount=total_nett_amount,
+        )
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1064,6 +1409,150 @@ async def batch_cost_estimate_lot(
 
 ##### Analytics
 
+@app.get("/export/{collection}")
+async def export_collection(
+    req: Request,
+    collection: str,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    broker_id: Optional[str] = None,
+) -> FileResponse:
+    """`deal`, `lot`, `shipment` or `ledger` as a Parquet file for pandas.
+
+    `since`/`until` pick deals by purchase date (lots and shipments follow
+    them) and ledger entries by date; `broker_id` narrows to one broker.
+    """
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail=f"Exports: {', '.join(EXPORT_COLLECTIONS)}",
+        )
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        await export_parquet(
+            req.app.state.deal_collection.database, collection, path, since, until, broker_id
+        )
+    except ExportUnavailable as e:
+        os.remove(path)
+        raise HTTPException(status_code=HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    except BaseException:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/vnd.apache.parquet",
+        filename=f"{collection}.parquet",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@app.get("/reports/sauda-status.xlsx")
+async def sauda_status_report(req: Request) -> FileResponse:
+    """Excel workbook of every sauda's progress: a "Saudas" and a "Lots" sheet."""
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await write_status_workbook(req.app.state, path)
+    except ReportUnavailable as e:
+        os.remove(path)
+        raise HTTPException(status_code=HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    except BaseException:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename="sauda-status.xlsx",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@app.get("/metrics/fanout")
+async def get_fanout_metrics(req: Request) -> JSONResponse:
+    """Queueing metrics of the bounded fan-out executors, per route class."""
+    return JSONResponse(
+        content={
+            "response": {
+                name: fanout.metrics() for name, fanout in req.app.state.fanout.items()
+            }
+        },
+        status_code=HTTP_200_OK,
+    )
+
+
+@app.get("/events")
+async def stream_events(
+    req: Request, deal_id: Optional[str] = None, types: Optional[str] = None
+) -> StreamingResponse:
+    """Server-Sent Events for deal status, shipment, delivery and ledger changes.
+
+    Events carry ids only (deal, lots, shipments); clients refetch those rows.
+    Narrow with `deal_id=` and `types=shipment.created,deal.status`.
+    """
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    return StreamingResponse(
+        event_stream(req, req.app.state.events, deal_id, wanted),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics/lot-writer")
+async def get_lot_writer_metrics(req: Request) -> JSONResponse:
+    """Group-commit counters of single-lot PATCHes (null when coalescing is off)."""
+    writer = req.app.state.lot_writer
+    return JSONResponse(
+        content={"response": writer.metrics() if writer else None},
+        status_code=HTTP_200_OK,
+    )
+
+
+@app.get("/deals/{public_deal_id}/dashboard")
+async def get_deal_dashboard(req: Request, public_deal_id: str) -> JSONResponse:
+    """Deal, lots with their shipments and progress for the detail page in one call.
+
+    The three reads run concurrently; the join and progress are done here.
+    """
+    state = req.app.state
+    (deal, archived), lots, shipments = await asyncio.gather(
+        find_one_with_archive(
+            state.deal_collection, {"public_id": public_deal_id}, projection=DEAL_PROJECTION
+        ),
+        state.lot_collection.find(
+            {"sauda_id": public_deal_id}, projection=LOT_PROJECTION
+        ).to_list(),
+        state.shipment_store.list(public_deal_id),
+    )
+    if not deal:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Deal not found")
+    if archived:
+        store = state.shipment_store.archive()
+        lots, shipments = await asyncio.gather(
+            store.lots.find({"sauda_id": public_deal_id}, projection=LOT_PROJECTION).to_list(),
+            store.list(public_deal_id),
+        )
+
+    by_lot = {}
+    for shipment in shipments:
+        by_lot.setdefault(shipment["lot_id"], []).append(shipment)
+    for lot in lots:
+        lot["shipments"] = by_lot.get(lot["public_id"], [])
+    progress = deal_progress(public_deal_id, deal, lot_analytics(lots))
+
+    deal["purchase_date"] = str(deal["purchase_date"])
+    deal["archived"] = archived
+    for lot in lots:
+        if lot.get("rice_pass_date"):
+            lot["rice_pass_date"] = str(lot["rice_pass_date"])
+        for shipment in lot["shipments"]:
+            stringify_shipment_dates(shipment)
+    return JSONResponse(
+        content={"response": {"deal": deal, "lots": lots, "progress": progress}},
+        status_code=HTTP_200_OK,
+    )
+
+
 @app.get("/deals/analytics")
 async def get_deals_analytics(req: Request) -> JSONResponse:
     """
@@ -1073,7 +1562,7 @@ async def get_deals_analytics(req: Request) -> JSONResponse:
     try:
         # Fetch all deals
         deals = await req.app.state.deal_collection.find(
-            {},
+            {"status": {"$ne": SaudaStatus.DELETING.value}},
             projection={"public_id": 1, "total_lots": 1, "name": 1, "_id": 0}
         ).to_list()
 
@@ -1107,176 +1596,21 @@ async def get_deals_analytics(req: Request) -> JSONResponse:
                 }
             },
 
-            # Compute per-lot completion flags
-            {
-                "$addFields": {
-                    # Flap sticker completed if ANY shipment has both fields
-                    "has_flap_sticker": {
-                        "$cond": [
-                            {
-                                "$gt": [
-                                    {
-                                        "$size": {
-                                            "$filter": {
-                                                "input": "$shipments",
-                                                "as": "s",
-                                                "cond": {
-                                                    "$and": [
-                                                        {"$ne": ["$$s.flap_sticker_date", None]},
-                                                        {"$ne": ["$$s.flap_sticker_via", None]}
-                                                    ]
-                                                }
-                                            }
-                                        }
-                                    },
-                                    0
-                                ]
-                            },
-                            1,
-                            0
-                        ]
-                    },
-
-                    # Gate pass completed if ANY shipment has both fields
-                    "has_gate_pass": {
-                        "$cond": [
-                            {
-                                "$gt": [
-                                    {
-                                        "$size": {
-                                            "$filter": {
-                                                "input": "$shipments",
-                                                "as": "s",
-                                                "cond": {
-                                                    "$and": [
-                                                        {"$ne": ["$$s.gate_pass_date", None]},
-                                                        {"$ne": ["$$s.gate_pass_via", None]}
-                                                    ]
-                                                }
-                                            }
-                                        }
-                                    },
-                                    0
-                                ]
-                            },
-                            1,
-                            0
-                        ]
-                    },
-
-                    # FRK enabled if ANY shipment has frk = true
-                    "has_frk_enabled": {
-                        "$cond": [
-                            {
-                                "$gt": [
-                                    {
-                                        "$size": {
-                                            "$filter": {
-                                                "input": "$shipments",
-                                                "as": "s",
-                                                "cond": {"$eq": ["$$s.frk", True]}
-                                            }
-                                        }
-                                    },
-                                    0
-                                ]
-                            },
-                            1,
-                            0
-                        ]
-                    },
-
-                    # FRK completed if ANY shipment has full FRK bheja details
-                    "has_frk_complete": {
-                        "$cond": [
-                            {
-                                "$gt": [
-                                    {
-                                        "$size": {
-                                            "$filter": {
-                                                "input": "$shipments",
-                                                "as": "s",
-                                                "cond": {
-                                                    "$and": [
-                                                        {"$eq": ["$$s.frk", True]},
-                                                        {"$ne": ["$$s.frk_bheja", None]},
-                                                        {"$ne": ["$$s.frk_bheja.frk_date", None]},
-                                                        {"$ne": ["$$s.frk_bheja.frk_via", None]},
-                                                        {"$ne": ["$$s.frk_bheja.frk_truck_no", None]},
-                                                        {"$ne": ["$$s.frk_bheja.frk_transporter", None]},
-                                                        {"$ne": ["$$s.frk_bheja.frk_bora_count", None]}
-                                                    ]
-                                                }
-                                            }
-                                        }
-                                    },
-                                    0
-                                ]
-                            },
-                            1,
-                            0
-                        ]
-                    }
-                }
-            },
-
-            # Aggregate per deal
-            {
-                "$group": {
-                    "_id": "$sauda_id",
-                    "total_shipped_bora": {"$sum": "$shipped_bora_count"},
-                    "total_bora": {"$sum": "$total_bora_count"},
-                    "flap_sticker_completed_lots": {"$sum": "$has_flap_sticker"},
-                    "gate_pass_completed_lots": {"$sum": "$has_gate_pass"},
-                    "frk_enabled_lots": {"$sum": "$has_frk_enabled"},
-                    "frk_completed_lots": {"$sum": "$has_frk_complete"}
-                }
-            }
+            *analytics_stages(),
         ]
 
+        if req.app.state.shipment_store.embedded:
+            # Shipments are already on the lot, no join needed.
+            pipeline[1] = {"$addFields": {"shipments": {"$ifNull": ["$shipments", []]}}}
+
         cursor = await req.app.state.lot_collection.aggregate(pipeline)
         analytics_results = await cursor.to_list(length=None)
 
-        response = []
-        for deal_id, info in deal_info.items():
-            analytics = next(
-                (a for a in analytics_results if a["_id"] == deal_id),
-                None
-            )
-
-            if analytics:
-                deal_response = {
-                    "sauda_id": deal_id,
-                    "sauda_name": info["name"],
-                    "bora_progress": {
-                        "shipped": analytics.get("total_shipped_bora", 0),
-                        "total": analytics.get("total_bora", 0)
-                    },
-                    "flap_sticker_progress": {
-                        "completed": analytics["flap_sticker_completed_lots"],
-                        "total": info["total_lots"]
-                    },
-                    "gate_pass_progress": {
-                        "completed": analytics["gate_pass_completed_lots"],
-                        "total": info["total_lots"]
-                    }
-                }
-
-                if analytics["frk_enabled_lots"] > 0:
-                    deal_response["frk_progress"] = {
-                        "completed": analytics["frk_completed_lots"],
-                        "total": info["total_lots"]
-                    }
-
-                response.append(deal_response)
-            else:
-                response.append({
-                    "sauda_id": deal_id,
-                    "sauda_name": info["name"],
-                    "bora_progress": {"shipped": 0, "total": 0},
-                    "flap_sticker_progress": {"completed": 0, "total": info["total_lots"]},
-                    "gate_pass_progress": {"completed": 0, "total": info["total_lots"]}
-                })
+        analytics_by_deal = {a["_id"]: a for a in analytics_results}
+        response = [
+            deal_progress(deal_id, info, analytics_by_deal.get(deal_id))
+            for deal_id, info in deal_info.items()
+        ]
 
         return JSONResponse(content={"response": response}, status_code=HTTP_200_OK)
 
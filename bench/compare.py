@@ -0,0 +1,28 @@
+"""Diff two bench result files: python -m bench.compare base.json head.json"""
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def main(base_path: str, head_path: str):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    print(f"{base.get('commit')} -> {head.get('commit')}")
+    for name in sorted(set(base["scenarios"]) | set(head["scenarios"])):
+        old, new = base["scenarios"].get(name), head["scenarios"].get(name)
+        if old is None or new is None:
+            print(f"{name:<24} only in {'head' if old is None else 'base'}")
+            continue
+        cells = []
+        for metric in METRICS:
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            cells.append(f"{metric} {old[metric]} -> {new[metric]} ({change:+.1f}%)")
+        print(f"{name:<24} " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,248 @@
+"""Bulk-load a synthetic harvest season for scale testing.
+
+    python -m bench.generate --db sauda-scale --saudas 5000 --drop
+
+Documents are built from the real models (`SaudaModel`, `LotModel`,
+`ShipmentModel`, `BrokerLedgerEntry`, `BrokerModel`) and written with
+unordered `insert_many` batches, several batches in flight per collection.
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import time
+
+from pymongo.asynchronous.mongo_client import AsyncMongoClient
+
+from models import (
+    BrokerLedgerEntry,
+    BrokerModel,
+    LotModel,
+    SaudaModel,
+    SaudaStatus,
+    ShipmentModel,
+)
+from search import with_search_keys
+
+BORA_PER_LOT = 580
+SEASON_START = datetime.datetime(2025, 10, 1, tzinfo=datetime.UTC)
+
+
+class BatchWriter:
+    """Buffers documents and keeps up to `parallel` insert_many calls in flight."""
+
+    def __init__(self, collection, batch_size: int, parallel: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.buffer = []
+        self.pending = set()
+        self.written = 0
+
+    async def add(self, doc: dict):
+        self.buffer.append(doc)
+        if len(self.buffer) >= self.batch_size:
+            await self._submit()
+
+    async def _submit(self):
+        batch, self.buffer = self.buffer, []
+        if not batch:
+            return
+        if len(self.pending) >= self.parallel:
+            done, self.pending = await asyncio.wait(
+                self.pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task.result()
+        self.pending.add(asyncio.create_task(self._insert(batch)))
+
+    async def _insert(self, batch: list):
+        await self.collection.insert_many(batch, ordered=False)
+        self.written += len(batch)
+
+    async def close(self):
+        await self._submit()
+        if self.pending:
+            await asyncio.gather(*self.pending)
+            self.pending = set()
+
+
+def split_bora(total: int, parts: int, rng: random.Random) -> list:
+    """Split `total` bora into `parts` positive truck loads."""
+    if parts <= 1 or total < parts:
+        return [total]
+    cuts = sorted(rng.sample(range(1, total), parts - 1))
+    return [b - a for a, b in zip([0] + cuts, cuts + [total])]
+
+
+def sauda_status(lots: int, shipped: int, passed: int, any_shipment: bool) -> str:
+    if lots and passed == lots:
+        return SaudaStatus.COMPLETED.value
+    if lots and shipped == lots:
+        return SaudaStatus.SHIPPED.value
+    if any_shipment:
+        return SaudaStatus.IN_TRANSPORT.value
+    return SaudaStatus.INITIATE_PHASE.value
+
+
+async def generate(db, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    writers = {
+        name: BatchWriter(db.get_collection(name), args.batch_size, args.parallel)
+        for name in ("deal", "lot", "shipment", "ledger")
+    }
+    brokers = {
+        f"BRK{1000 + i}": BrokerModel(broker_id=f"BRK{1000 + i}", name=f"Broker {i + 1}")
+        for i in range(args.brokers)
+    }
+    broker_ids = list(brokers)
+
+    for s in range(args.saudas):
+        broker = brokers[rng.choice(broker_ids)]
+        purchase_date = SEASON_START + datetime.timedelta(days=rng.randint(0, 120))
+        total_lots = rng.randint(args.min_lots, args.max_lots)
+        rate = rng.choice([4100, 4150, 4200, 4275, 4300, 4350])
+        sauda = SaudaModel(
+            name=f"Sauda {s + 1}",
+            broker_id=broker.broker_id,
+            party_name=f"Party {rng.randint(1, args.parties)}",
+            purchase_date=purchase_date,
+            total_lots=total_lots,
+            rate=rate,
+            rice_type=rng.choice(["Common", "Grade A", "Basmati", "Sona Masoori"]),
+            rice_agreement=f"AGR-{purchase_date.year}-{s + 1:06d}",
+        )
+        broker.sauda_ids.append(sauda.public_id)
+
+        shipped_lots = passed_lots = 0
+        any_shipment = False
+        for n in range(total_lots):
+            lot = LotModel.model_construct(
+                sauda_id=sauda.public_id, rice_lot_no=f"{sauda.rice_agreement}-L{n + 1}"
+            )
+            # Most lots are fully shipped by season end, the rest are part way.
+            fully_shipped = rng.random() < args.shipped_share
+            if fully_shipped:
+                sent_total = BORA_PER_LOT
+            elif rng.random() < 0.5:
+                sent_total = rng.randint(1, BORA_PER_LOT - 1)
+            else:
+                sent_total = 0
+            loads = (
+                split_bora(sent_total, rng.randint(1, args.max_shipments), rng)
+                if sent_total
+                else []
+            )
+            ship_date = purchase_date + datetime.timedelta(days=rng.randint(1, 20))
+            for load in loads:
+                frk = rng.random() < args.frk_share
+                shipment = ShipmentModel.model_construct(
+                    lot_id=lot.public_id,
+                    sauda_id=sauda.public_id,
+                    sent_bora_count=load,
+                    bora_date=ship_date,
+                    bora_via=f"CG-{rng.randint(1, 99):02d}-{rng.randint(1000, 9999)}",
+                    flap_sticker_date=ship_date if rng.random() < 0.8 else None,
+                    flap_sticker_via="Sticker batch" if rng.random() < 0.8 else None,
+                    gate_pass_date=ship_date if rng.random() < 0.7 else None,
+                    gate_pass_via="Gate" if rng.random() < 0.7 else None,
+                    frk=frk,
+                    frk_bheja=(
+                        {
+                            "frk_via": "Rail",
+                            "frk_qty": round(rng.uniform(0.5, 3.0), 2),
+                            "frk_date": ship_date,
+                        }
+                        if frk
+                        else None
+                    ),
+                )
+                lot.shipment_details.append(shipment.public_id)
+                await writers["shipment"].add(shipment.model_dump(by_alias=True))
+                ship_date += datetime.timedelta(days=rng.randint(0, 5))
+            any_shipment = any_shipment or bool(loads)
+
+            lot.shipped_bora_count = sent_total
+            lot.remaining_bora_count = BORA_PER_LOT - sent_total
+            lot.is_fully_shipped = fully_shipped
+            if fully_shipped:
+                shipped_lots += 1
+                if rng.random() < args.passed_share:
+                    passed_lots += 1
+                    lot.rice_pass_date = ship_date + datetime.timedelta(days=rng.randint(3, 30))
+                    lot.rice_deposit_centre = f"Centre {rng.randint(1, 40)}"
+                    lot.qtl = round(rng.uniform(285, 295), 2)
+                    lot.rice_bags_quantity = BORA_PER_LOT
+                    lot.moisture_cut = round(rng.uniform(0, 3), 2)
+            await writers["lot"].add(with_search_keys("lot", lot.model_dump(by_alias=True)))
+
+        sauda.status = sauda_status(total_lots, shipped_lots, passed_lots, any_shipment)
+        if sauda.status == SaudaStatus.COMPLETED.value:
+            sauda.end_at = purchase_date + datetime.timedelta(days=rng.randint(30, 90))
+        await writers["deal"].add(with_search_keys("deal", sauda.model_dump(by_alias=True)))
+
+        for _ in range(rng.randint(args.min_ledger, args.max_ledger)):
+            entry = BrokerLedgerEntry.model_construct(
+                broker_id=broker.broker_id,
+                deal_id=sauda.public_id,
+                deal_name=sauda.name,
+                date=purchase_date + datetime.timedelta(days=rng.randint(0, 150)),
+                entry_type=rng.choices(["DEBIT", "CREDIT", "ADJUSTMENT"], [5, 4, 1])[0],
+                amount=round(rng.uniform(5_000, 500_000), 2),
+                mode=rng.choice(["cash", "bank", "cheque"]),
+                remarks="",
+            )
+            if entry.entry_type in ("DEBIT", "ADJUSTMENT"):
+                broker.total_debits += entry.amount
+            if entry.entry_type in ("CREDIT", "ADJUSTMENT"):
+                broker.total_credits += entry.amount
+            await writers["ledger"].add(entry.model_dump(by_alias=True))
+
+    for writer in writers.values():
+        await writer.close()
+    await db.get_collection("broker").insert_many(
+        [with_search_keys("broker", b.model_dump(by_alias=True)) for b in brokers.values()],
+        ordered=False,
+    )
+    counts = {name: writer.written for name, writer in writers.items()}
+    counts["broker"] = len(brokers)
+    return counts
+
+
+async def main(args: argparse.Namespace):
+    client = AsyncMongoClient(args.mongo_url, maxPoolSize=max(args.parallel * 4, 10))
+    try:
+        if args.drop:
+            await client.drop_database(args.db)
+        db = client.get_database(args.db)
+        start = time.perf_counter()
+        counts = await generate(db, args)
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        for name, count in counts.items():
+            print(f"{name:<10} {count:>12,}")
+        print(f"{total:,} documents in {elapsed:.1f}s ({total / elapsed:,.0f} docs/s)")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="sauda-scale")
+    parser.add_argument("--drop", action="store_true", help="Drop the database first")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--brokers", type=int, default=60)
+    parser.add_argument("--parties", type=int, default=400)
+    parser.add_argument("--saudas", type=int, default=3000)
+    parser.add_argument("--min-lots", type=int, default=20)
+    parser.add_argument("--max-lots", type=int, default=180)
+    parser.add_argument("--max-shipments", type=int, default=6)
+    parser.add_argument("--min-ledger", type=int, default=4)
+    parser.add_argument("--max-ledger", type=int, default=16)
+    parser.add_argument("--frk-share", type=float, default=0.3)
+    parser.add_argument("--shipped-share", type=float, default=0.7)
+    parser.add_argument("--passed-share", type=float, default=0.6)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--parallel", type=int, default=4, help="insert_many calls in flight per collection")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+
+import httpx
+from pymongo.asynchronous.mongo_client import AsyncMongoClient
+
+BENCH_DB = "sauda-bench"
+# boot_app drops its database, so it only touches names that start with this.
+BENCH_DB_PREFIX = "sauda-bench"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+@asynccontextmanager
+async def boot_app(mongo_url: str, db_name: str = BENCH_DB):
+    """Run the FastAPI app in-process (lifespan included) against a fresh `db_name`.
+
+    The database is dropped first, so the startup indexes are built on the
+    empty one the benchmarks then run against.
+    """
+    if not db_name.startswith(BENCH_DB_PREFIX):
+        raise ValueError(
+            f"Refusing to drop {db_name!r}: bench databases must start with {BENCH_DB_PREFIX!r}."
+        )
+    mongo = AsyncMongoClient(mongo_url)
+    try:
+        await mongo.drop_database(db_name)
+    finally:
+        await mongo.close()
+
+    os.environ["MONGO_URL"] = mongo_url
+    os.environ["MONGO_DB"] = db_name
+    from backend import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=120
+        ) as client:
+            yield app, client
+
+
+async def run_scenario(
+    name: str,
+    make_request: Callable[[int], Awaitable[httpx.Response]],
+    iterations: int,
+    concurrency: int,
+) -> dict:
+    """Fire `iterations` requests with at most `concurrency` in flight.
+
+    `make_request(i)` gets the iteration number so scenarios can spread load
+    over the seeded deals/lots.
+    """
+    latencies = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                res = await make_request(i)
+                if res.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    result = {
+        "requests": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(iterations / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+    print(
+        f"{name:<24} {result['throughput_rps']:>9} rps  p50 {result['p50_ms']:>8} ms  "
+        f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  errors {errors}"
+    )
+    return result
@@ -0,0 +1,119 @@
+"""Compare shipment storage layouts: separate collection vs embedded in the lot.
+
+    python -m bench.layouts --lots 2000 --shipments-per-lot 4
+
+Each layout gets its own database seeded with the same lots/shipments, then
+both are driven through `shipment_store` exactly as the routes use it.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from pymongo.asynchronous.mongo_client import AsyncMongoClient
+
+from bench.harness import percentile
+from fanout import FanOut
+from models import LotModel, ShipmentModel, bulk_documents
+from shipment_store import create_shipment_store
+
+SAUDA_ID = "layout-bench-sauda"
+LOT_PROJECTION = {"_id": False, "rice_lot_no": True, "remaining_bora_count": True}
+
+
+async def seed(store, lots: int, shipments_per_lot: int) -> list:
+    lot_docs = bulk_documents(
+        LotModel, {"sauda_id": SAUDA_ID}, [{"rice_lot_no": f"LOT{i + 1}"} for i in range(lots)]
+    )
+    await store.lots.insert_many(lot_docs)
+    lot_ids = [lot["public_id"] for lot in lot_docs]
+    fanout = FanOut("seed", 32)
+    for _ in range(shipments_per_lot):
+        shipments = bulk_documents(
+            ShipmentModel,
+            {"sauda_id": SAUDA_ID, "sent_bora_count": 100, "bora_via": "CG-04-1234"},
+            [{"lot_id": lot_id} for lot_id in lot_ids],
+        )
+        await store.add_many(shipments, fanout)
+    return lot_ids
+
+
+async def timed(fn, iterations: int, concurrency: int) -> dict:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            start = time.perf_counter()
+            await fn(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    wall = time.perf_counter() - wall
+    latencies.sort()
+    return {
+        "throughput_ops": round(iterations / wall, 2),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+async def bench_layout(client, mode: str, args: argparse.Namespace) -> dict:
+    db_name = f"sauda-layout-{mode}"
+    await client.drop_database(db_name)
+    db = client.get_database(db_name)
+    store = create_shipment_store(db.get_collection("shipment"), db.get_collection("lot"), mode)
+    await db.lot.create_index("public_id")
+    await db.shipment.create_index("lot_id")
+    await db.shipment.create_index("public_id")
+    lot_ids = await seed(store, args.lots, args.shipments_per_lot)
+    rng = random.Random(1)
+
+    async def read_lot(i: int):
+        await store.lot_with_shipments(SAUDA_ID, rng.choice(lot_ids), LOT_PROJECTION)
+
+    async def add_shipment(i: int):
+        doc = ShipmentModel(
+            sauda_id=SAUDA_ID, lot_id=rng.choice(lot_ids), sent_bora_count=1
+        ).model_dump(by_alias=True)
+        await store.add(doc)
+
+    result = {
+        "read_lot_with_shipments": await timed(read_lot, args.iterations, args.concurrency),
+        "add_shipment": await timed(add_shipment, args.iterations, args.concurrency),
+    }
+    if not args.keep:
+        await client.drop_database(db_name)
+    return result
+
+
+async def main(args: argparse.Namespace):
+    client = AsyncMongoClient(args.mongo_url)
+    try:
+        results = {mode: await bench_layout(client, mode, args) for mode in ("collection", "embedded")}
+    finally:
+        await client.close()
+    for mode, scenarios in results.items():
+        for name, row in scenarios.items():
+            print(
+                f"{mode:<11} {name:<24} {row['throughput_ops']:>9} ops/s  "
+                f"p50 {row['p50_ms']:>7} ms  p95 {row['p95_ms']:>7} ms  p99 {row['p99_ms']:>7} ms"
+            )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--lots", type=int, default=2000)
+    parser.add_argument("--shipments-per-lot", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--keep", action="store_true")
+    parser.add_argument("--out", default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,154 @@
+"""Load-test the FastAPI backend against a local mongod.
+
+    python -m bench.load --out bench-results.json
+    python -m bench.compare old.json new.json
+
+The app runs in-process through httpx's ASGI transport so the numbers measure
+the route handlers and Mongo round trips, not a network stack.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+
+from bench.harness import BENCH_DB, BENCH_DB_PREFIX, boot_app, git_commit, run_scenario
+from bench.seed import seed
+
+
+def build_scenarios(client, data: dict, lots_per_deal: int) -> dict:
+    deal_ids = list(data["deals"])
+    brokers = data["deal_brokers"]
+
+    def deal(i: int) -> str:
+        return deal_ids[i % len(deal_ids)]
+
+    async def create_deal(i: int):
+        return await client.post(
+            "/deals/create/",
+            json={
+                "name": f"Load Sauda {i}",
+                "broker_id": data["brokers"][i % len(data["brokers"])],
+                "party_name": f"Load Party {i % 17}",
+                "purchase_date": datetime.datetime(2025, 11, 1).isoformat(),
+                "total_lots": lots_per_deal,
+                "rate": 4200,
+            },
+        )
+
+    async def create_shipment_batch(i: int):
+        deal_id = deal(i)
+        return await client.post(
+            f"/deals/{deal_id}/lots/shipment/create-batch",
+            json={
+                "public_ids": data["deals"][deal_id],
+                "data": {"sent_bora_count": 1, "bora_via": f"TRUCK-{i}"},
+            },
+        )
+
+    async def delivery_update(i: int):
+        return await client.patch(
+            "/deals/update/lots/update-delivery-details",
+            json={
+                "data": [
+                    {
+                        "rice_lot_no": f"LOT{n + 1}",
+                        "rice_pass_date": datetime.datetime(2025, 12, 1).isoformat(),
+                        "rice_deposit_centre": "Centre A",
+                        "qtl": 290.0,
+                        "rice_bags_quantity": 580,
+                        "moisture_cut": 1.5,
+                    }
+                    for n in range(i % lots_per_deal + 1)
+                ]
+            },
+        )
+
+    async def cost_estimation(i: int):
+        deal_id = deal(i)
+        return await client.post(
+            f"/deals/{deal_id}/lots/cost-estimation",
+            json={
+                "public_lot_ids": data["deals"][deal_id],
+                "broker_id": brokers[deal_id],
+                "update": {
+                    "qi_expense": 120.0,
+                    "lot_dalali_expense": 80.0,
+                    "other_expenses": 40.0,
+                    "brokerage": 3.0,
+                },
+            },
+        )
+
+    async def analytics(i: int):
+        return await client.get("/deals/analytics")
+
+    async def read_deal_lots(i: int):
+        return await client.get(f"/deals/read/{deal(i)}/lot/all")
+
+    return {
+        "create_deal": create_deal,
+        "create_shipment_batch": create_shipment_batch,
+        "delivery_update": delivery_update,
+        "cost_estimation": cost_estimation,
+        "analytics": analytics,
+        "read_deal_lots": read_deal_lots,
+    }
+
+
+async def main(args: argparse.Namespace):
+    async with boot_app(args.mongo_url, args.db) as (app, client):
+        print("Seeding...")
+        data = await seed(
+            client,
+            brokers=args.brokers,
+            deals_per_broker=args.deals_per_broker,
+            lots_per_deal=args.lots_per_deal,
+            shipments_per_lot=args.shipments_per_lot,
+            ledger_per_broker=args.ledger_per_broker,
+        )
+        scenarios = build_scenarios(client, data, args.lots_per_deal)
+        selected = args.scenarios or list(scenarios)
+
+        results = {}
+        for name in selected:
+            results[name] = await run_scenario(
+                name, scenarios[name], args.iterations, args.concurrency
+            )
+
+        if not args.keep:
+            await app.state.deal_collection.database.client.drop_database(args.db)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+        "python": platform.python_version(),
+        "dataset": {
+            "brokers": args.brokers,
+            "deals": args.brokers * args.deals_per_broker,
+            "lots_per_deal": args.lots_per_deal,
+            "shipments_per_lot": args.shipments_per_lot,
+            "ledger_per_broker": args.ledger_per_broker,
+        },
+        "scenarios": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default=BENCH_DB, help=f"Dropped first; must start with {BENCH_DB_PREFIX!r}")
+    parser.add_argument("--brokers", type=int, default=5)
+    parser.add_argument("--deals-per-broker", type=int, default=4)
+    parser.add_argument("--lots-per-deal", type=int, default=20)
+    parser.add_argument("--shipments-per-lot", type=int, default=3)
+    parser.add_argument("--ledger-per-broker", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="*", help="Subset of scenarios to run")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench database")
+    parser.add_argument("--out", default="bench-results.json")
+    asyncio.run(main(parser.parse_args()))
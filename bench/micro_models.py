@@ -0,0 +1,84 @@
+"""Microbenchmarks for the pydantic models on the write routes.
+
+    python -m bench.micro_models [--batch 580] [--repeat 5]
+
+Reports the best-of-`repeat` cost per document in microseconds.
+"""
+import argparse
+import datetime
+import timeit
+from typing import List
+
+from pydantic import TypeAdapter
+
+from models import LotModel, SaudaModel, ShipmentModel, bulk_documents
+
+SAUDA = {
+    "name": "Bench Sauda",
+    "broker_id": "BRK101",
+    "party_name": "Sharma Agro",
+    "purchase_date": datetime.datetime(2025, 10, 1, tzinfo=datetime.UTC),
+    "total_lots": 20,
+    "rate": 4200,
+    "rice_type": "Basmati",
+    "rice_agreement": "AGR-2025-001",
+}
+LOT = {"sauda_id": "sauda-public-id", "rice_lot_no": "LOT1"}
+SHIPMENT = {
+    "sauda_id": "sauda-public-id",
+    "lot_id": "lot-public-id",
+    "sent_bora_count": 290,
+    "bora_date": datetime.datetime(2025, 10, 5, tzinfo=datetime.UTC),
+    "bora_via": "CG-04-1234",
+    "frk": True,
+    "frk_bheja": {"frk_via": "Rail", "frk_qty": 2.5, "frk_date": None},
+}
+
+
+def per_doc_us(fn, docs: int, repeat: int, number: int) -> float:
+    best = min(timeit.repeat(fn, repeat=repeat, number=number))
+    return round(best / (number * docs) * 1e6, 3)
+
+
+def bench_model(model_cls, data: dict, batch: int, repeat: int) -> dict:
+    instance = model_cls(**data)
+    stored = instance.model_dump(by_alias=True)  # What Mongo hands back
+    stored_batch = [dict(stored) for _ in range(batch)]
+    list_adapter = TypeAdapter(List[model_cls])
+    number = max(1, 2000 // batch)
+
+    return {
+        "construct": per_doc_us(lambda: model_cls(**data), 1, repeat, 2000),
+        "validate_db": per_doc_us(lambda: model_cls.model_validate(stored), 1, repeat, 2000),
+        "model_construct": per_doc_us(lambda: model_cls.model_construct(**stored), 1, repeat, 2000),
+        "dump_by_alias": per_doc_us(lambda: instance.model_dump(by_alias=True), 1, repeat, 2000),
+        "batch_construct_dump": per_doc_us(
+            lambda: [model_cls(**data).model_dump(by_alias=True) for _ in range(batch)],
+            batch, repeat, number,
+        ),
+        "batch_type_adapter": per_doc_us(
+            lambda: list_adapter.validate_python(stored_batch), batch, repeat, number
+        ),
+        "batch_bulk_documents": per_doc_us(
+            lambda: bulk_documents(model_cls, data, [{}] * batch), batch, repeat, number
+        ),
+    }
+
+
+def main(args: argparse.Namespace):
+    results = {
+        "SaudaModel": bench_model(SaudaModel, SAUDA, args.batch, args.repeat),
+        "LotModel": bench_model(LotModel, LOT, args.batch, args.repeat),
+        "ShipmentModel": bench_model(ShipmentModel, SHIPMENT, args.batch, args.repeat),
+    }
+    columns = list(next(iter(results.values())))
+    print(f"{'us/doc':<14}" + "".join(f"{c:>22}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<14}" + "".join(f"{row[c]:>22}" for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=580)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import random
+
+import httpx
+
+BORA_PER_LOT = 580
+
+
+async def seed(
+    client: httpx.AsyncClient,
+    brokers: int = 5,
+    deals_per_broker: int = 4,
+    lots_per_deal: int = 20,
+    shipments_per_lot: int = 3,
+    ledger_per_broker: int = 10,
+    seed_value: int = 7,
+) -> dict:
+    """Seed a realistic dataset through the public API.
+
+    Every deal gets `lots_per_deal` lots of 580 bora, each lot is shipped in
+    `shipments_per_lot` partial shipments, and every broker gets a handful of
+    ledger postings. Returns the ids the load scenarios need.
+    """
+    rng = random.Random(seed_value)
+    broker_ids = [f"BRK{100 + i}" for i in range(brokers)]
+    deals = {}  # public deal id -> list of public lot ids
+    deal_brokers = {}
+
+    for broker_id in broker_ids:
+        await client.post(
+            "/brokers/create/", json={"broker_id": broker_id, "name": f"Broker {broker_id}"}
+        )
+
+    for broker_id in broker_ids:
+        for d in range(deals_per_broker):
+            res = await client.post(
+                "/deals/create/",
+                json={
+                    "name": f"{broker_id} Sauda {d + 1}",
+                    "broker_id": broker_id,
+                    "party_name": f"Party {rng.randint(1, 50)}",
+                    "purchase_date": (
+                        datetime.datetime(2025, 10, 1)
+                        + datetime.timedelta(days=rng.randint(0, 90))
+                    ).isoformat(),
+                    "total_lots": lots_per_deal,
+                    "rate": rng.choice([4150, 4200, 4275, 4300]),
+                    "rice_type": rng.choice(["Basmati", "Sona Masoori", "Common"]),
+                    "rice_agreement": f"AGR-{broker_id}-{d + 1}",
+                },
+            )
+            deal_id = res.json()["public_deal_id"]
+            lots = (await client.get(f"/deals/read/{deal_id}/lot/all")).json()["response"]
+            deals[deal_id] = [lot["public_id"] for lot in lots]
+            deal_brokers[deal_id] = broker_id
+
+    per_shipment = BORA_PER_LOT // max(shipments_per_lot, 1)
+    for deal_id, lot_ids in deals.items():
+        for _ in range(shipments_per_lot):
+            frk = rng.random() < 0.3
+            await client.post(
+                f"/deals/{deal_id}/lots/shipment/create-batch",
+                json={
+                    "public_ids": lot_ids,
+                    "data": {
+                        "sent_bora_count": per_shipment,
+                        "bora_date": datetime.datetime.now().isoformat(),
+                        "bora_via": f"TRUCK-{rng.randint(1000, 9999)}",
+                        "frk": frk,
+                        "frk_bheja": (
+                            {"frk_via": "Rail", "frk_qty": 2.5, "frk_date": None}
+                            if frk
+                            else None
+                        ),
+                    },
+                },
+            )
+
+    deal_ids = list(deals)
+    for broker_id in broker_ids:
+        entries = []
+        for _ in range(ledger_per_broker):
+            deal_id = rng.choice(deal_ids)
+            entries.append(
+                client.post(
+                    f"/brokers/{broker_id}/ledger-create",
+                    json={
+                        "deal_id": deal_id,
+                        "deal_name": deal_id,
+                        "entry_type": rng.choice(["DEBIT", "CREDIT", "ADJUSTMENT"]),
+                        "amount": round(rng.uniform(1000, 250000), 2),
+                        "mode": rng.choice(["cash", "bank", "cheque"]),
+                    },
+                )
+            )
+        await asyncio.gather(*entries)
+
+    return {"brokers": broker_ids, "deals": deals, "deal_brokers": deal_brokers}
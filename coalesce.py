@@ -0,0 +1,130 @@
+import asyncio
+import os
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Group commit for single-lot PATCHes: updates arriving within the window are
+# flushed as one unordered bulk_write. Opt-in: 0 (the default) writes every
+# PATCH alone, since the window is added to each PATCH's latency. A window only
+# groups writes once PATCHes arrive faster than one per window, so turn it on
+# (5 ms is a good start) when single-lot PATCHes sustain about 200/s or more;
+# below that most flushes hold a single update and /metrics/lot-writer shows
+# documents_written close to flushes.
+LOT_WRITE_COALESCE_MS = float(os.getenv("LOT_WRITE_COALESCE_MS", 0))
+LOT_WRITE_MAX_BATCH = int(os.getenv("LOT_WRITE_MAX_BATCH", 500))
+
+REMAINING_FROM_TOTAL = {
+    "$set": {
+        "remaining_bora_count": {
+            "$subtract": ["$total_bora_count", {"$ifNull": ["$shipped_bora_count", 0]}]
+        }
+    }
+}
+
+
+def lot_set_update(fields: dict, recompute_remaining: bool):
+    """`$set` of `fields`, recomputing remaining from total minus shipped if asked.
+
+    Values are literals: in the pipeline form they are wrapped in `$literal`
+    so a string like "$x" is stored as-is rather than read as a field path.
+    """
+    if not recompute_remaining:
+        return {"$set": fields}
+    return [
+        {"$set": {k: {"$literal": v} for k, v in fields.items()}},
+        REMAINING_FROM_TOTAL,
+    ]
+
+
+class _Pending:
+    def __init__(self):
+        self.fields = {}
+        self.recompute_remaining = False
+        self.waiters = []
+
+
+class LotWriteCoalescer:
+    """Buffers lot `$set`s for `window` seconds and writes them in one bulk_write.
+
+    Successive updates of the same lot are merged (later values win), and
+    `submit` returns only once the flush holding its update has completed.
+    """
+
+    def __init__(self, lot_collection, window: float, max_batch: int = LOT_WRITE_MAX_BATCH):
+        self.lots = lot_collection
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[object, _Pending] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.flushes = 0
+        self.written = 0
+
+    async def submit(self, lot_id, fields: dict, recompute_remaining: bool = False):
+        pending = self._pending.setdefault(lot_id, _Pending())
+        pending.fields.update(fields)
+        pending.recompute_remaining |= recompute_remaining
+        waiter = asyncio.get_running_loop().create_future()
+        pending.waiters.append(waiter)
+        self.submitted += 1
+        if len(self._pending) >= self.max_batch:
+            self._schedule(0)
+        elif self._flush_task is None:
+            self._schedule(self.window)
+        await waiter
+
+    def _schedule(self, delay: float):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._flush_task = asyncio.create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        batch, self._pending, self._flush_task = self._pending, {}, None
+        await self._write(list(batch.items()))
+
+    async def _write(self, batch):
+        self.flushes += 1
+        self.written += len(batch)
+        failed = {}
+        try:
+            await self.lots.bulk_write(
+                [
+                    UpdateOne({"_id": lot_id}, lot_set_update(p.fields, p.recompute_remaining))
+                    for lot_id, p in batch
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = BulkWriteError(
+                    {"writeErrors": [error], "nInserted": 0}
+                )
+        except Exception as e:
+            failed = {i: e for i in range(len(batch))}
+        for i, (_, pending) in enumerate(batch):
+            for waiter in pending.waiters:
+                if waiter.done():
+                    continue
+                if i in failed:
+                    waiter.set_exception(failed[i])
+                else:
+                    waiter.set_result(None)
+
+    def metrics(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "submitted": self.submitted,
+            "flushes": self.flushes,
+            "documents_written": self.written,
+            "pending": len(self._pending),
+        }
+
+
+def create_lot_writer(lot_collection, window_ms: float = LOT_WRITE_COALESCE_MS):
+    if window_ms <= 0:
+        return None
+    return LotWriteCoalescer(lot_collection, window_ms / 1000)
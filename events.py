@@ -0,0 +1,69 @@
+import asyncio
+import datetime
+import json
+import os
+from typing import Optional
+
+# Events buffered per subscriber; a client that falls further behind loses
+# the oldest ones and gets a `resync` event telling it to reload.
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 256))
+HEARTBEAT_SECONDS = 15
+
+
+class EventBus:
+    """In-process pub/sub feeding the /events stream."""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.published = 0
+
+    def publish(self, event_type: str, deal_id: Optional[str] = None, **data):
+        event = {
+            "type": event_type,
+            "deal_id": deal_id,
+            "at": datetime.datetime.now(datetime.UTC).isoformat(),
+            **data,
+        }
+        self.published += 1
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+                queue.overflowed = True
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(self.queue_size)
+        queue.overflowed = False
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+
+def sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def event_stream(request, bus: EventBus, deal_id: Optional[str] = None, types=None):
+    """SSE frames of the bus events matching `deal_id`/`types`, with heartbeats."""
+    queue = bus.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if queue.overflowed:
+                queue.overflowed = False
+                yield sse({"type": "resync", "deal_id": None})
+            if deal_id is not None and event["deal_id"] not in (deal_id, None):
+                continue
+            if types and event["type"] not in types:
+                continue
+            yield sse(event)
+    finally:
+        bus.unsubscribe(queue)
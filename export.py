@@ -0,0 +1,228 @@
+"""Export deals, lots, shipments and the ledger to Parquet for analysis.
+
+    python export.py --out season-2025/ [--since 2025-10-01] [--until 2026-09-30]
+                     [--broker-id B1] [--collections deal,lot] [--db sauda-demo]
+
+Rows are read from Mongo cursors a batch at a time and written as Arrow record
+batches with fixed, typed schemas, so a whole season loads straight into
+pandas (`pd.read_parquet`) without holding it all in memory on the way out.
+`since`/`until` select deals by purchase date and ledger entries by date;
+lots and shipments follow their deals. Archived deals are included.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+from typing import Optional
+
+from pymongo.asynchronous.mongo_client import AsyncMongoClient
+
+from archive import archive_name
+from models import SaudaStatus
+from shipment_store import SHIPMENT_STORAGE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Exports need pyarrow.
+    pa = pq = None
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", 10_000))
+EXPORT_COLLECTIONS = ("deal", "lot", "shipment", "ledger")
+
+
+class ExportUnavailable(RuntimeError):
+    """pyarrow is not installed."""
+
+
+def _schemas() -> dict:
+    text, whole, real, flag = pa.string(), pa.int64(), pa.float64(), pa.bool_()
+    moment = pa.timestamp("ms", tz="UTC")
+    return {
+        "deal": pa.schema([
+            ("public_id", text), ("name", text), ("broker_id", text), ("party_name", text),
+            ("purchase_date", moment), ("total_lots", whole), ("rate", real),
+            ("rice_type", text), ("rice_agreement", text), ("status", text),
+            ("created_at", moment), ("updated_at", moment), ("end_at", moment),
+        ]),
+        "lot": pa.schema([
+            ("public_id", text), ("sauda_id", text), ("rice_lot_no", text),
+            ("total_bora_count", whole), ("shipped_bora_count", whole),
+            ("remaining_bora_count", whole), ("is_fully_shipped", flag),
+            ("rice_pass_date", moment), ("rice_deposit_centre", text), ("qtl", real),
+            ("rice_bags_quantity", whole), ("moisture_cut", real), ("net_rice_bought", real),
+            ("qi_expense", real), ("lot_dalali_expense", real), ("other_expenses", real),
+            ("brokerage", real), ("nett_amount", real),
+            ("created_at", moment), ("updated_at", moment),
+        ]),
+        "shipment": pa.schema([
+            ("public_id", text), ("lot_id", text), ("sauda_id", text),
+            ("sent_bora_count", whole), ("bora_date", moment), ("bora_via", text),
+            ("flap_sticker_date", moment), ("flap_sticker_via", text),
+            ("gate_pass_date", moment), ("gate_pass_via", text), ("frk", flag),
+            # frk_bheja, flattened
+            ("frk_via", text), ("frk_qty", real), ("frk_date", moment),
+            ("created_at", moment), ("updated_at", moment),
+        ]),
+        "ledger": pa.schema([
+            ("id", text), ("broker_id", text), ("deal_id", text), ("deal_name", text),
+            ("date", moment), ("entry_type", text), ("amount", real), ("mode", text),
+            ("remarks", text), ("deal_deleted", flag), ("updated_at", moment),
+        ]),
+    }
+
+
+def _caster(field):
+    """Coerce a Mongo value to the column type (ints stored as 580.0 and the like)."""
+    if pa.types.is_integer(field.type):
+        return int
+    if pa.types.is_floating(field.type):
+        return float
+    if pa.types.is_boolean(field.type):
+        return bool
+    if pa.types.is_string(field.type):
+        return str
+    return lambda value: value
+
+
+def _flatten(collection: str, document: dict) -> dict:
+    if collection == "shipment":
+        document = document | (document.get("frk_bheja") or {})
+    elif collection == "ledger":
+        document = document | {"id": str(document["_id"])}
+    return document
+
+
+def _record_batch(schema, collection: str, documents: list):
+    casts = [(field.name, _caster(field)) for field in schema]
+    rows = []
+    for document in documents:
+        document = _flatten(collection, document)
+        row = {}
+        for name, cast in casts:
+            value = document.get(name)
+            blank = value is None or (value == "" and cast is not str)
+            row[name] = None if blank else cast(value)
+        rows.append(row)
+    return pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+def _range(since, until) -> dict:
+    bounds = {}
+    if since is not None:
+        bounds["$gte"] = since
+    if until is not None:
+        bounds["$lt"] = until
+    return bounds
+
+
+async def _deal_ids(db, query: dict) -> list:
+    ids = []
+    for name in ("deal", archive_name("deal")):
+        ids += await db.get_collection(name).distinct("public_id", query)
+    return ids
+
+
+async def _cursors(db, collection: str, since, until, broker_id: Optional[str]):
+    """Cursors over the documents to export, hot collection first, then its archive."""
+    deal_query = {"status": {"$ne": SaudaStatus.DELETING.value}}
+    if since is not None or until is not None:
+        deal_query["purchase_date"] = _range(since, until)
+    if broker_id is not None:
+        deal_query["broker_id"] = broker_id
+
+    if collection == "ledger":
+        query = {}
+        if since is not None or until is not None:
+            query["date"] = _range(since, until)
+        if broker_id is not None:
+            query["broker_id"] = broker_id
+        return [db.ledger.find(query, batch_size=EXPORT_BATCH_ROWS)]
+    if collection == "deal":
+        query = deal_query
+    else:
+        query = {}
+        if len(deal_query) > 1:
+            query["sauda_id"] = {"$in": await _deal_ids(db, deal_query)}
+
+    if collection == "shipment" and SHIPMENT_STORAGE == "embedded":
+        pipeline = [
+            {"$match": query},
+            {"$unwind": "$shipments"},
+            {"$replaceRoot": {"newRoot": "$shipments"}},
+        ]
+        return [
+            await db.get_collection(name).aggregate(pipeline, batchSize=EXPORT_BATCH_ROWS)
+            for name in ("lot", archive_name("lot"))
+        ]
+    return [
+        db.get_collection(name).find(query, batch_size=EXPORT_BATCH_ROWS)
+        for name in (collection, archive_name(collection))
+    ]
+
+
+async def export_parquet(
+    db,
+    collection: str,
+    sink,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    broker_id: Optional[str] = None,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> int:
+    """Write `collection` to `sink` (a path or file) as Parquet, returning the row count.
+
+    Encoding and writing each batch runs in a worker thread, so the event
+    loop keeps serving while a large export is written.
+    """
+    if pa is None:
+        raise ExportUnavailable("Parquet export needs the pyarrow package.")
+    schema = _schemas()[collection]
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    rows = 0
+
+    def write(documents):
+        writer.write_batch(_record_batch(schema, collection, documents))
+
+    try:
+        for cursor in await _cursors(db, collection, since, until, broker_id):
+            documents = []
+            async for document in cursor:
+                documents.append(document)
+                if len(documents) == batch_rows:
+                    await asyncio.to_thread(write, documents)
+                    rows += len(documents)
+                    documents = []
+            if documents:
+                await asyncio.to_thread(write, documents)
+                rows += len(documents)
+    finally:
+        await asyncio.to_thread(writer.close)
+    return rows
+
+
+async def main(args: argparse.Namespace):
+    client = AsyncMongoClient(args.mongo_url)
+    os.makedirs(args.out, exist_ok=True)
+    try:
+        db = client.get_database(args.db)
+        for collection in args.collections.split(","):
+            path = os.path.join(args.out, f"{collection}.parquet")
+            rows = await export_parquet(
+                db, collection, path, args.since, args.until, args.broker_id
+            )
+            print(f"{collection}: {rows:,} rows -> {path}")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default=os.getenv("MONGO_DB", "sauda-demo"))
+    parser.add_argument("--out", required=True, help="Directory for the .parquet files")
+    parser.add_argument("--collections", default=",".join(EXPORT_COLLECTIONS))
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--broker-id")
+    asyncio.run(main(parser.parse_args()))
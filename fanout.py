@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Dict, Iterable, List
+
+# Max Mongo operations in flight per route class, shared by every request of
+# that class. Keep the sum well under the client's maxPoolSize (150) so batch
+# routes can't starve single-document reads. Override with
+# FANOUT_LIMIT_<CLASS>, e.g. FANOUT_LIMIT_LOT_UPDATE=64.
+DEFAULT_LIMITS = {
+    "lot_update": 32,
+    "shipment": 32,
+    "delivery": 32,
+    "cost_estimate": 16,
+}
+
+
+class FanOut:
+    """Semaphore-limited replacement for `asyncio.gather` with queue metrics."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def _run(self, aw: Awaitable):
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        start = time.perf_counter()
+        async with self._semaphore:
+            waited = time.perf_counter() - start
+            self.queued -= 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.in_flight += 1
+            try:
+                return await aw
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def gather(self, aws: Iterable[Awaitable]) -> List:
+        """Await all `aws` with at most `limit` running at once, in input order."""
+        aws = list(aws)
+        self.submitted += len(aws)
+        return await asyncio.gather(*(self._run(aw) for aw in aws))
+
+    def metrics(self) -> dict:
+        return {
+            "limit": self.limit,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 3)
+            if self.completed
+            else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+def create_fanouts() -> Dict[str, FanOut]:
+    return {
+        name: FanOut(name, int(os.getenv(f"FANOUT_LIMIT_{name.upper()}", limit)))
+        for name, limit in DEFAULT_LIMITS.items()
+    }
@@ -0,0 +1,38 @@
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from starlette.status import HTTP_400_BAD_REQUEST
+
+
+def sparse_projection(
+    model_cls, fields: Optional[str], default: dict, always: Iterable[str] = ()
+) -> dict:
+    """Mongo projection for a `fields=a,b,c` query parameter.
+
+    Without `fields` the route's `default` projection is returned unchanged.
+    Requested names must be fields of `model_cls` that `default` does not
+    hide; `always` fields are added so clients can still key the rows.
+    """
+    if not fields:
+        return default
+    hidden = {name for name, shown in default.items() if not shown}
+    allowed = {
+        field.alias or name for name, field in model_cls.model_fields.items()
+    } - hidden - {"_id"}
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Valid fields: {', '.join(sorted(allowed))}",
+        )
+    return {"_id": False} | {name: True for name in sorted(requested | set(always))}
+
+
+def apply_projection(document: dict, projection: dict) -> dict:
+    """Apply a projection in Python, for documents read as part of a larger one."""
+    included = [name for name, shown in projection.items() if shown]
+    if included:
+        return {name: document[name] for name in included if name in document}
+    return {k: v for k, v in document.items() if projection.get(k, True)}
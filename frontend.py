@@ -1,8 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional
 import json
+import os
+import queue
+import threading
+import time
+
+from replica import LocalReplica
 
 # Mock data storage (replace with actual MongoDB later)
 class DataStore:
@@ -11,6 +18,7 @@ class DataStore:
         self.saudas = []
         self.lots = []
         self.products = []
+        self.offline = False
         self._init_sample_data()
     
     def _init_sample_data(self):
@@ -47,15 +55,233 @@ class DataStore:
             'net_rice_bought': 148.0,
             'created_at': datetime.now()
         })
+    
+    # Read API used by the dashboard (same shape as ApiStore)
+    def list_brokers(self):
+        return list(self.brokers)
+    
+    def list_saudas(self):
+        return list(self.saudas)
+    
+    def list_lots(self):
+        return list(self.lots)
+    
+    def list_products(self):
+        return list(self.products)
+    
+    def search_brokers(self, query):
+        query = query.strip().lower()
+        return [b for b in self.brokers
+                if query in b['name'].lower() or query in (b['party_name'] or '').lower()]
+    
+    def filter_saudas(self, status):
+        return [s for s in self.saudas if status == 'All' or s['status'] == status]
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class ApiStore(DataStore):
+    """Reads from the FastAPI backend, mapped to the dashboard's row shapes.
+    
+    Methods block on the network, so the dashboard only calls them from its
+    worker threads. Writes still go to the local sample data.
+    
+    Brokers, saudas and lots are copied into a LocalReplica on every read;
+    search and filters query it, and when the backend cannot be reached the
+    lists come from it instead and the store turns read-only (offline).
+    
+    Lots and products come from one dashboard call per sauda, shared for
+    TREE_TTL seconds so a screen that lists both makes the calls once.
+    """
+    TREE_TTL = 5
+    
+    def __init__(self, base_url, replica=None):
+        import requests
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.replica = replica or LocalReplica()
+        self.offline_errors = (requests.ConnectionError, requests.Timeout)
+        self._trees = None
+        self._trees_lock = threading.Lock()
+    
+    def _mirrored(self, table, fetch):
+        try:
+            rows = fetch()
+        except self.offline_errors:
+            self.offline = True
+            return self.replica.all(table)
+        self.offline = False
+        return self.replica.replace(table, rows)
+    
+    def search_brokers(self, query):
+        return self.replica.search('brokers', query)
+    
+    def filter_saudas(self, status):
+        if status == 'All':
+            return self.replica.all('saudas')
+        return self.replica.saudas_with_status(status)
+    
+    def _get(self, path, method='GET'):
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=15)
+        response.raise_for_status()
+        return response.json()['response']
+    
+    def list_brokers(self):
+        return self._mirrored('brokers', self._fetch_brokers)
+    
+    def _fetch_brokers(self):
+        return [{
+            '_id': b['broker_id'],
+            'name': b['name'],
+            'party_name': '',
+            'sauda_ids': b.get('sauda_ids', []),
+            'created_at': None
+        } for b in self._get('/brokers/read/all')]
+    
+    def list_saudas(self):
+        return self._mirrored('saudas', self._fetch_saudas)
+    
+    def _fetch_saudas(self):
+        return [{
+            '_id': d['public_id'],
+            'name': d['name'],
+            'party_name': d.get('party_name'),
+            'date': parse_date(d.get('purchase_date')),
+            'total_lots': d.get('total_lots', 0),
+            'rate': d.get('rate', 0),
+            'status': d.get('status'),
+            'rice_type': d.get('rice_type'),
+            'rice_agreement': d.get('rice_agreement'),
+            'list_of_lot_id': [],
+            'created_at': None
+        } for d in self._get('/deals/read/all')]
+    
+    def _deal_trees(self):
+        """(sauda, lots with their shipments) pairs, cached for TREE_TTL seconds."""
+        with self._trees_lock:
+            if self._trees and time.monotonic() - self._trees[0] < self.TREE_TTL:
+                return self._trees[1]
+            trees = [
+                (sauda, self._get(f"/deals/{sauda['_id']}/dashboard")['lots'])
+                for sauda in self._fetch_saudas()
+            ]
+            self._trees = (time.monotonic(), trees)
+            return trees
+    
+    def list_lots(self):
+        return self._mirrored('lots', self._fetch_lots)
+    
+    def _fetch_lots(self):
+        lots = []
+        for sauda, sauda_lots in self._deal_trees():
+            for lot in sauda_lots:
+                lots.append(dict(
+                    {k: v for k, v in lot.items() if k != 'shipments'},
+                    _id=lot['public_id'],
+                    rice_agreement=sauda['rice_agreement'],
+                    rice_type=sauda['rice_type'],
+                    qtl=lot.get('qtl') or 0,
+                    net_rice_bought=lot.get('net_rice_bought') or 0,
+                    rice_pass_date=parse_date(lot.get('rice_pass_date'))
+                ))
+        return lots
+    
+    def list_products(self):
+        products = []
+        for _, sauda_lots in self._deal_trees():
+            for shipment in (s for lot in sauda_lots for s in lot['shipments']):
+                products.append({
+                    '_id': shipment['public_id'],
+                    'lot_id': shipment['lot_id'],
+                    'total_count': shipment.get('sent_bora_count') or 0,
+                    'shipping_date': parse_date(shipment.get('bora_date')),
+                    'shipped_via': shipment.get('bora_via'),
+                    'flap_sticker_t_date': parse_date(shipment.get('flap_sticker_date')),
+                    'flap_sticker_t_via': shipment.get('flap_sticker_via'),
+                    'created_at': None
+                })
+        return products
+
+
+# Set TRADING_API_URL (e.g. http://localhost:8000) to read from the backend
+db = ApiStore(os.environ['TRADING_API_URL']) if os.getenv('TRADING_API_URL') else DataStore()
+
+
+def fmt_date(value, fmt='%Y-%m-%d'):
+    return value.strftime(fmt) if value else 'N/A'
 
-db = DataStore()
+
+class BackgroundWorker:
+    """Runs blocking calls on a thread pool and hands results to the Tk thread.
+    
+    Worker threads never touch Tk: results go through a queue that the main
+    loop drains with root.after. Every job belongs to a view token; cancel()
+    drops everything submitted under older tokens, so a slow response never
+    draws into a screen the user has already left.
+    """
+    POLL_MS = 30
+    
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+        self.results = queue.Queue()
+        self.token = 0
+        self.pending = []
+        self.root.after(self.POLL_MS, self._drain)
+    
+    def submit(self, fn, on_done, on_error=None):
+        token = self.token
+        
+        def run():
+            try:
+                self.results.put((token, on_done, fn()))
+            except Exception as e:
+                self.results.put((token, on_error, e))
+        
+        future = self.executor.submit(run)
+        self.pending.append(future)
+        return future
+    
+    def cancel(self):
+        """Forget all outstanding jobs (queued ones never start)."""
+        self.token += 1
+        for future in self.pending:
+            future.cancel()
+        self.pending = []
+    
+    def _drain(self):
+        self.pending = [f for f in self.pending if not f.done()]
+        try:
+            while True:
+                token, callback, value = self.results.get_nowait()
+                if token == self.token and callback is not None:
+                    callback(value)
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self._drain)
+    
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 class TradingDashboard:
+    FILL_CHUNK = 500
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Trading Management System")
         self.root.geometry("1400x800")
         self.root.configure(bg='#f0f0f0')
+        self.worker = BackgroundWorker(root)
+        self.data = {}
+        self.views = {}
+        self.fills = {}
+        self.ready = set()
+        self.current = None
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         
         # Main container
         main_container = tk.Frame(root, bg='#f0f0f0')
@@ -95,17 +321,112 @@ class TradingDashboard:
                           bd=0, pady=15, activebackground='#1abc9c',
                           activeforeground='white', cursor='hand2')
             btn.pack(fill=tk.X, padx=10, pady=5)
+        
+        # Shown while reading from the local replica
+        self.offline_label = tk.Label(sidebar, text="", font=('Arial', 10, 'bold'),
+                                      bg='#2c3e50', fg='#e67e22', pady=10)
+        self.offline_label.pack(side=tk.BOTTOM, fill=tk.X)
+    
+    def show_offline(self):
+        self.offline_label.config(text="Offline (read-only)" if db.offline else "")
+    
+    def writable(self):
+        """False, with a warning, while the data comes from the offline replica."""
+        if db.offline:
+            messagebox.showwarning("Offline", "The server cannot be reached; "
+                                   "data is read-only until the connection is back.")
+            return False
+        return True
     
-    def clear_content(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+    def close(self):
+        self.worker.shutdown()
+        self.root.destroy()
+    
+    def show_view(self, name, refresh=False):
+        """Re-show the cached view `name`, or return a new frame to build it in.
+        
+        Views are hidden rather than destroyed on navigation, so going back to
+        a table is instant. Returns None when the cached view was re-shown;
+        refresh=True drops the cached one first (after a write).
+        """
+        # Navigating away cancels the previous view's fetches, and a view whose
+        # data never arrived is dropped so it is rebuilt next time
+        self.worker.cancel()
+        self.root.config(cursor='')
+        if self.current is not None:
+            if self.current in self.ready:
+                self.views[self.current].pack_forget()
+            else:
+                self.forget_views(self.current)
+        if refresh:
+            self.forget_views(name)
+        self.current = name
+        view = self.views.get(name)
+        if view is not None:
+            view.pack(fill=tk.BOTH, expand=True)
+            return None
+        view = self.views[name] = tk.Frame(self.content_frame, bg='white')
+        view.pack(fill=tk.BOTH, expand=True)
+        return view
+    
+    def forget_views(self, *names):
+        """Drop cached views so they are rebuilt from fresh data."""
+        for name in names:
+            view = self.views.pop(name, None)
+            if view is not None:
+                view.destroy()
+            self.ready.discard(name)
+    
+    def fill_tree(self, tree, rows, values):
+        """Insert rows one chunk per event-loop turn instead of all at once.
+        
+        The first chunk shows immediately and the rest follow through after(),
+        so a 20k-row table appears at once and stays scrollable while it fills.
+        Filling a tree again (search, filter) replaces its rows and stops any
+        fill still in progress.
+        """
+        fill = self.fills[str(tree)] = self.fills.get(str(tree), 0) + 1
+        tree.delete(*tree.get_children())
+        
+        def insert(start):
+            if not tree.winfo_exists() or self.fills[str(tree)] != fill:
+                return
+            end = start + self.FILL_CHUNK
+            for row in rows[start:end]:
+                tree.insert('', tk.END, values=values(row))
+            if end < len(rows):
+                self.root.after(1, insert, end)
+        
+        insert(0)
+    
+    def load(self, kind, fetch, render, parent):
+        """Fetch rows off the Tk thread, showing a loading line until they arrive."""
+        loading = tk.Label(parent, text=f"Loading {kind}...", font=('Arial', 11, 'italic'),
+                          bg='white', fg='#7f8c8d')
+        loading.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
+        self.root.config(cursor='watch')
+        
+        def done(rows):
+            self.root.config(cursor='')
+            loading.destroy()
+            self.ready.add(kind)
+            self.show_offline()
+            render(rows)
+        
+        def failed(error):
+            self.root.config(cursor='')
+            loading.config(text=f"Could not load {kind}: {error}", fg='#c0392b')
+        
+        self.worker.submit(fetch, done, failed)
     
     # BROKERS SECTION
-    def show_brokers(self):
-        self.clear_content()
+    def show_brokers(self, refresh=False):
+        view = self.show_view('brokers', refresh)
+        if view is None:
+            return
         
         # Header
-        header = tk.Frame(self.content_frame, bg='white')
+        header = tk.Frame(view, bg='white')
         header.pack(fill=tk.X, padx=20, pady=20)
         
         tk.Label(header, text="Brokers Management", font=('Arial', 20, 'bold'),
@@ -116,17 +437,17 @@ class TradingDashboard:
                  padx=20, pady=8, cursor='hand2').pack(side=tk.RIGHT)
         
         # Search frame
-        search_frame = tk.Frame(self.content_frame, bg='white')
+        search_frame = tk.Frame(view, bg='white')
         search_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
         
         tk.Label(search_frame, text="Search:", bg='white', font=('Arial', 10)).pack(side=tk.LEFT)
         search_entry = tk.Entry(search_frame, font=('Arial', 10), width=30)
         search_entry.pack(side=tk.LEFT, padx=10)
         tk.Button(search_frame, text="Search", bg='#3498db', fg='white',
-                 command=lambda: self.search_brokers(search_entry.get())).pack(side=tk.LEFT)
+                 command=lambda: self.search_brokers(tree, search_entry.get())).pack(side=tk.LEFT)
         
         # Table frame
-        table_frame = tk.Frame(self.content_frame, bg='white')
+        table_frame = tk.Frame(view, bg='white')
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
         
         # Treeview
@@ -144,19 +465,28 @@ class TradingDashboard:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Populate data
-        for broker in db.brokers:
-            tree.insert('', tk.END, values=(
-                broker['_id'],
-                broker['name'],
-                broker['party_name'],
-                len(broker['sauda_ids']),
-                broker['created_at'].strftime('%Y-%m-%d')
-            ))
+        def render(brokers):
+            self.data['brokers'] = brokers
+            self.fill_tree(tree, brokers, self.broker_values)
+        
+        self.load('brokers', db.list_brokers, render, view)
         
         # Double click to view details
         tree.bind('<Double-1>', lambda e: self.view_broker_details(tree))
     
+    @staticmethod
+    def broker_values(broker):
+        return (
+            broker['_id'],
+            broker['name'],
+            broker['party_name'],
+            len(broker['sauda_ids']),
+            fmt_date(broker['created_at'])
+        )
+    
     def add_broker_form(self):
+        if not self.writable():
+            return
         form_window = tk.Toplevel(self.root)
         form_window.title("Add New Broker")
         form_window.geometry("500x300")
@@ -189,7 +519,7 @@ class TradingDashboard:
             db.brokers.append(new_broker)
             messagebox.showinfo("Success", "Broker added successfully!")
             form_window.destroy()
-            self.show_brokers()
+            self.show_brokers(refresh=True)
         
         tk.Button(fields_frame, text="Save", command=save_broker, bg='#27ae60',
                  fg='white', font=('Arial', 11, 'bold'), padx=30, pady=8).grid(
@@ -202,7 +532,7 @@ class TradingDashboard:
         
         values = tree.item(selected[0])['values']
         broker_id = values[0]
-        broker = next((b for b in db.brokers if b['_id'] == broker_id), None)
+        broker = next((b for b in self.data.get('brokers', []) if str(b['_id']) == str(broker_id)), None)
         
         if not broker:
             return
@@ -226,21 +556,27 @@ class TradingDashboard:
         
         # Show linked saudas
         for sauda_id in broker['sauda_ids']:
-            sauda = next((s for s in db.saudas if s['_id'] == sauda_id), None)
+            sauda = next((s for s in self.data.get('saudas', db.saudas) if s['_id'] == sauda_id), None)
             if sauda:
                 tk.Label(details_frame, text=f"• {sauda['name']} - Status: {sauda['status']}", 
                         font=('Arial', 10), bg='white').pack(anchor='w', padx=20)
     
-    def search_brokers(self, query):
-        # Implement search functionality
-        messagebox.showinfo("Search", f"Searching for: {query}")
+    def search_brokers(self, tree, query):
+        def render(brokers):
+            self.data['brokers'] = brokers
+            self.fill_tree(tree, brokers, self.broker_values)
+        
+        self.worker.submit(lambda: db.search_brokers(query), render,
+                           lambda e: messagebox.showerror("Search", str(e)))
     
     # SAUDAS SECTION
-    def show_saudas(self):
-        self.clear_content()
+    def show_saudas(self, refresh=False):
+        view = self.show_view('saudas', refresh)
+        if view is None:
+            return
         
         # Header
-        header = tk.Frame(self.content_frame, bg='white')
+        header = tk.Frame(view, bg='white')
         header.pack(fill=tk.X, padx=20, pady=20)
         
         tk.Label(header, text="Saudas (Deals) Management", font=('Arial', 20, 'bold'),
@@ -251,7 +587,7 @@ class TradingDashboard:
                  padx=20, pady=8, cursor='hand2').pack(side=tk.RIGHT)
         
         # Filter frame
-        filter_frame = tk.Frame(self.content_frame, bg='white')
+        filter_frame = tk.Frame(view, bg='white')
         filter_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
         
         tk.Label(filter_frame, text="Status Filter:", bg='white', font=('Arial', 10)).pack(side=tk.LEFT)
@@ -261,10 +597,10 @@ class TradingDashboard:
                                     state='readonly', width=20)
         status_combo.pack(side=tk.LEFT, padx=10)
         tk.Button(filter_frame, text="Filter", bg='#3498db', fg='white',
-                 command=lambda: self.filter_saudas(status_var.get())).pack(side=tk.LEFT)
+                 command=lambda: self.filter_saudas(tree, status_var.get())).pack(side=tk.LEFT)
         
         # Table frame
-        table_frame = tk.Frame(self.content_frame, bg='white')
+        table_frame = tk.Frame(view, bg='white')
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
         
         # Treeview
@@ -282,21 +618,30 @@ class TradingDashboard:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Populate data
-        for sauda in db.saudas:
-            tree.insert('', tk.END, values=(
-                sauda['_id'],
-                sauda['name'],
-                sauda['date'].strftime('%Y-%m-%d'),
-                f"₹{sauda['rate']}",
-                sauda['total_lots'],
-                sauda['status'],
-                len(sauda['list_of_lot_id'])
-            ))
+        def render(saudas):
+            self.data['saudas'] = saudas
+            self.fill_tree(tree, saudas, self.sauda_values)
+        
+        self.load('saudas', db.list_saudas, render, view)
         
         # Double click to view details
         tree.bind('<Double-1>', lambda e: self.view_sauda_details(tree))
     
+    @staticmethod
+    def sauda_values(sauda):
+        return (
+            sauda['_id'],
+            sauda['name'],
+            fmt_date(sauda['date']),
+            f"₹{sauda['rate']}",
+            sauda['total_lots'],
+            sauda['status'],
+            len(sauda['list_of_lot_id'])
+        )
+    
     def add_sauda_form(self):
+        if not self.writable():
+            return
         form_window = tk.Toplevel(self.root)
         form_window.title("Add New Sauda")
         form_window.geometry("500x400")
@@ -352,7 +697,7 @@ class TradingDashboard:
                 db.saudas.append(new_sauda)
                 messagebox.showinfo("Success", "Sauda added successfully!")
                 form_window.destroy()
-                self.show_saudas()
+                self.show_saudas(refresh=True)
             except ValueError:
                 messagebox.showerror("Error", "Please enter valid numbers for lots and rate")
         
@@ -367,7 +712,7 @@ class TradingDashboard:
         
         values = tree.item(selected[0])['values']
         sauda_id = values[0]
-        sauda = next((s for s in db.saudas if s['_id'] == sauda_id), None)
+        sauda = next((s for s in self.data.get('saudas', []) if str(s['_id']) == str(sauda_id)), None)
         
         if not sauda:
             return
@@ -383,7 +728,7 @@ class TradingDashboard:
         
         tk.Label(details_frame, text=f"Sauda: {sauda['name']}", 
                 font=('Arial', 16, 'bold'), bg='white').pack(anchor='w', pady=5)
-        tk.Label(details_frame, text=f"Date: {sauda['date'].strftime('%Y-%m-%d')}", 
+        tk.Label(details_frame, text=f"Date: {fmt_date(sauda['date'])}", 
                 font=('Arial', 12), bg='white').pack(anchor='w', pady=2)
         tk.Label(details_frame, text=f"Rate: ₹{sauda['rate']}/qtl", 
                 font=('Arial', 12), bg='white').pack(anchor='w', pady=2)
@@ -402,9 +747,11 @@ class TradingDashboard:
         status_combo.pack(side=tk.LEFT, padx=10)
         
         def update_status():
+            if not self.writable():
+                return
             sauda['status'] = status_var.get()
             messagebox.showinfo("Success", "Status updated!")
-            self.show_saudas()
+            self.show_saudas(refresh=True)
             detail_window.destroy()
         
         tk.Button(status_frame, text="Update", command=update_status, bg='#3498db',
@@ -415,21 +762,28 @@ class TradingDashboard:
         
         # Show linked lots
         for lot_id in sauda['list_of_lot_id']:
-            lot = next((l for l in db.lots if l['_id'] == lot_id), None)
+            lot = next((l for l in self.data.get('lots', db.lots) if l['_id'] == lot_id), None)
             if lot:
                 tk.Label(details_frame, 
                         text=f"• {lot['rice_lot_no']} - {lot['rice_type']} ({lot['qtl']} qtl)", 
                         font=('Arial', 10), bg='white').pack(anchor='w', padx=20)
     
-    def filter_saudas(self, status):
-        messagebox.showinfo("Filter", f"Filtering by: {status}")
+    def filter_saudas(self, tree, status):
+        def render(saudas):
+            self.data['saudas'] = saudas
+            self.fill_tree(tree, saudas, self.sauda_values)
+        
+        self.worker.submit(lambda: db.filter_saudas(status), render,
+                           lambda e: messagebox.showerror("Filter", str(e)))
     
     # LOTS SECTION
-    def show_lots(self):
-        self.clear_content()
+    def show_lots(self, refresh=False):
+        view = self.show_view('lots', refresh)
+        if view is None:
+            return
         
         # Header
-        header = tk.Frame(self.content_frame, bg='white')
+        header = tk.Frame(view, bg='white')
         header.pack(fill=tk.X, padx=20, pady=20)
         
         tk.Label(header, text="Lots Management", font=('Arial', 20, 'bold'),
@@ -440,20 +794,19 @@ class TradingDashboard:
                  padx=20, pady=8, cursor='hand2').pack(side=tk.RIGHT)
         
         # Info frame (top section with key fields)
-        info_frame = tk.LabelFrame(self.content_frame, text="Summary", bg='#ecf0f1',
+        info_frame = tk.LabelFrame(view, text="Summary", bg='#ecf0f1',
                                    font=('Arial', 11, 'bold'), padx=10, pady=10)
         info_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
         
-        total_lots = len(db.lots)
-        total_qtl = sum(lot.get('qtl', 0) for lot in db.lots)
-        
-        tk.Label(info_frame, text=f"Total Lots: {total_lots}", bg='#ecf0f1',
-                font=('Arial', 11)).pack(side=tk.LEFT, padx=20)
-        tk.Label(info_frame, text=f"Total Quantity: {total_qtl:.2f} qtl", bg='#ecf0f1',
-                font=('Arial', 11)).pack(side=tk.LEFT, padx=20)
+        total_lots_label = tk.Label(info_frame, text="Total Lots: ...", bg='#ecf0f1',
+                                    font=('Arial', 11))
+        total_lots_label.pack(side=tk.LEFT, padx=20)
+        total_qtl_label = tk.Label(info_frame, text="Total Quantity: ...", bg='#ecf0f1',
+                                   font=('Arial', 11))
+        total_qtl_label.pack(side=tk.LEFT, padx=20)
         
         # Table frame
-        table_frame = tk.Frame(self.content_frame, bg='white')
+        table_frame = tk.Frame(view, bg='white')
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
         
         # Treeview
@@ -471,8 +824,12 @@ class TradingDashboard:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Populate data
-        for lot in db.lots:
-            tree.insert('', tk.END, values=(
+        def render(lots):
+            self.data['lots'] = lots
+            total_lots_label.config(text=f"Total Lots: {len(lots)}")
+            total_qtl_label.config(
+                text=f"Total Quantity: {sum(lot.get('qtl', 0) for lot in lots):.2f} qtl")
+            self.fill_tree(tree, lots, lambda lot: (
                 lot.get('rice_lot_no', 'N/A'),
                 lot.get('rice_type', 'N/A'),
                 lot.get('rice_agreement', 'N/A'),
@@ -482,10 +839,14 @@ class TradingDashboard:
                 'Yes' if lot.get('frk', False) else 'No'
             ))
         
+        self.load('lots', db.list_lots, render, view)
+        
         # Double click to view details
         tree.bind('<Double-1>', lambda e: self.view_lot_details(tree))
     
     def add_lot_form(self):
+        if not self.writable():
+            return
         form_window = tk.Toplevel(self.root)
         form_window.title("Add New Lot")
         form_window.geometry("600x700")
@@ -579,7 +940,8 @@ class TradingDashboard:
                 
                 messagebox.showinfo("Success", "Lot added successfully!")
                 form_window.destroy()
-                self.show_lots()
+                self.forget_views('products')
+                self.show_lots(refresh=True)
             except ValueError as e:
                 messagebox.showerror("Error", f"Please enter valid values: {str(e)}")
         
@@ -597,7 +959,7 @@ class TradingDashboard:
         
         values = tree.item(selected[0])['values']
         lot_no = values[0]
-        lot = next((l for l in db.lots if l.get('rice_lot_no') == lot_no), None)
+        lot = next((l for l in self.data.get('lots', []) if str(l.get('rice_lot_no')) == str(lot_no)), None)
         
         if not lot:
             return
@@ -653,7 +1015,7 @@ class TradingDashboard:
         # Link to parent sauda
         sauda_id = lot.get('sauda_id')
         if sauda_id:
-            sauda = next((s for s in db.saudas if s['_id'] == sauda_id), None)
+            sauda = next((s for s in self.data.get('saudas', db.saudas) if s['_id'] == sauda_id), None)
             if sauda:
                 tk.Label(details_frame, text=f"\nParent Sauda: {sauda['name']}", 
                         font=('Arial', 11, 'bold'), bg='white', fg='#3498db').pack(anchor='w', pady=10)
@@ -662,11 +1024,13 @@ class TradingDashboard:
         scrollbar.pack(side="right", fill="y")
     
     # PRODUCTS SECTION
-    def show_products(self):
-        self.clear_content()
+    def show_products(self, refresh=False):
+        view = self.show_view('products', refresh)
+        if view is None:
+            return
         
         # Header
-        header = tk.Frame(self.content_frame, bg='white')
+        header = tk.Frame(view, bg='white')
         header.pack(fill=tk.X, padx=20, pady=20)
         
         tk.Label(header, text="Products Management", font=('Arial', 20, 'bold'),
@@ -677,20 +1041,19 @@ class TradingDashboard:
                  padx=20, pady=8, cursor='hand2').pack(side=tk.RIGHT)
         
         # Info frame
-        info_frame = tk.LabelFrame(self.content_frame, text="Summary", bg='#ecf0f1',
+        info_frame = tk.LabelFrame(view, text="Summary", bg='#ecf0f1',
                                    font=('Arial', 11, 'bold'), padx=10, pady=10)
         info_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
         
-        total_products = len(db.products)
-        total_count = sum(p.get('total_count', 0) for p in db.products)
-        
-        tk.Label(info_frame, text=f"Total Products: {total_products}", bg='#ecf0f1',
-                font=('Arial', 11)).pack(side=tk.LEFT, padx=20)
-        tk.Label(info_frame, text=f"Total Count: {total_count}", bg='#ecf0f1',
-                font=('Arial', 11)).pack(side=tk.LEFT, padx=20)
+        total_products_label = tk.Label(info_frame, text="Total Products: ...", bg='#ecf0f1',
+                                        font=('Arial', 11))
+        total_products_label.pack(side=tk.LEFT, padx=20)
+        total_count_label = tk.Label(info_frame, text="Total Count: ...", bg='#ecf0f1',
+                                     font=('Arial', 11))
+        total_count_label.pack(side=tk.LEFT, padx=20)
         
         # Table frame
-        table_frame = tk.Frame(self.content_frame, bg='white')
+        table_frame = tk.Frame(view, bg='white')
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
         
         # Treeview
@@ -708,26 +1071,39 @@ class TradingDashboard:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Populate data
-        for product in db.products:
-            lot = next((l for l in db.lots if l['_id'] == product.get('lot_id')), None)
-            lot_no = lot.get('rice_lot_no', 'N/A') if lot else 'N/A'
+        def fetch():
+            return db.list_products(), {l['_id']: l for l in db.list_lots()}
+        
+        def render(result):
+            products, lots_by_id = result
+            self.data['products'] = products
+            self.data['lots'] = list(lots_by_id.values())
+            total_products_label.config(text=f"Total Products: {len(products)}")
+            total_count_label.config(
+                text=f"Total Count: {sum(p.get('total_count', 0) for p in products)}")
             
-            shipping_date = product.get('shipping_date')
-            sticker_date = product.get('flap_sticker_t_date')
+            def values(product):
+                lot = lots_by_id.get(product.get('lot_id'))
+                lot_no = lot.get('rice_lot_no', 'N/A') if lot else 'N/A'
+                return (
+                    product.get('_id', 'N/A'),
+                    lot_no,
+                    product.get('total_count', 0),
+                    fmt_date(product.get('shipping_date')),
+                    product.get('shipped_via', 'N/A'),
+                    fmt_date(product.get('flap_sticker_t_date'))
+                )
             
-            tree.insert('', tk.END, values=(
-                product.get('_id', 'N/A'),
-                lot_no,
-                product.get('total_count', 0),
-                shipping_date.strftime('%Y-%m-%d') if shipping_date else 'N/A',
-                product.get('shipped_via', 'N/A'),
-                sticker_date.strftime('%Y-%m-%d') if sticker_date else 'N/A'
-            ))
+            self.fill_tree(tree, products, values)
+        
+        self.load('products', fetch, render, view)
         
         # Double click to view details
         tree.bind('<Double-1>', lambda e: self.view_product_details(tree))
     
     def add_product_form(self):
+        if not self.writable():
+            return
         form_window = tk.Toplevel(self.root)
         form_window.title("Add New Product")
         form_window.geometry("500x450")
@@ -791,7 +1167,7 @@ class TradingDashboard:
                 db.products.append(new_product)
                 messagebox.showinfo("Success", "Product added successfully!")
                 form_window.destroy()
-                self.show_products()
+                self.show_products(refresh=True)
             except ValueError as e:
                 messagebox.showerror("Error", f"Please enter valid values: {str(e)}")
         
@@ -806,7 +1182,7 @@ class TradingDashboard:
         
         values = tree.item(selected[0])['values']
         product_id = values[0]
-        product = next((p for p in db.products if p.get('_id') == product_id), None)
+        product = next((p for p in self.data.get('products', []) if str(p.get('_id')) == str(product_id)), None)
         
         if not product:
             return
@@ -848,7 +1224,7 @@ class TradingDashboard:
         # Link to parent lot
         lot_id = product.get('lot_id')
         if lot_id:
-            lot = next((l for l in db.lots if l['_id'] == lot_id), None)
+            lot = next((l for l in self.data.get('lots', db.lots) if l['_id'] == lot_id), None)
             if lot:
                 tk.Label(details_frame, text=f"\nParent Lot: {lot.get('rice_lot_no', 'N/A')}", 
                         font=('Arial', 11, 'bold'), bg='white', fg='#3498db').pack(anchor='w', pady=10)
@@ -0,0 +1,111 @@
+import datetime
+import functools
+import hashlib
+import os
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+from pymongo.errors import DuplicateKeyError
+from starlette.status import HTTP_409_CONFLICT, HTTP_422_UNPROCESSABLE_ENTITY
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Stored responses expire through the TTL index on `created_at`.
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 24 * 60 * 60))
+# An in-progress claim older than this (about the request timeout) belongs to
+# a worker that died mid-request; a retry may take it over.
+IDEMPOTENCY_LEASE = int(os.getenv("IDEMPOTENCY_LEASE", 60))
+
+
+def idempotent(route):
+    """Replay the stored response when a request repeats its Idempotency-Key.
+
+    The first request with a key claims it, runs the route and stores the
+    response; retries get that response back without any write being redone.
+    Keys are scoped to method and path, and a key reused with a different body
+    is rejected. Server errors are not stored, so those can be retried, and a
+    claim left behind by a crashed worker is taken over after IDEMPOTENCY_LEASE.
+    """
+
+    @functools.wraps(route)
+    async def wrapper(*args, **kwargs):
+        req = kwargs["req"]
+        key = req.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await route(*args, **kwargs)
+
+        records = req.app.state.idempotency_collection
+        scope = f"{req.method} {req.url.path}"
+        fingerprint = hashlib.sha256(await req.body()).hexdigest()
+        now = datetime.datetime.now(datetime.UTC)
+        try:
+            await records.insert_one(
+                {
+                    "key": key,
+                    "scope": scope,
+                    "fingerprint": fingerprint,
+                    "status": "in_progress",
+                    "created_at": now,
+                    "claimed_at": now,
+                }
+            )
+        except DuplicateKeyError:
+            record = await records.find_one({"key": key, "scope": scope})
+            if record is None:  # Expired between the insert and the read.
+                return await wrapper(*args, **kwargs)
+            if record["fingerprint"] != fingerprint:
+                raise HTTPException(
+                    status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used with a different request body.",
+                )
+            if record["status"] == "completed":
+                return Response(
+                    content=record["body"],
+                    status_code=record["status_code"],
+                    media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            # Only one retry wins the takeover of a stale claim.
+            stale = now - datetime.timedelta(seconds=IDEMPOTENCY_LEASE)
+            taken = await records.update_one(
+                {
+                    "key": key,
+                    "scope": scope,
+                    "status": "in_progress",
+                    "claimed_at": {"$not": {"$gte": stale}},
+                },
+                {"$set": {"claimed_at": now}},
+            )
+            if not taken.modified_count:
+                raise HTTPException(
+                    status_code=HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress.",
+                    headers={"Retry-After": "1"},
+                )
+
+        try:
+            response = await route(*args, **kwargs)
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await records.delete_one({"key": key, "scope": scope})
+                raise
+            await _complete(
+                records, key, scope, JSONResponse(content={"detail": e.detail}).body, e.status_code
+            )
+            raise
+        except BaseException:
+            await records.delete_one({"key": key, "scope": scope})
+            raise
+        if response.status_code >= 500:
+            await records.delete_one({"key": key, "scope": scope})
+        else:
+            await _complete(records, key, scope, response.body, response.status_code)
+        return response
+
+    return wrapper
+
+
+async def _complete(records, key: str, scope: str, body: bytes, status_code: int):
+    await records.update_one(
+        {"key": key, "scope": scope},
+        {"$set": {"status": "completed", "body": body, "status_code": status_code}},
+    )
@@ -0,0 +1,66 @@
+from pymongo import ASCENDING, TEXT, IndexModel
+
+from idempotency import IDEMPOTENCY_TTL
+from sync import TOMBSTONE_TTL
+
+# Indexes created at startup; create_indexes is a no-op for ones that exist.
+INDEXES = {
+    "deal": [
+        IndexModel([("public_id", ASCENDING)], name="public_id"),
+        IndexModel([("broker_id", ASCENDING)], name="broker_id"),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        # Case-insensitive prefix search on what staff type (see search.py).
+        IndexModel([("search.name", ASCENDING)], name="search_name"),
+        IndexModel([("search.party_name", ASCENDING)], name="search_party_name"),
+        IndexModel([("search.rice_agreement", ASCENDING)], name="search_rice_agreement"),
+        IndexModel(
+            [("name", TEXT), ("party_name", TEXT), ("rice_agreement", TEXT)],
+            weights={"rice_agreement": 5, "name": 3, "party_name": 2},
+            name="deal_text",
+        ),
+    ],
+    "lot": [
+        IndexModel([("public_id", ASCENDING)], name="public_id"),
+        IndexModel([("sauda_id", ASCENDING)], name="sauda_id"),
+        IndexModel([("rice_lot_no", ASCENDING)], name="rice_lot_no"),
+        IndexModel([("search.rice_lot_no", ASCENDING)], name="search_rice_lot_no"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "shipment": [
+        IndexModel([("public_id", ASCENDING)], name="public_id"),
+        IndexModel([("lot_id", ASCENDING)], name="lot_id"),
+        IndexModel([("sauda_id", ASCENDING)], name="sauda_id"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "broker": [
+        IndexModel([("broker_id", ASCENDING)], name="broker_id"),
+        IndexModel([("name", ASCENDING)], name="name"),
+        IndexModel([("search.name", ASCENDING)], name="search_name"),
+        IndexModel([("search.broker_id", ASCENDING)], name="search_broker_id"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        IndexModel(
+            [("name", TEXT), ("broker_id", TEXT)],
+            weights={"broker_id": 5, "name": 3},
+            name="broker_text",
+        ),
+    ],
+    "ledger": [
+        IndexModel([("broker_id", ASCENDING), ("date", ASCENDING)], name="broker_id_date"),
+        IndexModel([("deal_id", ASCENDING)], name="deal_id"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "idempotency": [
+        IndexModel([("key", ASCENDING), ("scope", ASCENDING)], unique=True, name="key_scope"),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=IDEMPOTENCY_TTL, name="ttl"),
+    ],
+    # Delete markers for /sync/changes, kept for TOMBSTONE_TTL.
+    "tombstone": [
+        IndexModel([("deleted_at", ASCENDING)], expireAfterSeconds=TOMBSTONE_TTL, name="ttl"),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        await db.get_collection(collection).create_indexes(indexes)
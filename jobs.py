@@ -0,0 +1,210 @@
+import asyncio
+import datetime
+import os
+from uuid import uuid4
+
+from archive import archive_completed_deals
+from models import SaudaStatus
+from sync import record_deletes
+
+# Lots (with their shipments) and ledger entries handled per chunk, and the
+# pause between chunks so a big cascade never monopolises write capacity.
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", 200))
+DELETE_CHUNK_PAUSE = float(os.getenv("DELETE_CHUNK_PAUSE", 0.05))
+
+
+def now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC)
+
+
+def spawn(app, coro) -> asyncio.Task:
+    """Run `coro` in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    app.state.background_tasks.add(task)
+    task.add_done_callback(app.state.background_tasks.discard)
+    return task
+
+
+async def create_delete_deal_job(app, deal: dict):
+    """Create the job and claim the deal for it.
+
+    Returns None when a concurrent request claimed the deal first.
+    """
+    job_id = str(uuid4())
+    await app.state.job_collection.insert_one(
+        {
+            "job_id": job_id,
+            "type": "delete_deal",
+            "deal_id": deal["public_id"],
+            "broker_id": deal["broker_id"],
+            "status": "running",
+            "progress": {
+                "lots_deleted": 0,
+                "shipments_deleted": 0,
+                "ledger_entries_detached": 0,
+                "chunks_skipped": 0,
+            },
+            "error": None,
+            "created_at": now(),
+            "updated_at": now(),
+            "finished_at": None,
+        }
+    )
+    claimed = await app.state.deal_collection.update_one(
+        {"public_id": deal["public_id"], "delete_job_id": {"$exists": False}},
+        {
+            "$set": {
+                "status": SaudaStatus.DELETING.value,
+                "delete_job_id": job_id,
+                "updated_at": now(),
+            }
+        },
+    )
+    if not claimed.modified_count:
+        await app.state.job_collection.delete_one({"job_id": job_id})
+        return None
+    return job_id
+
+
+async def _progress(app, job_id: str, **inc):
+    await app.state.job_collection.update_one(
+        {"job_id": job_id},
+        {"$inc": {f"progress.{k}": v for k, v in inc.items()}, "$set": {"updated_at": now()}},
+    )
+
+
+async def run_delete_deal_job(app, job_id: str):
+    """Cascade-delete a deal in bounded chunks, recording progress on the job.
+
+    Two runs of the same job (a retry racing a resumed one) may read the same
+    chunk; the one whose delete comes up short lost that chunk to the other
+    and records it as skipped rather than counting the other's work.
+    """
+    job = await app.state.job_collection.find_one({"job_id": job_id})
+    if job is None or job["status"] != "running":
+        return
+    deal_id = job["deal_id"]
+    state = app.state
+    try:
+        while True:
+            lots = await state.lot_collection.find(
+                {"sauda_id": deal_id},
+                projection={"_id": True, "public_id": True, "shipment_details": True},
+                limit=DELETE_CHUNK_SIZE,
+            ).to_list()
+            if not lots:
+                break
+            lot_ids = [lot["public_id"] for lot in lots]
+            shipment_ids = await state.shipment_store.delete_for_lots(lot_ids)
+            result = await state.lot_collection.delete_many(
+                {"_id": {"$in": [lot["_id"] for lot in lots]}}
+            )
+            await record_deletes(state.tombstone_collection, "shipment", shipment_ids, deal_id)
+            # Tombstones even for a lost chunk, which may have been split between runs.
+            await record_deletes(state.tombstone_collection, "lot", lot_ids, deal_id)
+            # Only what this run deleted counts; a short delete lost the chunk.
+            await _progress(
+                app,
+                job_id,
+                lots_deleted=result.deleted_count,
+                shipments_deleted=len(shipment_ids),
+                chunks_skipped=int(result.deleted_count < len(lots)),
+            )
+            await asyncio.sleep(DELETE_CHUNK_PAUSE)
+
+        # Shipments whose lot was already gone.
+        await record_deletes(
+            state.tombstone_collection,
+            "shipment",
+            await state.shipment_store.delete_for_deal(deal_id),
+            deal_id,
+        )
+
+        # Ledger postings stay (broker totals are built from them), they are
+        # only flagged so statements can show the deal no longer exists.
+        while True:
+            entries = await state.ledger_collection.find(
+                {"deal_id": deal_id, "deal_deleted": {"$ne": True}},
+                projection={"_id": True},
+                limit=DELETE_CHUNK_SIZE,
+            ).to_list()
+            if not entries:
+                break
+            result = await state.ledger_collection.update_many(
+                {"_id": {"$in": [entry["_id"] for entry in entries]}},
+                {"$set": {"deal_deleted": True, "updated_at": now()}},
+            )
+            await _progress(app, job_id, ledger_entries_detached=result.modified_count)
+            await asyncio.sleep(DELETE_CHUNK_PAUSE)
+
+        await state.broker_collection.update_one(
+            {"broker_id": job["broker_id"]},
+            {"$pull": {"sauda_ids": deal_id}, "$set": {"updated_at": now()}},
+        )
+        await state.deal_collection.delete_one({"public_id": deal_id})
+        await record_deletes(state.tombstone_collection, "deal", [deal_id], deal_id)
+        await state.job_collection.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "completed", "updated_at": now(), "finished_at": now()}},
+        )
+    except Exception as e:
+        await state.job_collection.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "failed", "error": str(e), "updated_at": now()}},
+        )
+
+
+async def create_archive_job(app, older_than_days: int) -> str:
+    job_id = str(uuid4())
+    await app.state.job_collection.insert_one(
+        {
+            "job_id": job_id,
+            "type": "archive",
+            "older_than_days": older_than_days,
+            "status": "running",
+            "result": None,
+            "error": None,
+            "created_at": now(),
+            "updated_at": now(),
+            "finished_at": None,
+        }
+    )
+    return job_id
+
+
+async def run_archive_job(app, job_id: str):
+    job = await app.state.job_collection.find_one({"job_id": job_id})
+    try:
+        result = await archive_completed_deals(
+            app.state.deal_collection.database, job["older_than_days"]
+        )
+        await app.state.job_collection.update_one(
+            {"job_id": job_id},
+            {
+                "$set": {
+                    "status": "completed",
+                    "result": result,
+                    "updated_at": now(),
+                    "finished_at": now(),
+                }
+            },
+        )
+    except Exception as e:
+        await app.state.job_collection.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "failed", "error": str(e), "updated_at": now()}},
+        )
+
+
+JOB_RUNNERS = {
+    "delete_deal": run_delete_deal_job,
+    "archive": run_archive_job,
+}
+
+
+async def resume_jobs(app):
+    """Restart jobs that were running when the server last stopped."""
+    async for job in app.state.job_collection.find(
+        {"status": "running"}, projection={"job_id": True, "type": True}
+    ):
+        spawn(app, JOB_RUNNERS[job["type"]](app, job["job_id"]))
@@ -0,0 +1,215 @@
+"""MCP tools over the sauda data, mounted into the backend at /mcp.
+
+Responses are compact on purpose: short flat rows, no internal ids or
+timestamps, empty values dropped, dates as YYYY-MM-DD. Tools read through the
+backend's collections (one Mongo pool) and cache results for MCP_CACHE_TTL
+seconds, since agent loops tend to ask the same thing several times in a row.
+"""
+import asyncio
+import datetime
+import os
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+from archive import deal_archived, find_one_with_archive
+from models import SaudaStatus
+from progress import deal_progress, lot_analytics
+from search import MAX_SEARCH_LIMIT, SEARCHERS, search
+
+MCP_CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", 5))
+MCP_CACHE_SIZE = int(os.getenv("MCP_CACHE_SIZE", 512))
+MCP_LEDGER_LIMIT = 50
+
+DEAL_FIELDS = ("public_id", "name", "party_name", "broker_id", "status", "rate", "total_lots", "purchase_date", "rice_type", "rice_agreement")
+LOT_FIELDS = ("public_id", "rice_lot_no", "total_bora_count", "shipped_bora_count", "remaining_bora_count", "is_fully_shipped", "rice_pass_date", "rice_deposit_centre", "qtl", "nett_amount")
+SHIPMENT_FIELDS = ("public_id", "lot_id", "sent_bora_count", "bora_date", "bora_via", "flap_sticker_date", "gate_pass_date", "frk")
+LEDGER_FIELDS = ("date", "deal_name", "entry_type", "amount", "mode", "remarks")
+
+
+def compact(document: dict, fields, archived: bool = False) -> dict:
+    row = {}
+    for field in fields:
+        value = document.get(field)
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, datetime.datetime):
+            value = value.date().isoformat()
+        row[field] = value
+    if archived:
+        row["archived"] = True
+    return row
+
+
+class TTLCache:
+    """Results per (tool, arguments) for `ttl` seconds, oldest evicted first."""
+
+    def __init__(self, ttl: float = MCP_CACHE_TTL, size: int = MCP_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = {}
+
+    async def get_or_load(self, key, load):
+        hit = self.entries.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        value = await load()
+        if len(self.entries) >= self.size:
+            self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+
+def create_mcp(app) -> FastMCP:
+    mcp = FastMCP("sauda")
+    cache = TTLCache()
+
+    def cached(name, *args):
+        def wrap(load):
+            return cache.get_or_load((name, *args), load)
+        return wrap
+
+    @mcp.tool()
+    async def find(q: str, types: str = "deal,lot,broker", limit: int = 10) -> list:
+        """Search saudas (name, party, agreement), lot numbers and brokers."""
+        wanted = [t.strip() for t in types.split(",") if t.strip() in SEARCHERS]
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+        async def load():
+            hits = await search(app.state.deal_collection.database, q.strip(), wanted, limit)
+            return [{k: v for k, v in hit.items() if k != "score" and v is not None} for hit in hits]
+        return await cached("find", q, tuple(wanted), limit)(load)
+
+    @mcp.tool()
+    async def get_sauda(sauda_id: str) -> dict:
+        """One sauda with its bora, flap sticker, gate pass and FRK progress."""
+        async def load():
+            state = app.state
+            (deal, archived), lots, shipments = await asyncio.gather(
+                find_one_with_archive(state.deal_collection, {"public_id": sauda_id}, {"_id": False}),
+                state.lot_collection.find({"sauda_id": sauda_id}, projection={"_id": False}).to_list(),
+                state.shipment_store.list(sauda_id),
+            )
+            if not deal:
+                return {"error": "sauda not found"}
+            if archived:
+                store = state.shipment_store.archive()
+                lots, shipments = await asyncio.gather(
+                    store.lots.find({"sauda_id": sauda_id}, projection={"_id": False}).to_list(),
+                    store.list(sauda_id),
+                )
+            by_lot = {}
+            for shipment in shipments:
+                by_lot.setdefault(shipment["lot_id"], []).append(shipment)
+            for lot in lots:
+                lot["shipments"] = by_lot.get(lot["public_id"], [])
+            progress = deal_progress(sauda_id, deal, lot_analytics(lots))
+            row = compact(deal, DEAL_FIELDS, archived)
+            row.update({k: v for k, v in progress.items() if k.endswith("_progress")})
+            return row
+        return await cached("get_sauda", sauda_id)(load)
+
+    @mcp.tool()
+    async def list_lots(sauda_id: str) -> list:
+        """Lots of a sauda with their bora counts."""
+        async def load():
+            lots = app.state.lot_collection
+            archived = await deal_archived(app.state.deal_collection, sauda_id)
+            if archived:
+                lots = app.state.shipment_store.archive().lots
+            lots = await lots.find({"sauda_id": sauda_id}, projection={"_id": False}).to_list()
+            return [compact(lot, LOT_FIELDS, archived) for lot in lots]
+        return await cached("list_lots", sauda_id)(load)
+
+    @mcp.tool()
+    async def get_lot(lot_id: str) -> dict:
+        """One lot with its delivery details and expenses."""
+        async def load():
+            lot, archived = await find_one_with_archive(
+                app.state.lot_collection, {"public_id": lot_id}, {"_id": False, "shipments": False}
+            )
+            if not lot:
+                return {"error": "lot not found"}
+            return compact(
+                lot,
+                LOT_FIELDS + ("sauda_id", "moisture_cut", "net_rice_bought", "qi_expense", "lot_dalali_expense", "other_expenses", "brokerage"),
+                archived,
+            )
+        return await cached("get_lot", lot_id)(load)
+
+    @mcp.tool()
+    async def list_shipments(sauda_id: str, lot_id: str = "") -> list:
+        """Shipments of a sauda, or of one of its lots."""
+        async def load():
+            store = app.state.shipment_store
+            archived = await deal_archived(app.state.deal_collection, sauda_id)
+            if archived:
+                store = store.archive()
+            shipments = await store.list(sauda_id, lot_id or None)
+            return [compact(shipment, SHIPMENT_FIELDS, archived) for shipment in shipments]
+        return await cached("list_shipments", sauda_id, lot_id)(load)
+
+    @mcp.tool()
+    async def broker_ledger(broker_id: str, limit: int = MCP_LEDGER_LIMIT) -> dict:
+        """A broker's debit/credit totals and latest ledger entries, newest first."""
+        limit = max(1, min(limit, MCP_LEDGER_LIMIT))
+
+        async def load():
+            state = app.state
+            broker, entries = await asyncio.gather(
+                state.broker_collection.find_one(
+                    {"broker_id": broker_id},
+                    projection={"_id": False, "name": True, "total_debits": True, "total_credits": True},
+                ),
+                state.ledger_collection.find(
+                    {"broker_id": broker_id}, projection={"_id": False}, limit=limit
+                ).sort("date", -1).to_list(),
+            )
+            if not broker:
+                return {"error": "broker not found"}
+            return {
+                "name": broker["name"],
+                "debits": broker.get("total_debits", 0),
+                "credits": broker.get("total_credits", 0),
+                "entries": [compact(entry, LEDGER_FIELDS) for entry in entries],
+            }
+        return await cached("broker_ledger", broker_id, limit)(load)
+
+    @mcp.tool()
+    async def progress_report() -> list:
+        """Shipped/total bora of every sauda, one row each."""
+        async def load():
+            state = app.state
+            deals = await state.deal_collection.find(
+                {"status": {"$ne": SaudaStatus.DELETING.value}},
+                projection={"_id": False, "public_id": True, "name": True, "status": True},
+            ).to_list()
+            cursor = await state.lot_collection.aggregate([
+                {"$match": {"sauda_id": {"$in": [deal["public_id"] for deal in deals]}}},
+                {
+                    "$group": {
+                        "_id": "$sauda_id",
+                        "shipped": {"$sum": "$shipped_bora_count"},
+                        "total": {"$sum": "$total_bora_count"},
+                    }
+                },
+            ])
+            bora = {group["_id"]: group for group in await cursor.to_list()}
+            return [
+                {
+                    "id": deal["public_id"],
+                    "name": deal["name"],
+                    "status": deal.get("status"),
+                    "bora": "{shipped}/{total}".format(
+                        **bora.get(deal["public_id"], {"shipped": 0, "total": 0})
+                    ),
+                }
+                for deal in deals
+            ]
+        return await cached("progress_report")(load)
+
+    return mcp
+
+
+def mount_mcp(app, path: str = "/mcp"):
+    app.mount(path, create_mcp(app).sse_app(path))
@@ -0,0 +1,224 @@
+"""One-off data migrations.
+
+    python migrations.py backfill-bora-counts [--db sauda-demo]
+    python migrations.py backfill-updated-at  # stamp documents /sync/changes can page
+    python migrations.py backfill-search-keys # lower-cased copies for prefix search
+    python migrations.py embed-shipments      # shipment collection -> lot.shipments
+    python migrations.py unembed-shipments    # lot.shipments -> shipment collection
+"""
+import argparse
+import datetime
+import os
+
+from pymongo import ASCENDING, MongoClient, ReplaceOne, UpdateOne
+
+from search import SEARCH_FIELDS
+from shipment_store import MAX_EMBEDDED_SHIPMENTS, SHIPMENT_STORAGE
+from sync import SYNC_COLLECTIONS
+
+CHUNK_SIZE = 1000
+
+
+def backfill_bora_counts(db) -> int:
+    """Recompute lot shipped/remaining bora and shipment_details from shipments.
+
+    Lots written before the counters were kept with `$inc` have
+    `shipped_bora_count: null` (which `$inc` refuses) and `shipment_details`
+    entries that were never pulled on delete. With SHIPMENT_STORAGE=embedded
+    the shipments are read from each lot's own `shipments` array.
+    """
+    embedded = SHIPMENT_STORAGE == "embedded"
+    if embedded and db.shipment.find_one({}, projection={"_id": True}):
+        raise SystemExit("Shipments are still in the shipment collection, run embed-shipments first.")
+    shipped = {} if embedded else {
+        row["_id"]: row
+        for row in db.shipment.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": "$lot_id",
+                        "sent": {"$sum": {"$ifNull": ["$sent_bora_count", 0]}},
+                        "ids": {"$push": "$public_id"},
+                    }
+                }
+            ]
+        )
+    }
+    updated = 0
+    ops = []
+    projection = {"public_id": True, "total_bora_count": True}
+    if embedded:
+        projection |= {"shipments.public_id": True, "shipments.sent_bora_count": True}
+    for lot in db.lot.find({}, projection=projection):
+        if embedded:
+            shipments = lot.get("shipments") or []
+            row = {
+                "sent": sum(s.get("sent_bora_count") or 0 for s in shipments),
+                "ids": [s["public_id"] for s in shipments],
+            }
+        else:
+            row = shipped.get(lot["public_id"], {"sent": 0, "ids": []})
+        total = lot.get("total_bora_count") or 0
+        ops.append(
+            UpdateOne(
+                {"_id": lot["_id"]},
+                {
+                    "$set": {
+                        "shipped_bora_count": row["sent"],
+                        "remaining_bora_count": total - row["sent"],
+                        "shipment_details": row["ids"],
+                    }
+                },
+            )
+        )
+        if len(ops) >= CHUNK_SIZE:
+            updated += db.lot.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.lot.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+def backfill_updated_at(db) -> int:
+    """Give documents written before `updated_at` was kept one, for delta sync.
+
+    Without it they all sort at the very start of a sync and cannot be paged.
+    The stamp is `created_at` (`date` for ledger entries), so clients that
+    already hold these documents are not sent them again.
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    stamp = {"$ifNull": ["$created_at", {"$ifNull": ["$date", now]}]}
+    updated = 0
+    for name in SYNC_COLLECTIONS:
+        collection = db.get_collection(name)
+        collection.create_index([("updated_at", ASCENDING)], name="updated_at")
+        updated += collection.update_many(
+            {"updated_at": None}, [{"$set": {"updated_at": stamp}}]
+        ).modified_count
+    return updated
+
+
+def backfill_search_keys(db) -> int:
+    """Write the lower-cased `search` copies /search matches prefixes against.
+
+    New writes keep them; this covers documents from before. Safe to re-run.
+    """
+    updated = 0
+    for name, fields in SEARCH_FIELDS.items():
+        updated += db.get_collection(name).update_many(
+            {},
+            [{"$set": {f"search.{field}": {"$toLower": f"${field}"} for field in fields}}],
+        ).modified_count
+    return updated
+
+
+def embed_shipments(db) -> int:
+    """Move shipments into their lot's `shipments` array, CHUNK_SIZE lots at a time.
+
+    Safe to re-run: each chunk sets the whole array before deleting the
+    source documents. Refuses to start if any lot has more shipments than
+    MAX_EMBEDDED_SHIPMENTS.
+    """
+    too_many = list(
+        db.shipment.aggregate(
+            [
+                {"$group": {"_id": "$lot_id", "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": MAX_EMBEDDED_SHIPMENTS}}},
+                {"$limit": 10},
+            ]
+        )
+    )
+    if too_many:
+        raise SystemExit(
+            f"Lots over the {MAX_EMBEDDED_SHIPMENTS} shipment limit: "
+            + ", ".join(row["_id"] for row in too_many)
+        )
+
+    db.shipment.create_index([("lot_id", ASCENDING), ("created_at", ASCENDING)])
+    moved = 0
+    grouped = {}
+
+    def flush():
+        nonlocal moved
+        if not grouped:
+            return
+        # Orphaned shipments (lot already deleted) stay in the collection.
+        existing = {
+            lot["public_id"]
+            for lot in db.lot.find(
+                {"public_id": {"$in": list(grouped)}}, projection={"public_id": True}
+            )
+        }
+        ops = [
+            UpdateOne({"public_id": lot_id}, {"$set": {"shipments": shipments}})
+            for lot_id, shipments in grouped.items()
+            if lot_id in existing
+        ]
+        if ops:
+            db.lot.bulk_write(ops, ordered=False)
+        ids = [
+            s["_id"]
+            for lot_id, shipments in grouped.items()
+            if lot_id in existing
+            for s in shipments
+        ]
+        moved += db.shipment.delete_many({"_id": {"$in": ids}}).deleted_count
+        grouped.clear()
+
+    current = None
+    for shipment in db.shipment.find({}).sort([("lot_id", ASCENDING), ("created_at", ASCENDING)]):
+        if shipment["lot_id"] != current and len(grouped) >= CHUNK_SIZE:
+            flush()
+        current = shipment["lot_id"]
+        grouped.setdefault(current, []).append(shipment)
+    flush()
+    return moved
+
+
+def unembed_shipments(db) -> int:
+    """Move `lot.shipments` back into the shipment collection. Safe to re-run."""
+    moved = 0
+    ops, lot_ids = [], []
+
+    def flush():
+        nonlocal moved, ops, lot_ids
+        if ops:
+            db.shipment.bulk_write(ops, ordered=False)
+            moved += len(ops)
+        if lot_ids:
+            db.lot.update_many({"_id": {"$in": lot_ids}}, {"$unset": {"shipments": ""}})
+        ops, lot_ids = [], []
+
+    for lot in db.lot.find(
+        {"shipments": {"$exists": True}}, projection={"shipments": True}
+    ):
+        for shipment in lot["shipments"]:
+            ops.append(ReplaceOne({"_id": shipment["_id"]}, shipment, upsert=True))
+        lot_ids.append(lot["_id"])
+        if len(lot_ids) >= CHUNK_SIZE:
+            flush()
+    flush()
+    return moved
+
+
+COMMANDS = {
+    "backfill-bora-counts": backfill_bora_counts,
+    "backfill-updated-at": backfill_updated_at,
+    "backfill-search-keys": backfill_search_keys,
+    "embed-shipments": embed_shipments,
+    "unembed-shipments": unembed_shipments,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sauda data migrations")
+    parser.add_argument("command", choices=list(COMMANDS))
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default=os.getenv("MONGO_DB", "sauda-demo"))
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url)
+    try:
+        print(f"{args.command}: {COMMANDS[args.command](client[args.db])} documents updated")
+    finally:
+        client.close()
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, TypedDict, Literal
+import copy
 import datetime
 from bson import ObjectId
 from enum import Enum
@@ -12,6 +13,7 @@ class SaudaStatus(str, Enum):
     IN_TRANSPORT = "In transport"
     SHIPPED = "Shipped"
     COMPLETED = "Completed"
+    DELETING = "Deleting"
 
 
 def public_id_str():
@@ -28,6 +30,7 @@ class BrokerLedgerEntry(BaseModel):
     amount: float = Field(gt=0, description="Amount")
     mode: Optional[str] = ""
     remarks: Optional[str] = Field("", description="Extra details that be added")
+    updated_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.UTC)) # Omitted
     model_config=ConfigDict(
         populate_by_name = True,
         arbitrary_types_allowed = True,
@@ -115,7 +118,7 @@ class LotModel(BaseModel):
 
     shipment_details: Optional[List[str]] = Field(default_factory=list, description="The public ids of the shippment details.")
     total_bora_count: Optional[int] = Field(default=580, ge=0, description="No. of Boras in a Lot.")
-    shipped_bora_count: Optional[int] = None
+    shipped_bora_count: Optional[int] = Field(default=0, ge=0, description="No. of Boras shipped so far.")
     remaining_bora_count: Optional[int] = Field(default=580, ge=0, description="No. of Boras in a Lot.")
     is_fully_shipped: bool = Field(default=False, description="Whether the lot is fully shipped or not.")
 
@@ -143,3 +146,25 @@ class LotModel(BaseModel):
         arbitrary_types_allowed = True,
         json_encoders = {ObjectId: str},)
 
+
+
+def bulk_documents(model_cls, base: dict, variants: List[dict]) -> List[dict]:
+    """Validate `base` once and stamp out one Mongo document per variant.
+
+    Batch routes build hundreds of documents that only differ in a field or
+    two (`lot_id`, `rice_lot_no`), so validating and dumping every one is
+    wasted work. The first document goes through the model; the rest deep-copy
+    it (so nested lists/dicts are never shared between documents), apply their variant and get fresh `_id`/`public_id` values. Variant
+    values are trusted (ids we generated or looked up) and not re-validated.
+    """
+    if not variants:
+        return []
+    template = model_cls(**base, **variants[0]).model_dump(by_alias=True)
+    documents = []
+    for variant in variants:
+        document = copy.deepcopy(template) | variant
+        document["_id"] = ObjectId()
+        if "public_id" in template:
+            document["public_id"] = public_id_str()
+        documents.append(document)
+    return documents
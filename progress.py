@@ -0,0 +1,118 @@
+from typing import List, Optional
+
+
+def deal_progress(deal_id: str, info: dict, analytics: Optional[dict]) -> dict:
+    """Progress block of a deal from its per-deal analytics group (None if no lots)."""
+    if not analytics:
+        return {
+            "sauda_id": deal_id,
+            "sauda_name": info["name"],
+            "bora_progress": {"shipped": 0, "total": 0},
+            "flap_sticker_progress": {"completed": 0, "total": info["total_lots"]},
+            "gate_pass_progress": {"completed": 0, "total": info["total_lots"]}
+        }
+    deal_response = {
+        "sauda_id": deal_id,
+        "sauda_name": info["name"],
+        "bora_progress": {
+            "shipped": analytics.get("total_shipped_bora", 0),
+            "total": analytics.get("total_bora", 0)
+        },
+        "flap_sticker_progress": {
+            "completed": analytics["flap_sticker_completed_lots"],
+            "total": info["total_lots"]
+        },
+        "gate_pass_progress": {
+            "completed": analytics["gate_pass_completed_lots"],
+            "total": info["total_lots"]
+        }
+    }
+    if analytics["frk_enabled_lots"] > 0:
+        deal_response["frk_progress"] = {
+            "completed": analytics["frk_completed_lots"],
+            "total": info["total_lots"]
+        }
+    return deal_response
+
+
+# A lot's step is done once ANY of its shipments has all of these set. FRK
+# fields are those FRKBhejaModel stores, and only count on `frk` shipments.
+# A missing key counts as not set, the same as null, on both paths below.
+FLAP_STICKER_FIELDS = ("flap_sticker_date", "flap_sticker_via")
+GATE_PASS_FIELDS = ("gate_pass_date", "gate_pass_via")
+FRK_FIELDS = ("frk_bheja.frk_date", "frk_bheja.frk_via", "frk_bheja.frk_qty")
+
+
+def _value(shipment: dict, path: str):
+    for key in path.split("."):
+        shipment = (shipment or {}).get(key)
+    return shipment
+
+
+def lot_analytics(lots: List[dict]) -> Optional[dict]:
+    """In-memory equivalent of `analytics_stages()` for lots carrying `shipments`."""
+    if not lots:
+        return None
+
+    def has(shipments, fields):
+        return int(any(
+            all(_value(s, field) is not None for field in fields) for s in shipments
+        ))
+
+    totals = {
+        "total_shipped_bora": 0,
+        "total_bora": 0,
+        "flap_sticker_completed_lots": 0,
+        "gate_pass_completed_lots": 0,
+        "frk_enabled_lots": 0,
+        "frk_completed_lots": 0,
+    }
+    for lot in lots:
+        shipments = lot.get("shipments") or []
+        frk = [s for s in shipments if s.get("frk") is True]
+        totals["total_shipped_bora"] += lot.get("shipped_bora_count") or 0
+        totals["total_bora"] += lot.get("total_bora_count") or 0
+        totals["flap_sticker_completed_lots"] += has(shipments, FLAP_STICKER_FIELDS)
+        totals["gate_pass_completed_lots"] += has(shipments, GATE_PASS_FIELDS)
+        totals["frk_enabled_lots"] += int(bool(frk))
+        totals["frk_completed_lots"] += has(frk, FRK_FIELDS)
+    return totals
+
+
+def _any_shipment(*conditions) -> dict:
+    """1 if ANY of the lot's `shipments` meets all `conditions`, else 0."""
+    matching = {"$filter": {"input": "$shipments", "as": "s", "cond": {"$and": list(conditions)}}}
+    return {"$cond": [{"$gt": [{"$size": matching}, 0]}, 1, 0]}
+
+
+def _is_set(field: str) -> dict:
+    # `$ne: [missing, null]` is true, so a missing key is folded into null first.
+    return {"$ne": [{"$ifNull": [f"$$s.{field}", None]}, None]}
+
+
+def analytics_stages() -> List[dict]:
+    """Pipeline stages grouping lots (with their `shipments` array) per deal."""
+    is_frk = {"$eq": ["$$s.frk", True]}
+    return [
+        # Per-lot completion flags
+        {
+            "$addFields": {
+                "has_flap_sticker": _any_shipment(*map(_is_set, FLAP_STICKER_FIELDS)),
+                "has_gate_pass": _any_shipment(*map(_is_set, GATE_PASS_FIELDS)),
+                "has_frk_enabled": _any_shipment(is_frk),
+                "has_frk_complete": _any_shipment(is_frk, *map(_is_set, FRK_FIELDS)),
+            }
+        },
+        # Aggregate per deal
+        {
+            "$group": {
+                "_id": "$sauda_id",
+                "total_shipped_bora": {"$sum": "$shipped_bora_count"},
+                "total_bora": {"$sum": "$total_bora_count"},
+                "flap_sticker_completed_lots": {"$sum": "$has_flap_sticker"},
+                "gate_pass_completed_lots": {"$sum": "$has_gate_pass"},
+                "frk_enabled_lots": {"$sum": "$has_frk_enabled"},
+                "frk_completed_lots": {"$sum": "$has_frk_complete"},
+            }
+        },
+    ]
@@ -0,0 +1,133 @@
+"""Local SQLite copy of brokers, saudas and lots for the desktop client.
+
+Every successful read from the backend replaces the matching table, so search
+and status filters are local indexed queries, and the last copy is still
+there to browse when the connection drops. Rows are stored whole as JSON next
+to the columns that are searched or filtered on.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+REPLICA_PATH = os.getenv('TRADING_REPLICA_PATH', os.path.expanduser('~/.trading_replica.db'))
+
+DATE_FIELDS = ('created_at', 'date', 'rice_pass_date')
+
+TABLES = {
+    'brokers': ('name', 'party_name'),
+    'saudas': ('name', 'party_name', 'status', 'rice_agreement'),
+    'lots': ('sauda_id', 'rice_lot_no'),
+}
+INDEXES = {
+    'brokers': ('name', 'party_name'),
+    'saudas': ('name', 'party_name', 'status'),
+    'lots': ('rice_lot_no', 'sauda_id'),
+}
+# Columns covered by the full-text index of each table
+FTS_COLUMNS = {
+    'brokers': ('name', 'party_name'),
+    'saudas': ('name', 'party_name', 'rice_agreement'),
+    'lots': ('rice_lot_no',),
+}
+
+
+def _encode(row):
+    return json.dumps(row, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+
+def _decode(doc):
+    row = json.loads(doc)
+    for field in DATE_FIELDS:
+        if row.get(field):
+            row[field] = datetime.fromisoformat(row[field])
+    return row
+
+
+def fts_query(text):
+    """Prefix match on every word, quoted so FTS operators in input are literal."""
+    words = [w.replace('"', '') for w in text.split()]
+    return ' '.join(f'"{w}"*' for w in words if w)
+
+
+class LocalReplica:
+    """SQLite tables mirroring the dashboard's broker, sauda and lot rows.
+
+    A connection is opened per call, so the replica can be used from the
+    dashboard's worker threads; WAL lets reads run while a refresh writes.
+    """
+
+    def __init__(self, path=REPLICA_PATH):
+        self.path = path
+        self.fts = True
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for table, columns in TABLES.items():
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"(id TEXT PRIMARY KEY, {', '.join(columns)}, doc TEXT NOT NULL)"
+                )
+            for table, columns in INDEXES.items():
+                for column in columns:
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column} COLLATE NOCASE)"
+                    )
+            try:
+                for table, columns in FTS_COLUMNS.items():
+                    conn.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5"
+                        f"({', '.join(columns)}, content='{table}', content_rowid='rowid')"
+                    )
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: search falls back to LIKE
+                self.fts = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def replace(self, table, rows):
+        """Swap the whole table for `rows` in one transaction."""
+        columns = TABLES[table]
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                f"INSERT INTO {table} (id, {', '.join(columns)}, doc) "
+                f"VALUES ({', '.join('?' * (len(columns) + 2))})",
+                [
+                    (str(row['_id']), *(row.get(c) for c in columns), _encode(row))
+                    for row in rows
+                ],
+            )
+            if self.fts:
+                conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        return rows
+
+    def _rows(self, sql, params=()):
+        with self._connect() as conn:
+            return [_decode(doc) for (doc,) in conn.execute(sql, params)]
+
+    def all(self, table):
+        return self._rows(f"SELECT doc FROM {table} ORDER BY rowid")
+
+    def search(self, table, text):
+        if not text.strip():
+            return self.all(table)
+        if self.fts and fts_query(text):
+            return self._rows(
+                f"SELECT t.doc FROM {table}_fts f JOIN {table} t ON t.rowid = f.rowid "
+                f"WHERE {table}_fts MATCH ? ORDER BY f.rank",
+                (fts_query(text),),
+            )
+        columns = FTS_COLUMNS[table]
+        return self._rows(
+            f"SELECT doc FROM {table} WHERE "
+            + ' OR '.join(f"{c} LIKE ? COLLATE NOCASE" for c in columns),
+            [f"%{text.strip()}%"] * len(columns),
+        )
+
+    def saudas_with_status(self, status):
+        return self._rows(
+            "SELECT doc FROM saudas WHERE status = ? COLLATE NOCASE ORDER BY rowid", (status,)
+        )
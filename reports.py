@@ -0,0 +1,227 @@
+"""Sauda status report as an Excel workbook.
+
+Two sheets: "Saudas" (one row per sauda: bora sent vs pending, flap sticker,
+gate pass and FRK lots done vs pending, lots passed vs not passed) and "Lots"
+(the same per lot). Archived saudas are included after the live ones and
+marked in the "Archived" column. Saudas are read from Mongo a batch at a time and their
+rows handed to xlsxwriter in constant-memory mode, which flushes each row to
+disk as soon as the next one starts, so memory does not grow with the size of
+the report. All workbook writing happens in a worker thread.
+"""
+import asyncio
+import datetime
+import os
+
+from archive import archive_name
+from models import SaudaStatus
+from progress import lot_analytics
+
+try:
+    import xlsxwriter
+except ImportError:  # Workbooks need xlsxwriter.
+    xlsxwriter = None
+
+REPORT_DEAL_BATCH = int(os.getenv("REPORT_DEAL_BATCH", 50))
+
+SAUDA_COLUMNS = (
+    ("Sauda", 28), ("Party", 24), ("Broker", 12), ("Status", 16), ("Purchase date", 14),
+    ("Lots", 8), ("Bora total", 11), ("Bora sent", 11), ("Bora pending", 12),
+    ("Flap sticker done", 12), ("Flap sticker pending", 12),
+    ("Gate pass done", 12), ("Gate pass pending", 12),
+    ("FRK done", 10), ("FRK pending", 10),
+    ("Lots passed", 11), ("Lots not passed", 11), ("Archived", 9),
+)
+LOT_COLUMNS = (
+    ("Sauda", 28), ("Lot no", 14), ("Bora total", 11), ("Bora sent", 11), ("Bora pending", 12),
+    ("Flap sticker", 12), ("Gate pass", 10), ("FRK", 10), ("Passed", 8),
+    ("Rice pass date", 14), ("Deposit centre", 20), ("Qtl", 10),
+)
+LOT_FIELDS = {
+    "_id": False,
+    "public_id": True,
+    "rice_lot_no": True,
+    "total_bora_count": True,
+    "shipped_bora_count": True,
+    "rice_pass_date": True,
+    "rice_deposit_centre": True,
+    "qtl": True,
+}
+SHIPMENT_FIELDS = {
+    "_id": False,
+    "lot_id": True,
+    "frk": True,
+    "frk_bheja": True,
+    "flap_sticker_date": True,
+    "flap_sticker_via": True,
+    "gate_pass_date": True,
+    "gate_pass_via": True,
+}
+
+
+class ReportUnavailable(RuntimeError):
+    """xlsxwriter is not installed."""
+
+
+def yes_no(flag) -> str:
+    return "Yes" if flag else "No"
+
+
+def _rows(deal: dict, lots: list, archived: bool):
+    """(sauda row, lot rows) of one deal whose lots carry their `shipments`."""
+    lot_rows = []
+    passed = 0
+    for lot in lots:
+        flags = lot_analytics([lot])
+        total = lot.get("total_bora_count") or 0
+        sent = lot.get("shipped_bora_count") or 0
+        passed += lot.get("rice_pass_date") is not None
+        lot_rows.append((
+            deal["name"],
+            lot.get("rice_lot_no"),
+            total,
+            sent,
+            total - sent,
+            yes_no(flags["flap_sticker_completed_lots"]),
+            yes_no(flags["gate_pass_completed_lots"]),
+            yes_no(flags["frk_completed_lots"]) if flags["frk_enabled_lots"] else "-",
+            yes_no(lot.get("rice_pass_date")),
+            lot.get("rice_pass_date"),
+            lot.get("rice_deposit_centre"),
+            lot.get("qtl") or 0,
+        ))
+
+    totals = lot_analytics(lots) or {}
+    lot_count = len(lots)
+    bora_total = totals.get("total_bora", 0)
+    bora_sent = totals.get("total_shipped_bora", 0)
+    flap = totals.get("flap_sticker_completed_lots", 0)
+    gate = totals.get("gate_pass_completed_lots", 0)
+    frk_lots = totals.get("frk_enabled_lots", 0)
+    frk = totals.get("frk_completed_lots", 0)
+    sauda_row = (
+        deal["name"],
+        deal.get("party_name"),
+        deal.get("broker_id"),
+        deal.get("status"),
+        deal.get("purchase_date"),
+        lot_count,
+        bora_total,
+        bora_sent,
+        bora_total - bora_sent,
+        flap,
+        lot_count - flap,
+        gate,
+        lot_count - gate,
+        frk if frk_lots else None,
+        frk_lots - frk if frk_lots else None,
+        passed,
+        len(lots) - passed,
+        yes_no(archived),
+    )
+    return sauda_row, lot_rows
+
+
+class _Sheet:
+    """A worksheet written strictly top to bottom, as constant-memory mode needs."""
+
+    def __init__(self, workbook, name: str, columns, header, date):
+        self.sheet = workbook.add_worksheet(name)
+        self.date = date
+        self.row = 0
+        for col, (title, width) in enumerate(columns):
+            self.sheet.set_column(col, col, width)
+            self.sheet.write(0, col, title, header)
+        self.sheet.freeze_panes(1, 0)
+        self.width = len(columns)
+
+    def append(self, values):
+        self.row += 1
+        for col, value in enumerate(values):
+            if isinstance(value, datetime.datetime):
+                self.sheet.write_datetime(self.row, col, value.replace(tzinfo=None), self.date)
+            elif value is not None:
+                self.sheet.write(self.row, col, value)
+
+    def finish(self):
+        self.sheet.autofilter(0, 0, self.row, self.width - 1)
+
+
+async def _deal_batches(state, batch_size: int):
+    """(deals, shipment store, archived) batches: live saudas first, then archived ones."""
+    archive = state.deal_collection.database.get_collection(archive_name("deal"))
+    for deals, store, archived in (
+        (state.deal_collection, state.shipment_store, False),
+        (archive, state.shipment_store.archive(), True),
+    ):
+        batch = []
+        async for deal in deals.find(
+            {"status": {"$ne": SaudaStatus.DELETING.value}},
+            projection={"_id": False, "public_id": True, "name": True, "party_name": True,
+                        "broker_id": True, "status": True, "purchase_date": True},
+        ).sort("purchase_date", 1):
+            batch.append(deal)
+            if len(batch) == batch_size:
+                yield batch, store, archived
+                batch = []
+        if batch:
+            yield batch, store, archived
+
+
+async def _lots_with_shipments(store, deal_id: str) -> list:
+    lots, shipments = await asyncio.gather(
+        store.lots.find({"sauda_id": deal_id}, projection=LOT_FIELDS)
+        .sort("_id", 1)
+        .to_list(),
+        store.list(deal_id, projection=SHIPMENT_FIELDS),
+    )
+    by_lot = {}
+    for shipment in shipments:
+        by_lot.setdefault(shipment["lot_id"], []).append(shipment)
+    for lot in lots:
+        lot["shipments"] = by_lot.get(lot["public_id"], [])
+    return lots
+
+
+async def write_status_workbook(state, sink, batch_size: int = REPORT_DEAL_BATCH) -> dict:
+    """Write the sauda status workbook to `sink` (a path or file); returns row counts.
+
+    `state` is the app state (collections and shipment store). Mongo is read
+    on the event loop, one batch of saudas at a time; building and writing the
+    rows of each batch happens in a worker thread.
+    """
+    if xlsxwriter is None:
+        raise ReportUnavailable("Excel reports need the xlsxwriter package.")
+
+    def open_workbook():
+        workbook = xlsxwriter.Workbook(sink, {"constant_memory": True})
+        header = workbook.add_format({"bold": True, "bg_color": "#D9E1F2", "border": 1})
+        date = workbook.add_format({"num_format": "dd-mm-yyyy"})
+        return (
+            workbook,
+            _Sheet(workbook, "Saudas", SAUDA_COLUMNS, header, date),
+            _Sheet(workbook, "Lots", LOT_COLUMNS, header, date),
+        )
+
+    workbook, saudas, lots = await asyncio.to_thread(open_workbook)
+
+    def write(deals, deal_lots, archived):
+        for deal, lots_of_deal in zip(deals, deal_lots):
+            sauda_row, lot_rows = _rows(deal, lots_of_deal, archived)
+            saudas.append(sauda_row)
+            for lot_row in lot_rows:
+                lots.append(lot_row)
+
+    def close():
+        saudas.finish()
+        lots.finish()
+        workbook.close()
+
+    try:
+        async for deals, store, archived in _deal_batches(state, batch_size):
+            deal_lots = await asyncio.gather(
+                *(_lots_with_shipments(store, deal["public_id"]) for deal in deals)
+            )
+            await asyncio.to_thread(write, deals, deal_lots, archived)
+    finally:
+        await asyncio.to_thread(close)
+    return {"saudas": saudas.row, "lots": lots.row}
@@ -0,0 +1,212 @@
+"""Import of the govt rice-pass sheets (CSV or XLSX) into the lots.
+
+The file is read a chunk of rows at a time in a worker thread, every row is
+validated against the route's model, and each chunk is written with one
+unordered bulk_write, so memory stays flat however long the sheet is.
+Rows that fail come back in the report with their sheet row number.
+"""
+import asyncio
+import csv
+import datetime
+import io
+import os
+import zipfile
+from itertools import islice
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+try:
+    import openpyxl
+except ImportError:  # XLSX uploads need openpyxl, CSV works without it.
+    openpyxl = None
+
+RICE_PASS_CHUNK_SIZE = int(os.getenv("RICE_PASS_CHUNK_SIZE", 500))
+# Errors listed in the report; past this they are only counted.
+RICE_PASS_MAX_ERRORS = int(os.getenv("RICE_PASS_MAX_ERRORS", 1000))
+
+# Column headings used on the govt sheets, normalised (lower case, "_" for spaces).
+HEADER_ALIASES = {
+    "lot_no": "rice_lot_no",
+    "lot_number": "rice_lot_no",
+    "rice_lot_number": "rice_lot_no",
+    "pass_date": "rice_pass_date",
+    "deposit_centre": "rice_deposit_centre",
+    "deposit_center": "rice_deposit_centre",
+    "rice_deposit_center": "rice_deposit_centre",
+    "quintal": "qtl",
+    "bags": "rice_bags_quantity",
+    "no_of_bags": "rice_bags_quantity",
+    "moisture": "moisture_cut",
+}
+DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y")
+
+
+class UnsupportedSheet(Exception):
+    """The upload is neither CSV nor XLSX (or XLSX support is not installed)."""
+
+
+class SheetError(Exception):
+    """The sheet could not be read at all."""
+
+
+# What a broken upload raises while it is being read.
+READ_ERRORS = (UnicodeDecodeError, csv.Error, zipfile.BadZipFile, ValueError, KeyError)
+
+
+def normalise_header(heading) -> str:
+    name = "_".join(str(heading or "").strip().lower().replace(".", " ").split())
+    return HEADER_ALIASES.get(name, name)
+
+
+def parse_cell(value):
+    """Empty cells become None; day-first dates as the govt site writes them."""
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                pass
+    return value
+
+
+def _records(header, rows, first_row: int):
+    columns = [normalise_header(heading) for heading in header]
+    for number, values in enumerate(rows, start=first_row):
+        record = {
+            column: parse_cell(value)
+            for column, value in zip(columns, values)
+            if column
+        }
+        lot_no = record.get("rice_lot_no")
+        if lot_no is not None and not isinstance(lot_no, str):
+            # Spreadsheets turn numeric lot numbers into 1234 or 1234.0.
+            record["rice_lot_no"] = str(int(lot_no)) if float(lot_no).is_integer() else str(lot_no)
+        if any(value is not None for value in record.values()):
+            yield number, {k: v for k, v in record.items() if v is not None}
+
+
+def read_sheet(file, filename: str):
+    """(sheet row number, {field: value}) for each non-empty row of the upload."""
+    if filename.lower().endswith(".csv"):
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        rows = csv.reader(text)
+        yield from _records(next(rows, []), rows, 2)
+    elif filename.lower().endswith((".xlsx", ".xlsm")):
+        if openpyxl is None:
+            raise UnsupportedSheet("XLSX import needs the openpyxl package.")
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            yield from _records(next(rows, ()), rows, 2)
+        finally:
+            workbook.close()
+    else:
+        raise UnsupportedSheet("Upload a .csv or .xlsx file.")
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.aborted = None
+        self.lots_by_deal = {}
+
+    def error(self, row: int, rice_lot_no, *messages):
+        self.failed += 1
+        if len(self.errors) < RICE_PASS_MAX_ERRORS:
+            self.errors.append({"row": row, "rice_lot_no": rice_lot_no, "errors": list(messages)})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted": self.aborted,
+        }
+
+
+def delivery_fields(update) -> dict:
+    """The lot `$set` for a validated delivery row."""
+    return update.model_dump(exclude={"rice_lot_no"}) | {
+        "is_fully_shipped": True,
+        "updated_at": datetime.datetime.now(datetime.UTC),
+    }
+
+
+async def _write_chunk(lot_collection, chunk, report: ImportReport):
+    # Last row wins when a sheet lists the same lot twice in one chunk.
+    by_lot = {update.rice_lot_no: (row, update) for row, update in chunk}
+    lots = {}
+    async for lot in lot_collection.find(
+        {"rice_lot_no": {"$in": list(by_lot)}},
+        projection={"_id": True, "public_id": True, "sauda_id": True, "rice_lot_no": True},
+    ):
+        lots.setdefault(lot["rice_lot_no"], []).append(lot)
+
+    operations, targets = [], []
+    for lot_no, (row, update) in by_lot.items():
+        found = lots.get(lot_no, [])
+        if len(found) != 1:
+            report.error(row, lot_no, "Lot not found." if not found else "Lot number is not unique.")
+            continue
+        operations.append(UpdateOne({"_id": found[0]["_id"]}, {"$set": delivery_fields(update)}))
+        targets.append((row, found[0]))
+    if not operations:
+        return
+
+    failed = set()
+    try:
+        await lot_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed.add(error["index"])
+            row, lot = targets[error["index"]]
+            report.error(row, lot["rice_lot_no"], error.get("errmsg", "Write failed."))
+    for index, (row, lot) in enumerate(targets):
+        if index not in failed:
+            report.updated += 1
+            report.lots_by_deal.setdefault(lot["sauda_id"], []).append(lot["public_id"])
+
+
+async def import_rice_pass(
+    file, filename: str, model_cls, lot_collection, chunk_size: int = RICE_PASS_CHUNK_SIZE
+) -> ImportReport:
+    """Validate the sheet's rows as `model_cls` and apply them chunk by chunk.
+
+    A file that breaks part way keeps the chunks already written; the report
+    says where reading stopped.
+    """
+    report = ImportReport()
+    rows = read_sheet(file, filename)
+    while True:
+        try:
+            records = await asyncio.to_thread(lambda: list(islice(rows, chunk_size)))
+        except READ_ERRORS as e:
+            if not report.rows:
+                raise SheetError(f"Could not read the sheet: {e}") from e
+            report.aborted = f"Stopped after {report.rows} rows: {e}"
+            return report
+        if not records:
+            return report
+        chunk = []
+        for row, record in records:
+            report.rows += 1
+            try:
+                chunk.append((row, model_cls(**record)))
+            except ValidationError as e:
+                report.error(
+                    row,
+                    record.get("rice_lot_no"),
+                    *(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()),
+                )
+        if chunk:
+            await _write_chunk(lot_collection, chunk, report)
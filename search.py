@@ -0,0 +1,138 @@
+import asyncio
+import re
+
+from models import SaudaStatus
+
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# Ranking boosts on top of MongoDB's text score.
+EXACT_MATCH = 10.0
+PREFIX_MATCH = 5.0
+
+# Searched fields, also stored lower-cased under `search` on every write so a
+# case-insensitive prefix is still an anchored regex the index can bound.
+SEARCH_FIELDS = {
+    "deal": ("name", "party_name", "rice_agreement"),
+    "lot": ("rice_lot_no",),
+    "broker": ("name", "broker_id"),
+}
+
+
+def _lowered(collection: str, values: dict) -> dict:
+    return {
+        field: str(values[field]).lower()
+        for field in SEARCH_FIELDS[collection]
+        if values.get(field) is not None
+    }
+
+
+def search_keys(collection: str, values: dict) -> dict:
+    """`$set` entries for the search copies of the searched fields in `values`."""
+    return {f"search.{field}": value for field, value in _lowered(collection, values).items()}
+
+
+def with_search_keys(collection: str, document: dict) -> dict:
+    """`document` with its `search` copies, for inserts."""
+    return document | {"search": _lowered(collection, document)}
+
+
+def _prefix(field: str, q: str) -> dict:
+    # Anchored regexes on the lower-cased copy are answered from the index bounds.
+    return {f"search.{field}": {"$regex": f"^{re.escape(q.lower())}"}}
+
+
+def _rank(q: str, values, text_score: float = 0.0) -> float:
+    score = text_score
+    lowered = q.lower()
+    for value in values:
+        value = (value or "").lower()
+        if value == lowered:
+            return score + EXACT_MATCH
+        if value.startswith(lowered):
+            score = max(score, text_score + PREFIX_MATCH)
+    return score
+
+
+async def _deals(db, q: str, limit: int) -> list:
+    projection = {
+        "_id": False,
+        "public_id": True,
+        "name": True,
+        "party_name": True,
+        "rice_agreement": True,
+        "status": True,
+    }
+    not_deleting = {"status": {"$ne": SaudaStatus.DELETING.value}}
+    text_hits, prefix_hits = await asyncio.gather(
+        db.deal.find(
+            {"$text": {"$search": q}} | not_deleting,
+            projection=projection | {"score": {"$meta": "textScore"}},
+            limit=limit,
+        ).sort([("score", {"$meta": "textScore"})]).to_list(),
+        db.deal.find(
+            {
+                "$or": [_prefix(field, q) for field in SEARCH_FIELDS["deal"]]
+            }
+            | not_deleting,
+            projection=projection,
+            limit=limit,
+        ).to_list(),
+    )
+    deals = {}
+    for deal in text_hits + prefix_hits:
+        score = _rank(
+            q,
+            (deal.get("name"), deal.get("party_name"), deal.get("rice_agreement")),
+            deal.pop("score", 0.0),
+        )
+        if deal["public_id"] not in deals or deals[deal["public_id"]]["score"] < score:
+            deals[deal["public_id"]] = {"type": "deal", "score": score, **deal}
+    return list(deals.values())
+
+
+async def _lots(db, q: str, limit: int) -> list:
+    # Lots are only removed at the end of the delete job; hide them as soon as
+    # their deal is marked DELETING, like `_deals` does for the deal itself.
+    deleting = await db.deal.distinct("public_id", {"status": SaudaStatus.DELETING.value})
+    lots = await db.lot.find(
+        _prefix("rice_lot_no", q) | {"sauda_id": {"$nin": deleting}},
+        projection={"_id": False, "public_id": True, "sauda_id": True, "rice_lot_no": True},
+        limit=limit,
+    ).to_list()
+    return [{"type": "lot", "score": _rank(q, (lot.get("rice_lot_no"),)), **lot} for lot in lots]
+
+
+async def _brokers(db, q: str, limit: int) -> list:
+    projection = {"_id": False, "broker_id": True, "name": True}
+    text_hits, prefix_hits = await asyncio.gather(
+        db.broker.find(
+            {"$text": {"$search": q}},
+            projection=projection | {"score": {"$meta": "textScore"}},
+            limit=limit,
+        ).sort([("score", {"$meta": "textScore"})]).to_list(),
+        db.broker.find(
+            {"$or": [_prefix(field, q) for field in SEARCH_FIELDS["broker"]]},
+            projection=projection,
+            limit=limit,
+        ).to_list(),
+    )
+    brokers = {}
+    for broker in text_hits + prefix_hits:
+        score = _rank(q, (broker.get("name"), broker.get("broker_id")), broker.pop("score", 0.0))
+        if broker["broker_id"] not in brokers or brokers[broker["broker_id"]]["score"] < score:
+            brokers[broker["broker_id"]] = {"type": "broker", "score": score, **broker}
+    return list(brokers.values())
+
+
+SEARCHERS = {"deal": _deals, "lot": _lots, "broker": _brokers}
+
+
+async def search(db, q: str, types, limit: int = SEARCH_LIMIT) -> list:
+    """Ranked matches for `q` across deals, lots and brokers, best first."""
+    results = await asyncio.gather(*(SEARCHERS[t](db, q, limit) for t in types))
+    hits = [hit for result in results for hit in result]
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    for hit in hits:
+        hit["score"] = round(hit["score"], 3)
+    return hits[:limit]
@@ -0,0 +1,404 @@
+import datetime
+import os
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from archive import archive_name
+from fieldsets import apply_projection
+
+# Shipments live either in their own `shipment` collection (linked through
+# `lot.shipment_details` and `shipment.lot_id`) or embedded in the lot as a
+# bounded `shipments` sub-array. Pick with SHIPMENT_STORAGE=collection|embedded
+# and move existing data with `python migrations.py embed-shipments`.
+SHIPMENT_STORAGE = os.getenv("SHIPMENT_STORAGE", "collection")
+MAX_EMBEDDED_SHIPMENTS = int(os.getenv("MAX_EMBEDDED_SHIPMENTS", 100))
+
+# Fields never returned by the shipment read routes.
+HIDDEN_FIELDS = ("_id", "created_at", "updated_at")
+SHIPMENT_PROJECTION = {field: False for field in HIDDEN_FIELDS}
+
+# Retries for embedded read-modify-write when a concurrent write got there first.
+CAS_RETRIES = 5
+
+
+class ShipmentLimitError(Exception):
+    """A lot already holds MAX_EMBEDDED_SHIPMENTS shipments (or does not exist).
+
+    From `add_many`, `added` holds the shipments of the batch that did go in.
+    """
+
+    def __init__(self, message: str, added: List[dict] = ()):
+        super().__init__(message)
+        self.added = list(added)
+
+
+def lot_shipment_update(
+    public_shipment_id: Optional[str], bora_delta: Optional[int], link: Optional[bool] = True
+) -> dict:
+    """Atomic lot update for a shipment write.
+
+    `bora_delta` bora move from remaining to shipped (negative to give them
+    back). `link` adds the shipment to `shipment_details`, `link=False`
+    removes it, `link=None` leaves the list alone.
+    """
+    bora_delta = bora_delta or 0
+    update = {
+        "$inc": {"shipped_bora_count": bora_delta, "remaining_bora_count": -bora_delta},
+        "$set": {"updated_at": datetime.datetime.now(datetime.UTC)},
+    }
+    if link is True:
+        update["$push"] = {"shipment_details": public_shipment_id}
+    elif link is False:
+        update["$pull"] = {"shipment_details": public_shipment_id}
+    return update
+
+
+def public_view(shipment: dict, projection: dict = SHIPMENT_PROJECTION) -> dict:
+    return apply_projection(shipment, projection)
+
+
+class _ShipmentStore:
+    def __init__(self, shipment_collection, lot_collection):
+        self.shipments = shipment_collection
+        self.lots = lot_collection
+
+    def archive(self):
+        """The same store over the archive collections, for archived saudas' reads."""
+        db = self.lots.database
+        return type(self)(
+            db.get_collection(archive_name("shipment")), db.get_collection(archive_name("lot"))
+        )
+
+
+class CollectionShipmentStore(_ShipmentStore):
+    """Shipments in the `shipment` collection, counters on the lot."""
+
+    embedded = False
+
+    async def add(self, shipment: dict):
+        await self.shipments.insert_one(shipment)
+        await self.lots.update_one(
+            {"public_id": shipment["lot_id"]},
+            lot_shipment_update(shipment["public_id"], shipment["sent_bora_count"]),
+        )
+
+    async def add_many(self, shipments: List[dict], fanout):
+        await self.shipments.insert_many(shipments)
+        await fanout.gather(
+            self.lots.update_one(
+                {"public_id": shipment["lot_id"]},
+                lot_shipment_update(shipment["public_id"], shipment["sent_bora_count"]),
+            )
+            for shipment in shipments
+        )
+
+    async def get(
+        self, public_shipment_id: str, projection: dict = SHIPMENT_PROJECTION
+    ) -> Optional[dict]:
+        return await self.shipments.find_one(
+            {"public_id": public_shipment_id}, projection=projection
+        )
+
+    async def list(
+        self,
+        sauda_id: str,
+        lot_id: Optional[str] = None,
+        projection: dict = SHIPMENT_PROJECTION,
+    ) -> List[dict]:
+        query = {"sauda_id": sauda_id}
+        if lot_id is not None:
+            query["lot_id"] = lot_id
+        return await self.shipments.find(query, projection=projection).to_list()
+
+    async def get_many(
+        self, public_shipment_ids: List[str], projection: dict = SHIPMENT_PROJECTION
+    ) -> List[dict]:
+        return await self.shipments.find(
+            {"public_id": {"$in": public_shipment_ids}}, projection=projection
+        ).to_list()
+
+    async def lot_with_shipments(
+        self,
+        sauda_id: str,
+        lot_id: str,
+        lot_projection: dict,
+        projection: dict = SHIPMENT_PROJECTION,
+    ) -> Tuple[Optional[dict], List[dict]]:
+        lot = await self.lots.find_one(
+            {"public_id": lot_id}, projection=lot_projection
+        )
+        return lot, await self.list(sauda_id, lot_id, projection)
+
+    async def first_for_lot(self, lot_id: str) -> Optional[dict]:
+        return await self.shipments.find_one(
+            {"lot_id": lot_id}, projection={"_id": False, "frk": True, "frk_bheja": True}
+        )
+
+    async def update(self, public_shipment_id: str, update_data: dict) -> bool:
+        before = await self.shipments.find_one_and_update(
+            {"public_id": public_shipment_id},
+            {"$set": update_data},
+            projection={"_id": False, "lot_id": True, "sent_bora_count": True},
+        )
+        if before is None:
+            return False
+        if "sent_bora_count" in update_data:
+            delta = update_data["sent_bora_count"] - (before.get("sent_bora_count") or 0)
+            if delta:
+                await self.lots.update_one(
+                    {"public_id": before["lot_id"]},
+                    lot_shipment_update(public_shipment_id, delta, link=None),
+                )
+        return True
+
+    async def update_many(self, public_shipment_ids: List[str], update_data: dict):
+        lot_deltas = {}
+        if "sent_bora_count" in update_data:
+            async for shipment in self.shipments.find(
+                {"public_id": {"$in": public_shipment_ids}},
+                projection={"_id": False, "lot_id": True, "sent_bora_count": True},
+            ):
+                delta = update_data["sent_bora_count"] - (shipment.get("sent_bora_count") or 0)
+                lot_deltas[shipment["lot_id"]] = lot_deltas.get(shipment["lot_id"], 0) + delta
+        await self.shipments.update_many(
+            {"public_id": {"$in": public_shipment_ids}},
+            {"$set": update_data},
+            upsert=False,
+        )
+        lot_ops = [
+            UpdateOne({"public_id": lot_id}, lot_shipment_update(None, delta, link=None))
+            for lot_id, delta in lot_deltas.items()
+            if delta
+        ]
+        if lot_ops:
+            await self.lots.bulk_write(lot_ops, ordered=False)
+
+    async def delete(self, sauda_id: str, lot_id: str, public_shipment_id: str) -> bool:
+        deleted = await self.shipments.find_one_and_delete(
+            {"public_id": public_shipment_id, "lot_id": lot_id, "sauda_id": sauda_id},
+            projection={"_id": False, "sent_bora_count": True},
+        )
+        if deleted is None:
+            return False
+        await self.lots.update_one(
+            {"public_id": lot_id},
+            lot_shipment_update(
+                public_shipment_id, -(deleted.get("sent_bora_count") or 0), link=False
+            ),
+        )
+        return True
+
+    async def delete_for_lots(self, lot_ids: List[str]) -> List[str]:
+        """Drop shipments of these lots; the caller resets the lot counters.
+
+        Returns the public ids of the dropped shipments.
+        """
+        query = {"lot_id": {"$in": lot_ids}}
+        deleted = await self.shipments.distinct("public_id", query)
+        await self.shipments.delete_many(query)
+        return deleted
+
+    async def delete_for_deal(self, sauda_id: str) -> List[str]:
+        query = {"sauda_id": sauda_id}
+        deleted = await self.shipments.distinct("public_id", query)
+        await self.shipments.delete_many(query)
+        return deleted
+
+
+class EmbeddedShipmentStore(_ShipmentStore):
+    """Shipments embedded in `lot.shipments`, at most MAX_EMBEDDED_SHIPMENTS per lot.
+
+    Adding or removing a shipment and moving its bora between the lot counters
+    is a single-document update, so it is atomic without transactions.
+    """
+
+    embedded = True
+
+    def _push(self, shipment: dict) -> Tuple[dict, dict]:
+        query = {
+            "public_id": shipment["lot_id"],
+            f"shipments.{MAX_EMBEDDED_SHIPMENTS - 1}": {"$exists": False},
+        }
+        update = lot_shipment_update(shipment["public_id"], shipment["sent_bora_count"])
+        update["$push"]["shipments"] = shipment
+        return query, update
+
+    async def add(self, shipment: dict):
+        result = await self.lots.update_one(*self._push(shipment))
+        if result.matched_count == 0:
+            raise ShipmentLimitError(shipment["lot_id"])
+
+    async def add_many(self, shipments: List[dict], fanout):
+        results = await fanout.gather(
+            self.lots.update_one(*self._push(shipment)) for shipment in shipments
+        )
+        added = [s for s, result in zip(shipments, results) if result.matched_count]
+        if len(added) != len(shipments):
+            rejected = [s["lot_id"] for s, result in zip(shipments, results) if not result.matched_count]
+            raise ShipmentLimitError(
+                f"{len(rejected)} lot(s) full or missing: {', '.join(rejected)}", added
+            )
+
+    async def get(
+        self, public_shipment_id: str, projection: dict = SHIPMENT_PROJECTION
+    ) -> Optional[dict]:
+        lot = await self.lots.find_one(
+            {"shipments.public_id": public_shipment_id},
+            projection={"_id": False, "shipments.$": True},
+        )
+        return public_view(lot["shipments"][0], projection) if lot else None
+
+    async def list(
+        self,
+        sauda_id: str,
+        lot_id: Optional[str] = None,
+        projection: dict = SHIPMENT_PROJECTION,
+    ) -> List[dict]:
+        query = {"sauda_id": sauda_id}
+        if lot_id is not None:
+            query["public_id"] = lot_id
+        shipments = []
+        async for lot in self.lots.find(query, projection={"_id": False, "shipments": True}):
+            shipments.extend(public_view(s, projection) for s in lot.get("shipments") or [])
+        return shipments
+
+    async def get_many(
+        self, public_shipment_ids: List[str], projection: dict = SHIPMENT_PROJECTION
+    ) -> List[dict]:
+        wanted = set(public_shipment_ids)
+        shipments = []
+        async for lot in self.lots.find(
+            {"shipments.public_id": {"$in": public_shipment_ids}},
+            projection={"_id": False, "shipments": True},
+        ):
+            shipments.extend(
+                public_view(s, projection)
+                for s in lot.get("shipments") or []
+                if s.get("public_id") in wanted
+            )
+        return shipments
+
+    async def lot_with_shipments(
+        self,
+        sauda_id: str,
+        lot_id: str,
+        lot_projection: dict,
+        projection: dict = SHIPMENT_PROJECTION,
+    ) -> Tuple[Optional[dict], List[dict]]:
+        lot = await self.lots.find_one(
+            {"public_id": lot_id}, projection=lot_projection | {"shipments": True}
+        )
+        if lot is None:
+            return None, []
+        shipments = [
+            public_view(s, projection)
+            for s in lot.pop("shipments", None) or []
+            if s.get("sauda_id") == sauda_id
+        ]
+        return lot, shipments
+
+    async def first_for_lot(self, lot_id: str) -> Optional[dict]:
+        lot = await self.lots.find_one(
+            {"public_id": lot_id},
+            projection={"_id": False, "shipments": {"$slice": 1}},
+        )
+        if not lot or not lot.get("shipments"):
+            return None
+        first = lot["shipments"][0]
+        return {"frk": first.get("frk", False), "frk_bheja": first.get("frk_bheja")}
+
+    async def _sent_bora(self, query: dict, public_shipment_id: str) -> Optional[Tuple[str, Optional[int]]]:
+        """Owning lot and stored `sent_bora_count` (possibly None) of a shipment."""
+        lot = await self.lots.find_one(
+            query | {"shipments.public_id": public_shipment_id},
+            projection={"_id": False, "public_id": True, "shipments.$": True},
+        )
+        if lot is None:
+            return None
+        return lot["public_id"], lot["shipments"][0].get("sent_bora_count")
+
+    async def update(self, public_shipment_id: str, update_data: dict) -> bool:
+        for _ in range(CAS_RETRIES):
+            found = await self._sent_bora({}, public_shipment_id)
+            if found is None:
+                return False
+            lot_id, old_sent = found
+            delta = update_data.get("sent_bora_count", old_sent or 0) - (old_sent or 0)
+            update = lot_shipment_update(public_shipment_id, delta, link=None)
+            update["$set"].update(
+                {f"shipments.$.{field}": value for field, value in update_data.items()}
+            )
+            # Only applies if the shipment still has the count we read.
+            result = await self.lots.update_one(
+                {
+                    "public_id": lot_id,
+                    "shipments": {
+                        "$elemMatch": {"public_id": public_shipment_id, "sent_bora_count": old_sent}
+                    },
+                },
+                update,
+            )
+            if result.matched_count:
+                return True
+        raise RuntimeError(f"Shipment {public_shipment_id} kept changing, update abandoned.")
+
+    async def update_many(self, public_shipment_ids: List[str], update_data: dict):
+        if "sent_bora_count" in update_data:
+            for public_shipment_id in public_shipment_ids:
+                await self.update(public_shipment_id, update_data)
+            return
+        await self.lots.update_many(
+            {"shipments.public_id": {"$in": public_shipment_ids}},
+            {
+                "$set": {
+                    f"shipments.$[s].{field}": value for field, value in update_data.items()
+                }
+                | {"updated_at": datetime.datetime.now(datetime.UTC)}
+            },
+            array_filters=[{"s.public_id": {"$in": public_shipment_ids}}],
+        )
+
+    async def delete(self, sauda_id: str, lot_id: str, public_shipment_id: str) -> bool:
+        for _ in range(CAS_RETRIES):
+            found = await self._sent_bora(
+                {"public_id": lot_id, "sauda_id": sauda_id}, public_shipment_id
+            )
+            if found is None:
+                return False
+            _, old_sent = found
+            update = lot_shipment_update(public_shipment_id, -(old_sent or 0), link=False)
+            update["$pull"]["shipments"] = {"public_id": public_shipment_id}
+            result = await self.lots.update_one(
+                {
+                    "public_id": lot_id,
+                    "shipments": {
+                        "$elemMatch": {"public_id": public_shipment_id, "sent_bora_count": old_sent}
+                    },
+                },
+                update,
+            )
+            if result.matched_count:
+                return True
+        raise RuntimeError(f"Shipment {public_shipment_id} kept changing, delete abandoned.")
+
+    async def delete_for_lots(self, lot_ids: List[str]) -> List[str]:
+        query = {"public_id": {"$in": lot_ids}}
+        deleted = await self.lots.distinct("shipments.public_id", query)
+        await self.lots.update_many(
+            query,
+            {"$set": {"shipments": [], "updated_at": datetime.datetime.now(datetime.UTC)}},
+        )
+        return deleted
+
+    async def delete_for_deal(self, sauda_id: str) -> List[str]:
+        # Embedded shipments go with their lots.
+        return []
+
+
+def create_shipment_store(shipment_collection, lot_collection, mode: str = SHIPMENT_STORAGE):
+    if mode == "embedded":
+        return EmbeddedShipmentStore(shipment_collection, lot_collection)
+    if mode == "collection":
+        return CollectionShipmentStore(shipment_collection, lot_collection)
+    raise ValueError(f"Unknown SHIPMENT_STORAGE {mode!r}, use 'collection' or 'embedded'.")
@@ -0,0 +1,142 @@
+"""Delta sync: what changed in the sauda collections since a watermark.
+
+Every synced document carries `updated_at`, and deletes leave a tombstone
+`{collection, public_id, deal_id, deleted_at}` behind. A client keeps the
+`watermark` of its last response and passes it back as `since`; without one
+it gets everything. Changes are only reported up to SYNC_SETTLE_SECONDS ago,
+so a write stamped before a sync but committed after it still lands in the
+next one.
+
+A long sync comes in pages, and a page's watermark can be as old as the
+documents on it. While `has_more` is true the client also passes back
+`started`, the point its pass resumed from. Tombstone coverage is checked
+against that point, not against the page watermark.
+"""
+import asyncio
+import datetime
+import os
+from typing import List, Optional
+
+SYNC_COLLECTIONS = ("deal", "lot", "shipment", "broker", "ledger")
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", 5))
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", 5000))
+# Tombstones expire through the TTL index on `deleted_at`; older watermarks
+# can no longer be served and need a full sync.
+TOMBSTONE_TTL = int(os.getenv("TOMBSTONE_TTL", 30 * 24 * 60 * 60))
+
+# Legacy documents without `updated_at` sort first and only show up in a full sync.
+NEVER = datetime.datetime.min
+
+
+def now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC)
+
+
+def utc(moment: datetime.datetime) -> datetime.datetime:
+    """Mongo hands back naive UTC datetimes; compare and report them as aware."""
+    return moment if moment.tzinfo else moment.replace(tzinfo=datetime.UTC)
+
+
+def stamp(document: dict, field: str) -> datetime.datetime:
+    return utc(document.get(field) or NEVER)
+
+
+async def record_deletes(
+    tombstones, collection: str, public_ids: List[str], deal_id: Optional[str] = None
+):
+    if not public_ids:
+        return
+    deleted_at = now()
+    await tombstones.insert_many(
+        [
+            {
+                "collection": collection,
+                "public_id": public_id,
+                "deal_id": deal_id,
+                "deleted_at": deleted_at,
+            }
+            for public_id in public_ids
+        ]
+    )
+
+
+def _window(field: str, since, upper) -> dict:
+    # `$not: {$gt}` rather than `$lte` so a full sync also matches documents
+    # that have no `updated_at` at all.
+    if since is None:
+        return {field: {"$not": {"$gt": upper}}}
+    return {field: {"$gt": since, "$lte": upper}}
+
+
+async def _changed(collection, query: dict, field: str, projection: dict, limit: Optional[int]):
+    cursor = collection.find(query, projection=projection).sort([(field, 1), ("_id", 1)])
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list()
+
+
+def expired(since: Optional[datetime.datetime], started: Optional[datetime.datetime]) -> bool:
+    """Whether deletes after the client's last complete sync may be gone already."""
+    resumed = started or since
+    if resumed is None:
+        return False
+    return utc(resumed) < now() - datetime.timedelta(seconds=TOMBSTONE_TTL)
+
+
+async def changes_since(
+    sources: dict,
+    tombstones,
+    since: Optional[datetime.datetime],
+    page_size: int = SYNC_PAGE_SIZE,
+    started: Optional[datetime.datetime] = None,
+) -> dict:
+    """Changed documents per collection plus tombstones, in one consistent window.
+
+    `sources` maps a sync name to `(collection, projection)`. Each collection
+    reads at most `page_size` rows; when one is cut short, every collection is
+    trimmed to the same point in time and `has_more` tells the client to ask
+    again from the returned watermark, passing `started` back as well.
+    """
+    upper = now() - datetime.timedelta(seconds=SYNC_SETTLE_SECONDS)
+    if since is not None:
+        since = utc(since)
+        upper = max(upper, since)
+    started = utc(started) if started is not None else since if since is not None else upper
+    sources = dict(sources) | {"deleted": (tombstones, {"_id": False})}
+    fields = {name: "deleted_at" if name == "deleted" else "updated_at" for name in sources}
+
+    async def read(name, query_for, limit):
+        collection, projection = sources[name]
+        return await _changed(collection, query_for(fields[name]), fields[name], projection, limit)
+
+    names = list(sources)
+    pages = await asyncio.gather(
+        *(read(name, lambda field: _window(field, since, upper), page_size + 1) for name in names)
+    )
+    changes = dict(zip(names, pages))
+    watermark, has_more = upper, False
+
+    cut_at = [stamp(rows[page_size], fields[name]) for name, rows in changes.items() if len(rows) > page_size]
+    if cut_at:
+        cut = min(cut_at)
+        changes = {
+            name: [row for row in rows if stamp(row, fields[name]) < cut]
+            for name, rows in changes.items()
+        }
+        kept = [stamp(row, fields[name]) for name, rows in changes.items() for row in rows]
+        if kept:
+            watermark, has_more = max(kept), True
+        else:
+            # More than a page written at the same instant: send that instant whole.
+            at = None if cut == utc(NEVER) else cut
+            changes = dict(
+                zip(
+                    names,
+                    await asyncio.gather(
+                        *(read(name, lambda field: {field: at}, None) for name in names)
+                    ),
+                )
+            )
+            watermark, has_more = cut, True
+
+    return {"changes": changes, "watermark": watermark, "has_more": has_more, "started": started}
@@ -1,52 +1,30 @@
+import os
+
+import requests
 import streamlit as st
 import pandas as pd
 from pydantic import ValidationError
 from datetime import datetime, UTC
-from bson import ObjectId
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from models import SaudaModel, SaudaStatus, FRKBhejaModel, LotModel, BrokerModel
 
 
+API_URL = os.getenv("TESSA_API_URL", "http://localhost:8000")
+CACHE_TTL = int(os.getenv("TESSA_CACHE_TTL", 30))  # Seconds a read is reused across reruns.
+
+# Lot grid: only one page is fetched and rendered per rerun.
+LOT_PAGE_SIZES = [30, 60, 120, 240]
+LOT_GRID_FIELDS = "rice_lot_no,total_bora_count,shipped_bora_count,remaining_bora_count,is_fully_shipped,rice_deposit_centre,qtl"
+LOT_STATUS_LABELS = {
+    "All": None,
+    "Not shipped": "not_shipped",
+    "Partly shipped": "partial",
+    "Shipped": "shipped",
+}
+
 
-# ---------------- Fake Data ----------------
-initial_saudas = [
-    SaudaModel(
-        name="Rice Sale A1",
-        broker_id="BRK102",
-        party_name="Sharma Agro",
-        purchase_date=datetime(2025, 10, 1, tzinfo=UTC),
-        total_lots=3,
-        rate=4200,
-        rice_type="Basmati",
-        rice_agreement="AGR-2025-001",
-        status=SaudaStatus.IN_TRANSPORT.value,
-    ),
-    SaudaModel(
-        name="Rice Deal B5",
-        broker_id="BRK101",
-        party_name="Gupta Traders",
-        purchase_date=datetime(2025, 9, 30, tzinfo=UTC),
-        total_lots=2,
-        rate=4150,
-        rice_type="Sona Masoori",
-        rice_agreement="AGR-2025-002",
-        status=SaudaStatus.COMPLETED.value,
-    ),
-]
-
-
-
-initial_brokers = [
-    BrokerModel(broker_id="BRK101", name="Rajesh Broker"),
-    BrokerModel(broker_id="BRK102", name="Agro Link"),
-    BrokerModel(broker_id="BRK103", name="Vivek Traders"),
-]
-
-
-# Initialize session data
-if "saudas" not in st.session_state:
-    st.session_state["saudas"] = initial_saudas
-if "brokers" not in st.session_state:
-    st.session_state["brokers"] = initial_brokers
+# Initialize session data (ids and UI flags only, data comes from the API)
 if "add_sauda" not in st.session_state:
     st.session_state["add_sauda"] = False
 if "add_broker" not in st.session_state:
@@ -55,8 +33,6 @@ if "selected_sauda" not in st.session_state:
     st.session_state["selected_sauda"] = None
 if "selected_lot" not in st.session_state:
     st.session_state["selected_lot"] = None
-if "lot_data" not in st.session_state:
-    st.session_state["lot_data"] = {}
 if "edit_mode" not in st.session_state:
     st.session_state["edit_mode"] = False
 if "show_confirmation" not in st.session_state:
@@ -67,6 +43,8 @@ if "batch_edit_mode" not in st.session_state:
     st.session_state["batch_edit_mode"] = False
 if "selected_lots_for_batch" not in st.session_state:
     st.session_state["selected_lots_for_batch"] = set()
+if "lot_page" not in st.session_state:
+    st.session_state["lot_page"] = 1
 
 
 
@@ -193,20 +171,101 @@ st.markdown(
 
 
 
-# ---------------- Helper Functions ----------------
-def get_or_create_lot(sauda_name, lot_number):
-    """Get or create lot data for a specific sauda and lot number"""
-    key = f"{sauda_name}_lot_{lot_number}"
-    if key not in st.session_state["lot_data"]:
-        # Create default lot data
-        st.session_state["lot_data"][key] = LotModel(
-            sauda_id=ObjectId(),
-            rice_lot_no=f"LOT-{lot_number}",
-            qtl=100.0,
-            rice_bags_quantity=50,
-            net_rice_bought=100.0,
-        )
-    return st.session_state["lot_data"][key]
+# ---------------- API Client ----------------
+class APIError(Exception):
+    pass
+
+
+@st.cache_resource
+def api_session() -> requests.Session:
+    """One pooled HTTP session shared by every user session of this server."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(total=2, backoff_factor=0.2, allowed_methods=["GET"]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def api_request(method, path, **kwargs):
+    try:
+        response = api_session().request(method, f"{API_URL}{path}", timeout=15, **kwargs)
+    except requests.RequestException as e:
+        raise APIError(f"Backend not reachable: {e}") from e
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail") or response.json().get("message")
+        except ValueError:
+            detail = response.text
+        raise APIError(f"{response.status_code}: {detail}")
+    return response.json()
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_deals():
+    return api_request("GET", "/deals/read/all")["response"]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_brokers():
+    return api_request("GET", "/brokers/read/all")["response"]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_lot_page(deal_id, page, page_size, status=None, lot_no=None):
+    params = {"page": page, "page_size": page_size, "fields": LOT_GRID_FIELDS}
+    if status:
+        params["status"] = status
+    if lot_no:
+        params["lot_no"] = lot_no
+    return api_request("GET", f"/deals/read/{deal_id}/lot/page", params=params)["response"]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_lot(deal_id, lot_id):
+    return api_request("GET", f"/deals/read/{deal_id}/lot/{lot_id}")["response"]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_lot_shipments(deal_id, lot_id):
+    return api_request("POST", f"/deals/{deal_id}/lots/{lot_id}/shipment/read-lot")["response"]
+
+
+def create_deal(payload):
+    result = api_request("POST", "/deals/create/", json=payload)
+    fetch_deals.clear()
+    fetch_brokers.clear()  # sauda_ids changed
+    return result
+
+
+def create_broker(payload):
+    result = api_request("POST", "/brokers/create/", json=payload)
+    fetch_brokers.clear()
+    return result
+
+
+def update_lot(deal_id, lot_id, changes):
+    result = api_request(
+        "PATCH", f"/deals/update/{deal_id}/lots/{lot_id}/update", json=changes
+    )
+    fetch_lot.clear()
+    fetch_lot_page.clear()
+    return result
+
+
+def update_shipment(shipment_id, changes):
+    result = api_request(
+        "PATCH", f"/deals/lots/shipment/{shipment_id}/update", json=changes
+    )
+    fetch_lot_shipments.clear()
+    return result
+
+
+def iso(value):
+    return datetime.combine(value, datetime.min.time()).isoformat() if value else None
 
 
 
@@ -272,8 +331,14 @@ st.sidebar.caption("Sauda Management System © 2025")
 # ---------------- Sauda Page ----------------
 if page == "Sauda Deals":
     # Check if viewing a specific sauda
-    if st.session_state["selected_sauda"] is not None:
-        sauda = st.session_state["saudas"][st.session_state["selected_sauda"]]
+    try:
+        deals = {deal["public_id"]: SaudaModel(**deal) for deal in fetch_deals()}
+    except APIError as e:
+        st.error(str(e))
+        st.stop()
+
+    if st.session_state["selected_sauda"] in deals:
+        sauda = deals[st.session_state["selected_sauda"]]
 
 
         # Custom Navbar
@@ -331,9 +396,18 @@ if page == "Sauda Deals":
 
         # Check if a lot is selected
         if st.session_state["selected_lot"] is not None:
-            lot_number = st.session_state["selected_lot"]
-            lot_key = f"{sauda.name}_lot_{lot_number}"
-            lot_data = get_or_create_lot(sauda.name, lot_number)
+            lot_id = st.session_state["selected_lot"]
+            try:
+                lot_data = LotModel(**fetch_lot(sauda.public_id, lot_id))
+                lot_shipments = fetch_lot_shipments(sauda.public_id, lot_id)
+            except APIError as e:
+                st.error(str(e))
+                st.stop()
+            # FRK is recorded per shipment; the lot shows (and edits) its first
+            # FRK shipment, or its first shipment when none is marked FRK yet.
+            frk_shipment = next((s for s in lot_shipments if s.get("frk")), None)
+            frk_target = frk_shipment or next(iter(lot_shipments), None)
+            frk_bheja = (frk_shipment or {}).get("frk_bheja") or {}
 
 
             # Back to lots button
@@ -362,7 +436,7 @@ if page == "Sauda Deals":
                         st.rerun()
 
 
-            st.markdown(f"<h2 style='text-align: center;'>Lot → {lot_data.rice_lot_no or f'Lot {lot_number}'}</h2>", unsafe_allow_html=True)
+            st.markdown(f"<h2 style='text-align: center;'>Lot → {lot_data.rice_lot_no or 'Lot'}</h2>", unsafe_allow_html=True)
 
 
             # Edit button
@@ -386,35 +460,32 @@ if page == "Sauda Deals":
                 st.markdown("**FRK Details**")
 
 
-                frk = st.checkbox("FRK", value=lot_data.frk, key="edit_frk")
-
-
+                frk = False
                 frk_via = ""
                 frk_qty = 0.0
                 frk_date = None
-                
+
+                if frk_target is None:
+                    st.caption("FRK is recorded on shipments; create a shipment for this lot first.")
+                else:
+                    frk = st.checkbox("FRK", value=bool(frk_shipment), key="edit_frk")
+
                 if frk:
                     frk_col1, frk_col2 = st.columns(2)
                     frk_via = frk_col1.text_input(
-                        "FRK Via",
-                        value=lot_data.frk_bheja.get('frk_via', '') if lot_data.frk_bheja else "",
-                        key="edit_frk_via"
+                        "FRK Via", value=frk_bheja.get("frk_via") or "", key="edit_frk_via"
                     )
                     frk_qty = frk_col2.number_input(
                         "FRK Qty",
-                        value=(
-                            float(lot_data.frk_bheja.get('frk_qty', 0))
-                            if lot_data.frk_bheja
-                            else 0.0
-                        ),
+                        value=float(frk_bheja.get("frk_qty") or 0),
                         min_value=0.0,
                         key="edit_frk_qty"
                     )
                     frk_date = frk_col1.date_input(
                         "FRK Date",
                         value=(
-                            lot_data.frk_bheja.get('frk_date').date()
-                            if lot_data.frk_bheja and lot_data.frk_bheja.get('frk_date')
+                            datetime.fromisoformat(frk_bheja["frk_date"]).date()
+                            if frk_bheja.get("frk_date")
                             else None
                         ),
                         key="edit_frk_date",
@@ -499,19 +570,7 @@ if page == "Sauda Deals":
                     # Store pending changes
                     st.session_state["pending_changes"] = {
                         "rice_lot_no": rice_lot_no,
-                        "frk": frk,
-                        "frk_bheja": (
-                            {
-                                "frk_via": frk_via,
-                                "frk_qty": frk_qty,
-                                "frk_date": datetime.combine(frk_date, datetime.min.time()) if frk_date else None
-                            } if frk else None
-                        ),
-                        "rice_pass_date": (
-                            datetime.combine(rice_pass_date, datetime.min.time())
-                            if rice_pass_date
-                            else None
-                        ),
+                        "rice_pass_date": iso(rice_pass_date),
                         "rice_deposit_centre": rice_deposit_centre,
                         "qtl": qtl,
                         "rice_bags_quantity": rice_bags_quantity,
@@ -523,6 +582,20 @@ if page == "Sauda Deals":
                         "brokerage": brokerage,
                         "nett_amount": nett_amount,
                     }
+                    if frk_target is not None:
+                        st.session_state["pending_changes"]["frk_update"] = {
+                            "shipment_id": frk_target["public_id"],
+                            "changes": {
+                                "frk": frk,
+                                "frk_bheja": (
+                                    {
+                                        "frk_via": frk_via,
+                                        "frk_qty": frk_qty,
+                                        "frk_date": iso(frk_date),
+                                    } if frk else None
+                                ),
+                            },
+                        }
                     st.session_state["show_confirmation"] = True
                     st.rerun()
 
@@ -530,16 +603,13 @@ if page == "Sauda Deals":
             else:
                 # Display mode
                 st.markdown("#### FRK Details")
-                st.markdown(f"**FRK Status:** {'FRK' if lot_data.frk else 'Non FRK'}")
+                st.markdown(f"**FRK Status:** {'FRK' if frk_shipment else 'Non FRK'}")
 
 
-                if lot_data.frk and lot_data.frk_bheja:
-                    st.markdown(f"**FRK Via:** {lot_data.frk_bheja.get('frk_via', 'N/A')}")
-                    st.markdown(f"**FRK Qty:** {lot_data.frk_bheja.get('frk_qty', 0)}")
-                    frk_date_obj = lot_data.frk_bheja.get('frk_date')
-                    st.markdown(
-                        f"**FRK Date:** {frk_date_obj.strftime('%d-%m-%Y') if frk_date_obj else 'N/A'}"
-                    )
+                if frk_bheja:
+                    st.markdown(f"**FRK Via:** {frk_bheja.get('frk_via') or 'N/A'}")
+                    st.markdown(f"**FRK Qty:** {frk_bheja.get('frk_qty') or 0}")
+                    st.markdown(f"**FRK Date:** {(frk_bheja.get('frk_date') or 'N/A')[:10]}")
 
 
                 st.markdown("---")
@@ -571,7 +641,7 @@ if page == "Sauda Deals":
 
                 st.markdown("---")
                 st.caption(
-                    f"Created: {lot_data.created_at.strftime('%d-%m-%Y %H:%M')} | Updated: {lot_data.updated_at.strftime('%d-%m-%Y %H:%M')}"
+                    f"Bora: {lot_data.shipped_bora_count or 0} shipped / {lot_data.total_bora_count or 0} total"
                 )
 
 
@@ -587,16 +657,20 @@ if page == "Sauda Deals":
                         type="primary",
                         key="confirm_yes",
                     ):
-                        # Apply changes
-                        for field, value in st.session_state["pending_changes"].items():
-                            setattr(lot_data, field, value)
-                        lot_data.updated_at = datetime.now(UTC)
-                        st.session_state["lot_data"][lot_key] = lot_data
-                        st.session_state["show_confirmation"] = False
-                        st.session_state["edit_mode"] = False
-                        st.session_state["pending_changes"] = {}
-                        st.success("✓ Changes saved successfully!")
-                        st.rerun()
+                        changes = dict(st.session_state["pending_changes"])
+                        frk_update = changes.pop("frk_update", None)
+                        try:
+                            update_lot(sauda.public_id, lot_id, changes)
+                            if frk_update:
+                                update_shipment(frk_update["shipment_id"], frk_update["changes"])
+                        except APIError as e:
+                            st.error(str(e))
+                        else:
+                            st.session_state["show_confirmation"] = False
+                            st.session_state["edit_mode"] = False
+                            st.session_state["pending_changes"] = {}
+                            st.success("✓ Changes saved successfully!")
+                            st.rerun()
                 with conf_col2:
                     if st.button(
                         "✗ No, Cancel",
@@ -614,35 +688,91 @@ if page == "Sauda Deals":
 
         else:
             # Show lot selection
-            if st.session_state.get("batch_edit_mode", False):
-                st.markdown(f"#### Select Lots for Batch Edit ({sauda.total_lots} lots available)")
-                st.caption("Check the lots you want to edit together")
-                
-                # Display lot checkboxes in grid
-                cols_per_row = 6
-                for i in range(0, sauda.total_lots, cols_per_row):
-                    cols = st.columns(cols_per_row)
-                    for j in range(cols_per_row):
-                        lot_number = i + j + 1
-                        if lot_number > sauda.total_lots:
-                            break
-
-                        with cols[j]:
-                            lot_key = f"{sauda.name}_lot_{lot_number}"
-                            if lot_key in st.session_state["lot_data"]:
-                                lot_display = (
-                                    st.session_state["lot_data"][lot_key].rice_lot_no
-                                    or f"Lot {lot_number}"
-                                )
-                            else:
-                                lot_display = f"Lot {lot_number}"
-
-                            is_selected = lot_number in st.session_state["selected_lots_for_batch"]
-                            if st.checkbox(lot_display, value=is_selected, key=f"batch_lot_{lot_number}"):
-                                st.session_state["selected_lots_for_batch"].add(lot_number)
-                            else:
-                                st.session_state["selected_lots_for_batch"].discard(lot_number)
-                
+            batch_mode = st.session_state.get("batch_edit_mode", False)
+            if batch_mode:
+                st.markdown("#### Select Lots for Batch Edit")
+                st.caption("Tick the lots you want to edit together, selections are kept across pages")
+            else:
+                st.markdown("#### Lot Selection")
+                st.caption("Click on a lot row to view details")
+
+            filter_col1, filter_col2, filter_col3 = st.columns([2, 1.5, 1])
+            lot_no_filter = filter_col1.text_input(
+                "Search lot number", key="lot_no_filter", placeholder="e.g. LOT1"
+            )
+            status_filter = filter_col2.selectbox(
+                "Status", list(LOT_STATUS_LABELS), key="lot_status_filter"
+            )
+            page_size = filter_col3.selectbox(
+                "Per page", LOT_PAGE_SIZES, index=1, key="lot_page_size"
+            )
+            # New filters start again from the first page.
+            filter_state = (sauda.public_id, lot_no_filter, status_filter, page_size)
+            if st.session_state.get("lot_filter_state") != filter_state:
+                st.session_state["lot_filter_state"] = filter_state
+                st.session_state["lot_page"] = 1
+
+            try:
+                lot_page = fetch_lot_page(
+                    sauda.public_id,
+                    st.session_state["lot_page"],
+                    page_size,
+                    LOT_STATUS_LABELS[status_filter],
+                    lot_no_filter.strip() or None,
+                )
+            except APIError as e:
+                st.error(str(e))
+                st.stop()
+            lots = lot_page["items"]
+            page_count = max(1, -(-lot_page["total"] // page_size))
+
+            grid = pd.DataFrame(
+                [
+                    {
+                        "Lot No": lot.get("rice_lot_no") or "",
+                        "Total Bora": lot.get("total_bora_count") or 0,
+                        "Shipped": lot.get("shipped_bora_count") or 0,
+                        "Remaining": lot.get("remaining_bora_count") or 0,
+                        "Fully Shipped": bool(lot.get("is_fully_shipped")),
+                        "Deposit Centre": lot.get("rice_deposit_centre") or "",
+                        "Qtl": lot.get("qtl") or 0,
+                    }
+                    for lot in lots
+                ]
+            )
+            grid_key = f"lot_grid_{batch_mode}_{st.session_state['lot_page']}_{filter_state}"
+            selection = st.dataframe(
+                grid,
+                hide_index=True,
+                use_container_width=True,
+                on_select="rerun",
+                selection_mode="multi-row" if batch_mode else "single-row",
+                key=grid_key,
+            )
+            selected_rows = selection.selection.rows
+
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if st.button("← Previous", disabled=st.session_state["lot_page"] <= 1, use_container_width=True):
+                    st.session_state["lot_page"] -= 1
+                    st.rerun()
+            with page_col:
+                st.markdown(
+                    f"<p style='text-align: center;'>Page {st.session_state['lot_page']} of {page_count}"
+                    f" · {lot_page['total']} lots</p>",
+                    unsafe_allow_html=True,
+                )
+            with next_col:
+                if st.button("Next →", disabled=st.session_state["lot_page"] >= page_count, use_container_width=True):
+                    st.session_state["lot_page"] += 1
+                    st.rerun()
+
+            if batch_mode:
+                page_ids = {lot["public_id"] for lot in lots}
+                st.session_state["selected_lots_for_batch"] = (
+                    st.session_state["selected_lots_for_batch"] - page_ids
+                ) | {lots[row]["public_id"] for row in selected_rows}
+
                 st.markdown("---")
                 if len(st.session_state["selected_lots_for_batch"]) >= 2:
                     st.info(f"Selected {len(st.session_state['selected_lots_for_batch'])} lot(s) for batch edit")
@@ -652,39 +782,12 @@ if page == "Sauda Deals":
                         st.success("Batch edit functionality coming soon!")
                 else:
                     st.warning("Please select at least two lots to continue")
-            
-            else:
-                st.markdown(f"#### Lot Selection ({sauda.total_lots} lots available)")
-                st.caption("Click on a lot to view details")
-
-                # Display lot cards in grid
-                cols_per_row = 6
-                for i in range(0, sauda.total_lots, cols_per_row):
-                    cols = st.columns(cols_per_row)
-                    for j in range(cols_per_row):
-                        lot_number = i + j + 1
-                        if lot_number > sauda.total_lots:
-                            break
-
-                        with cols[j]:
-                            lot_key = f"{sauda.name}_lot_{lot_number}"
-                            # Get lot data if exists to show rice_lot_no
-                            if lot_key in st.session_state["lot_data"]:
-                                lot_display = (
-                                    st.session_state["lot_data"][lot_key].rice_lot_no
-                                    or f"Lot {lot_number}"
-                                )
-                            else:
-                                lot_display = f"Lot {lot_number}"
-
-                            if st.button(
-                                lot_display,
-                                key=f"lot_{lot_number}",
-                                use_container_width=True,
-                                type="primary",
-                            ):
-                                st.session_state["selected_lot"] = lot_number
-                                st.rerun()
+
+            elif selected_rows:
+                st.session_state["selected_lot"] = lots[selected_rows[0]]["public_id"]
+                # Forget the row selection so "Back to Lots" doesn't reopen it.
+                del st.session_state[grid_key]
+                st.rerun()
 
 
     else:
@@ -724,7 +827,11 @@ if page == "Sauda Deals":
                 st.markdown("#### Add New Sauda")
                 col1, col2 = st.columns(2)
                 name = col1.text_input("Deal Name")
-                broker_options = [broker.broker_id for broker in st.session_state["brokers"]]
+                try:
+                    broker_options = [broker["broker_id"] for broker in fetch_brokers()]
+                except APIError as e:
+                    st.error(str(e))
+                    broker_options = []
                 broker_id = col2.selectbox("Broker ID", options=broker_options)
                 party_name = col1.text_input("Party Name")
                 purchase_date = col2.date_input("Purchase Date", datetime.now(), format="DD/MM/YYYY")
@@ -732,9 +839,6 @@ if page == "Sauda Deals":
                 rate = col2.number_input("Rate ₹", min_value=0.0)
                 rice_type = col1.text_input("Rice Type")
                 rice_agreement = col2.text_input("Rice Agreement")
-                status = st.selectbox(
-                    "Status", ["INITIATE_PHASE", "Pending", "Completed", "Cancelled"]
-                )
 
 
                 submitted = st.form_submit_button(
@@ -753,13 +857,26 @@ if page == "Sauda Deals":
                             rate=rate,
                             rice_type=rice_type,
                             rice_agreement=rice_agreement,
-                            status=status,
                         )
-                        st.session_state["saudas"].append(new_sauda)
+                        create_deal(
+                            new_sauda.model_dump(
+                                mode="json",
+                                include={
+                                    "name",
+                                    "broker_id",
+                                    "party_name",
+                                    "purchase_date",
+                                    "total_lots",
+                                    "rate",
+                                    "rice_type",
+                                    "rice_agreement",
+                                },
+                            )
+                        )
                         st.success(f"✓ Sauda '{name}' added successfully!")
                         st.session_state["add_sauda"] = False
                         st.rerun()
-                    except ValidationError as e:
+                    except (ValidationError, APIError) as e:
                         st.error(str(e))
             st.markdown("</div>", unsafe_allow_html=True)
 
@@ -792,7 +909,7 @@ if page == "Sauda Deals":
 
 
         # Table rows
-        for idx, sauda in enumerate(st.session_state["saudas"]):
+        for idx, sauda in enumerate(deals.values()):
             col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([2, 1, 1.5, 1, 1, 1, 1, 0.8])
             with col1:
                 st.write(sauda.name)
@@ -809,12 +926,12 @@ if page == "Sauda Deals":
             with col7:
                 st.write(sauda.total_lots)
             with col8:
-                if st.button("View →", key=f"view_{idx}", use_container_width=True):
-                    st.session_state["selected_sauda"] = idx
+                if st.button("View →", key=f"view_{sauda.public_id}", use_container_width=True):
+                    st.session_state["selected_sauda"] = sauda.public_id
                     st.rerun()
 
 
-            if idx < len(st.session_state["saudas"]) - 1:
+            if idx < len(deals) - 1:
                 st.divider()
 
 
@@ -862,7 +979,7 @@ if page == "Brokers":
             if st.form_submit_button("✓ Submit Broker", use_container_width=True, type="primary"):
                 try:
                     new_broker = BrokerModel(broker_id=broker_id_str, name=name)
-                    st.session_state["brokers"].append(new_broker)
+                    create_broker({"broker_id": new_broker.broker_id, "name": new_broker.name})
                     st.success(f"✓ Broker '{name}' added successfully!")
                     st.session_state["add_broker"] = False
                     st.rerun()
@@ -885,16 +1002,20 @@ if page == "Brokers":
     st.divider()
     
     # Table rows
-    for idx, broker in enumerate(st.session_state["brokers"]):
+    try:
+        brokers = fetch_brokers()
+    except APIError as e:
+        st.error(str(e))
+        brokers = []
+    for idx, broker in enumerate(brokers):
         col1, col2, col3, col4 = st.columns([1, 1, 1, 2])
         with col1:
-            st.write(broker.name)
+            st.write(broker["name"])
         with col2:
-            st.write(str(broker.broker_id))
+            st.write(str(broker["broker_id"]))
         with col3:
-            # Count saudas linked to this broker
-            sauda_count = sum(1 for s in st.session_state["saudas"] if s.broker_id == broker.broker_id)
-            st.write(sauda_count)
+            # Saudas linked to this broker
+            st.write(len(broker.get("sauda_ids") or []))
         
-        if idx < len(st.session_state["brokers"]) - 1:
+        if idx < len(brokers) - 1:
             st.divider()
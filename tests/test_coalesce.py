@@ -0,0 +1,108 @@
+"""LotWriteCoalescer merges and flushes lot updates, and fans write errors out per lot.
+
+Runs against an in-memory stand-in for the lot collection.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import BulkWriteError  # noqa: E402
+
+from coalesce import LotWriteCoalescer, create_lot_writer, lot_set_update  # noqa: E402
+
+
+class FakeLots:
+    def __init__(self, failing=()):
+        self.flushes = []
+        self.failing = set(failing)
+
+    async def bulk_write(self, operations, ordered=True):
+        assert not ordered
+        self.flushes.append([(op._filter["_id"], op._doc) for op in operations])
+        errors = [
+            {"index": i, "code": 121, "errmsg": "Document failed validation"}
+            for i, op in enumerate(operations)
+            if op._filter["_id"] in self.failing
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0})
+
+
+def test_disabled_without_a_window():
+    assert create_lot_writer(FakeLots(), 0) is None
+    assert create_lot_writer(FakeLots(), 5).window == 0.005
+
+
+def test_updates_in_one_window_share_a_flush():
+    lots = FakeLots()
+
+    async def run():
+        writer = LotWriteCoalescer(lots, window=0.01)
+        await asyncio.gather(
+            writer.submit("a", {"qtl": 10, "rice_lot_no": "L-1"}),
+            writer.submit("b", {"qtl": 20}),
+            writer.submit("a", {"qtl": 11}),
+        )
+        return writer.metrics()
+
+    metrics = asyncio.run(run())
+    assert lots.flushes == [[
+        ("a", lot_set_update({"qtl": 11, "rice_lot_no": "L-1"}, False)),
+        ("b", {"$set": {"qtl": 20}}),
+    ]]
+    assert metrics["submitted"] == 3
+    assert metrics["flushes"] == 1
+    assert metrics["documents_written"] == 2
+    assert metrics["pending"] == 0
+
+
+def test_recompute_remaining_sticks_to_the_merged_update():
+    lots = FakeLots()
+
+    async def run():
+        writer = LotWriteCoalescer(lots, window=0.01)
+        await asyncio.gather(
+            writer.submit("a", {"total_bora_count": 300}, recompute_remaining=True),
+            writer.submit("a", {"qtl": 5}),
+        )
+
+    asyncio.run(run())
+    ((lot_id, update),) = lots.flushes[0]
+    assert update == lot_set_update({"total_bora_count": 300, "qtl": 5}, True)
+
+
+def test_full_batch_flushes_without_waiting():
+    lots = FakeLots()
+
+    async def run():
+        writer = LotWriteCoalescer(lots, window=60, max_batch=2)
+        await asyncio.wait_for(
+            asyncio.gather(writer.submit("a", {"qtl": 1}), writer.submit("b", {"qtl": 2})),
+            timeout=1,
+        )
+
+    asyncio.run(run())
+    assert len(lots.flushes) == 1
+
+
+def test_a_write_error_fails_only_that_lot():
+    lots = FakeLots(failing={"b"})
+
+    async def run():
+        writer = LotWriteCoalescer(lots, window=0.01)
+        return await asyncio.gather(
+            writer.submit("a", {"qtl": 1}),
+            writer.submit("b", {"qtl": 2}),
+            writer.submit("b", {"qtl": 3}),
+            writer.submit("c", {"qtl": 4}),
+            return_exceptions=True,
+        )
+
+    a, b1, b2, c = asyncio.run(run())
+    assert a is None and c is None
+    for failed in (b1, b2):
+        assert isinstance(failed, BulkWriteError)
+        assert failed.details["writeErrors"][0]["errmsg"] == "Document failed validation"
+    assert len(lots.flushes) == 1
@@ -0,0 +1,50 @@
+"""FanOut keeps at most `limit` awaitables running and returns results in input order."""
+import asyncio
+
+import pytest
+
+from fanout import DEFAULT_LIMITS, FanOut, create_fanouts
+
+
+def test_gather_is_bounded_by_the_limit():
+    fanout = FanOut("lot_update", 3)
+    running = 0
+    peak = 0
+
+    async def write(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001 * (i % 4))
+        running -= 1
+        return i
+
+    results = asyncio.run(fanout.gather(write(i) for i in range(20)))
+
+    assert results == list(range(20))
+    assert peak == 3
+    metrics = fanout.metrics()
+    assert metrics["submitted"] == metrics["completed"] == 20
+    assert metrics["in_flight"] == metrics["queued"] == 0
+    assert metrics["max_queued"] >= 20 - 3
+
+
+def test_failures_are_counted_and_raised():
+    fanout = FanOut("shipment", 2)
+
+    async def write(i):
+        if i == 1:
+            raise ValueError("duplicate key")
+        return i
+
+    with pytest.raises(ValueError):
+        asyncio.run(fanout.gather(write(i) for i in range(3)))
+    assert fanout.metrics()["failed"] == 1
+
+
+def test_limits_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("FANOUT_LIMIT_LOT_UPDATE", "64")
+    fanouts = create_fanouts()
+    assert set(fanouts) == set(DEFAULT_LIMITS)
+    assert fanouts["lot_update"].limit == 64
+    assert fanouts["shipment"].limit == DEFAULT_LIMITS["shipment"]
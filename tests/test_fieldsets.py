@@ -0,0 +1,58 @@
+"""sparse_projection turns `fields=` into a projection and rejects unknown names."""
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("fastapi")
+
+from typing import Optional  # noqa: E402
+
+from bson import ObjectId  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from pydantic import BaseModel, ConfigDict, Field  # noqa: E402
+
+from fieldsets import apply_projection, sparse_projection  # noqa: E402
+
+DEFAULT = {"_id": False, "created_at": False, "updated_at": False}
+
+
+class Lot(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: Optional[ObjectId] = Field(default=None, alias="_id")
+    public_id: str
+    rice_lot_no: str
+    qtl: float = 0
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+def test_no_fields_keeps_the_default():
+    assert sparse_projection(Lot, None, DEFAULT) is DEFAULT
+    assert sparse_projection(Lot, "", DEFAULT) is DEFAULT
+
+
+def test_requested_fields_plus_always():
+    assert sparse_projection(Lot, " qtl, rice_lot_no ,", DEFAULT, always=("public_id",)) == {
+        "_id": False,
+        "public_id": True,
+        "qtl": True,
+        "rice_lot_no": True,
+    }
+
+
+@pytest.mark.parametrize("fields", ["qtl,colour", "created_at", "_id"])
+def test_unknown_or_hidden_fields_are_a_400(fields):
+    with pytest.raises(HTTPException) as raised:
+        sparse_projection(Lot, fields, DEFAULT)
+    assert raised.value.status_code == 400
+    assert "Unknown fields" in raised.value.detail
+    assert "Valid fields: public_id, qtl, rice_lot_no" in raised.value.detail
+
+
+def test_apply_projection():
+    lot = {"public_id": "L1", "rice_lot_no": "AGR-1", "qtl": 12.5, "created_at": "x"}
+    assert apply_projection(lot, {"_id": False, "qtl": True, "public_id": True}) == {
+        "qtl": 12.5,
+        "public_id": "L1",
+    }
+    assert apply_projection(lot, DEFAULT) == {"public_id": "L1", "rice_lot_no": "AGR-1", "qtl": 12.5}
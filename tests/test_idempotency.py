@@ -0,0 +1,173 @@
+"""Idempotency-Key claims, replays, body fingerprints and stale-claim takeover.
+
+Runs against an in-memory stand-in for the idempotency collection.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pymongo")
+
+from fastapi import HTTPException  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+from idempotency import IDEMPOTENCY_LEASE, idempotent  # noqa: E402
+
+
+def matches(record: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        value = record.get(field)
+        if isinstance(condition, dict) and "$not" in condition:
+            if value is not None and value >= condition["$not"]["$gte"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeRecords:
+    """The subset of the collection API `idempotent` uses, unique on (key, scope)."""
+
+    def __init__(self):
+        self.records = []
+
+    async def insert_one(self, document):
+        if any(r["key"] == document["key"] and r["scope"] == document["scope"] for r in self.records):
+            raise DuplicateKeyError("duplicate key")
+        self.records.append(dict(document))
+
+    async def find_one(self, query):
+        return next((dict(r) for r in self.records if matches(r, query)), None)
+
+    async def update_one(self, query, update):
+        for record in self.records:
+            if matches(record, query):
+                record.update(update["$set"])
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    async def delete_one(self, query):
+        self.records = [r for r in self.records if not matches(r, query)]
+
+
+class FakeRequest:
+    def __init__(self, records, key=None, body=b'{"name": "Kharif 1"}'):
+        self.headers = {"Idempotency-Key": key} if key else {}
+        self.method = "POST"
+        self.url = SimpleNamespace(path="/deals/create/")
+        self.app = SimpleNamespace(state=SimpleNamespace(idempotency_collection=records))
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+def create_deal_route():
+    calls = []
+
+    @idempotent
+    async def create_deal(req):
+        calls.append(req)
+        return JSONResponse(content={"public_id": f"D{len(calls)}"}, status_code=201)
+
+    return create_deal, calls
+
+
+def test_retry_replays_the_stored_response():
+    records = FakeRecords()
+    route, calls = create_deal_route()
+
+    async def run():
+        first = await route(req=FakeRequest(records, "k1"))
+        retry = await route(req=FakeRequest(records, "k1"))
+        return first, retry
+
+    first, retry = asyncio.run(run())
+    assert len(calls) == 1
+    assert retry.status_code == first.status_code == 201
+    assert json.loads(retry.body) == json.loads(first.body) == {"public_id": "D1"}
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert records.records[0]["status"] == "completed"
+
+
+def test_without_a_key_every_request_runs():
+    route, calls = create_deal_route()
+
+    async def run():
+        await route(req=FakeRequest(FakeRecords()))
+        await route(req=FakeRequest(FakeRecords()))
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_key_reused_with_another_body_is_a_422():
+    records = FakeRecords()
+    route, calls = create_deal_route()
+
+    async def run():
+        await route(req=FakeRequest(records, "k1"))
+        await route(req=FakeRequest(records, "k1", body=b'{"name": "Rabi 1"}'))
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(run())
+    assert raised.value.status_code == 422
+    assert len(calls) == 1
+
+
+def fingerprint_of(body=b'{"name": "Kharif 1"}'):
+    return hashlib.sha256(body).hexdigest()
+
+
+def in_progress(records, age: float):
+    claimed_at = datetime.datetime.now(datetime.UTC) - datetime.timedelta(seconds=age)
+    records.records.append({
+        "key": "k1",
+        "scope": "POST /deals/create/",
+        "fingerprint": fingerprint_of(),
+        "status": "in_progress",
+        "created_at": claimed_at,
+        "claimed_at": claimed_at,
+    })
+
+
+def test_live_claim_is_a_409():
+    records = FakeRecords()
+    in_progress(records, age=1)
+    route, calls = create_deal_route()
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(route(req=FakeRequest(records, "k1")))
+    assert raised.value.status_code == 409
+    assert raised.value.headers == {"Retry-After": "1"}
+    assert not calls
+
+
+def test_stale_claim_is_taken_over():
+    records = FakeRecords()
+    in_progress(records, age=IDEMPOTENCY_LEASE + 5)
+    route, calls = create_deal_route()
+
+    response = asyncio.run(route(req=FakeRequest(records, "k1")))
+    assert response.status_code == 201
+    assert len(calls) == 1
+    (record,) = records.records
+    assert record["status"] == "completed"
+
+
+def test_server_errors_release_the_claim():
+    records = FakeRecords()
+
+    @idempotent
+    async def failing(req):
+        raise HTTPException(status_code=503, detail="Mongo unavailable")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(failing(req=FakeRequest(records, "k1")))
+    assert records.records == []
@@ -0,0 +1,99 @@
+"""lot_analytics (Python) and analytics_stages (Mongo) must agree on the same lots.
+
+The Mongo half needs pymongo and a server at MONGO_URL and is skipped without them.
+"""
+import datetime
+import os
+import uuid
+
+import pytest
+
+from progress import analytics_stages, lot_analytics
+
+DAY = datetime.datetime(2025, 11, 3)
+
+
+def shipment(**fields):
+    document = {
+        "sent_bora_count": 100,
+        "flap_sticker_date": None,
+        "flap_sticker_via": None,
+        "gate_pass_date": None,
+        "gate_pass_via": None,
+        "frk": False,
+        "frk_bheja": None,
+    }
+    return document | fields
+
+
+def lot(name, *shipments, total=580, shipped=0):
+    return {
+        "public_id": name,
+        "sauda_id": "S1",
+        "total_bora_count": total,
+        "shipped_bora_count": shipped,
+        "shipments": list(shipments),
+    }
+
+
+LOTS = [
+    # Everything done, FRK with the fields FRKBhejaModel stores.
+    lot(
+        "L1",
+        shipment(
+            flap_sticker_date=DAY, flap_sticker_via="B1", gate_pass_date=DAY, gate_pass_via="G",
+            frk=True, frk_bheja={"frk_via": "truck", "frk_qty": 2.5, "frk_date": DAY},
+        ),
+        shipped=580,
+    ),
+    # FRK bheja missing a key; flap sticker and gate pass keys missing altogether.
+    lot(
+        "L2",
+        {"sent_bora_count": 50, "frk": True, "frk_bheja": {"frk_via": "truck", "frk_date": DAY}},
+        shipped=50,
+    ),
+    # FRK without bheja; flap sticker only half filled.
+    lot("L3", shipment(frk=True, flap_sticker_date=DAY)),
+    # Done on a second shipment only.
+    lot("L4", shipment(), shipment(gate_pass_date=DAY, gate_pass_via="G"), total=600),
+    lot("L5"),
+]
+
+EXPECTED = {
+    "total_shipped_bora": 630,
+    "total_bora": 2920,
+    "flap_sticker_completed_lots": 1,
+    "gate_pass_completed_lots": 2,
+    "frk_enabled_lots": 3,
+    "frk_completed_lots": 1,
+}
+
+
+def test_lot_analytics():
+    assert lot_analytics(LOTS) == EXPECTED
+    assert lot_analytics([]) is None
+
+
+@pytest.fixture
+def lot_collection():
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(
+        os.getenv("MONGO_URL", "mongodb://localhost:27017/"), serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("No MongoDB server at MONGO_URL")
+    collection = client.get_database(f"test-progress-{uuid.uuid4().hex[:8]}").lot
+    try:
+        yield collection
+    finally:
+        client.drop_database(collection.database.name)
+        client.close()
+
+
+def test_pipeline_matches_lot_analytics(lot_collection):
+    lot_collection.insert_many([dict(document) for document in LOTS])
+    (group,) = lot_collection.aggregate(analytics_stages())
+    group.pop("_id")
+    assert group == lot_analytics(LOTS) == EXPECTED
@@ -0,0 +1,128 @@
+"""Rice-pass import: header aliases, day-first dates and per-row rejection.
+
+Runs against an in-memory stand-in for the lot collection.
+"""
+import asyncio
+import datetime
+import io
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("pymongo")
+
+from pydantic import BaseModel, Field  # noqa: E402
+from pymongo.errors import BulkWriteError  # noqa: E402
+
+from ricepass import (  # noqa: E402
+    UnsupportedSheet,
+    _records,
+    import_rice_pass,
+    normalise_header,
+    read_sheet,
+)
+
+
+class Delivery(BaseModel):
+    rice_lot_no: str
+    rice_pass_date: datetime.datetime = None
+    rice_deposit_centre: str = None
+    qtl: float = Field(default=0, ge=0)
+    rice_bags_quantity: int = Field(default=0, ge=0)
+
+
+class FakeLots:
+    def __init__(self, lots, failing=()):
+        self.lots = lots
+        self.failing = set(failing)
+        self.writes = []
+
+    async def find(self, query, projection=None):
+        for lot in self.lots:
+            if lot["rice_lot_no"] in query["rice_lot_no"]["$in"]:
+                yield lot
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append([(op._filter["_id"], op._doc["$set"]) for op in operations])
+        errors = [
+            {"index": i, "errmsg": "Document failed validation"}
+            for i, op in enumerate(operations)
+            if op._filter["_id"] in self.failing
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0})
+
+
+def csv_file(text: str):
+    return io.BytesIO(text.encode("utf-8-sig"))
+
+
+def test_headers_and_day_first_dates():
+    sheet = csv_file(
+        "Lot No.,Pass Date,Deposit Center,Quintal,No of Bags,Remarks\n"
+        "AGR-1,03/04/2025,Raipur,290.5,580,\n"
+        ",,,,,\n"
+        "AGR-2,15.11.2025,,,,late\n"
+    )
+    assert list(read_sheet(sheet, "pass.CSV")) == [
+        (2, {
+            "rice_lot_no": "AGR-1",
+            "rice_pass_date": datetime.datetime(2025, 4, 3),
+            "rice_deposit_centre": "Raipur",
+            "qtl": "290.5",
+            "rice_bags_quantity": "580",
+        }),
+        (4, {
+            "rice_lot_no": "AGR-2",
+            "rice_pass_date": datetime.datetime(2025, 11, 15),
+            "remarks": "late",
+        }),
+    ]
+
+
+def test_numeric_lot_numbers_from_spreadsheets():
+    assert normalise_header("  Rice Lot  Number ") == "rice_lot_no"
+    rows = [(1234.0, 12), (12.5, 1)]
+    assert [record for _, record in _records(["Lot No", "Bags"], rows, 2)] == [
+        {"rice_lot_no": "1234", "rice_bags_quantity": 12},
+        {"rice_lot_no": "12.5", "rice_bags_quantity": 1},
+    ]
+
+
+def test_other_uploads_are_refused():
+    with pytest.raises(UnsupportedSheet):
+        list(read_sheet(io.BytesIO(b""), "pass.pdf"))
+
+
+def test_bad_rows_are_reported_and_good_rows_written():
+    lots = FakeLots([
+        {"_id": 1, "public_id": "L1", "sauda_id": "D1", "rice_lot_no": "AGR-1"},
+        {"_id": 2, "public_id": "L2", "sauda_id": "D1", "rice_lot_no": "AGR-2"},
+        {"_id": 3, "public_id": "L3", "sauda_id": "D2", "rice_lot_no": "AGR-3"},
+        {"_id": 4, "public_id": "L4", "sauda_id": "D2", "rice_lot_no": "AGR-3"},
+        {"_id": 5, "public_id": "L5", "sauda_id": "D2", "rice_lot_no": "AGR-5"},
+    ], failing={5})
+    sheet = csv_file(
+        "Lot No,Quintal,Bags\n"
+        "AGR-1,290,580\n"
+        "AGR-2,-4,580\n"
+        "AGR-3,100,200\n"
+        "AGR-9,100,200\n"
+        "AGR-5,100,200\n"
+    )
+    report = asyncio.run(import_rice_pass(sheet, "pass.csv", Delivery, lots, chunk_size=2))
+
+    assert report.rows == 5
+    assert report.updated == 1
+    assert report.lots_by_deal == {"D1": ["L1"]}
+    assert {(e["row"], e["rice_lot_no"]) for e in report.errors} == {
+        (3, "AGR-2"), (4, "AGR-3"), (5, "AGR-9"), (6, "AGR-5"),
+    }
+    messages = {e["row"]: e["errors"] for e in report.errors}
+    assert messages[3][0].startswith("qtl: ")
+    assert messages[4] == ["Lot number is not unique."]
+    assert messages[5] == ["Lot not found."]
+    assert messages[6] == ["Document failed validation"]
+    assert [[lot_id for lot_id, _ in write] for write in lots.writes] == [[1], [5]]
+    assert lots.writes[0][0][1]["qtl"] == 290 and lots.writes[0][0][1]["is_fully_shipped"]
+    assert report.as_dict()["failed"] == 4
@@ -0,0 +1,99 @@
+"""Prefix search is case-insensitive through the lower-cased `search` copies.
+
+The Mongo test needs pymongo and a server at MONGO_URL and is skipped without them.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from search import _prefix, search, search_keys, with_search_keys  # noqa: E402
+
+
+def test_search_copies_are_lower_cased():
+    deal = {"name": "Kharif Lot A", "party_name": "Sharma Agro", "rice_agreement": None}
+    assert with_search_keys("deal", deal)["search"] == {
+        "name": "kharif lot a",
+        "party_name": "sharma agro",
+    }
+    assert search_keys("lot", {"rice_lot_no": "AGR-25-L7", "qtl": 290}) == {
+        "search.rice_lot_no": "agr-25-l7"
+    }
+
+
+def test_prefix_is_anchored_and_lower_cased():
+    assert _prefix("party_name", "ShA.") == {"search.party_name": {"$regex": r"^sha\."}}
+
+
+@pytest.fixture
+def mongo_url():
+    pymongo = pytest.importorskip("pymongo")
+    url = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
+    client = pymongo.MongoClient(url, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("No MongoDB server at MONGO_URL")
+    finally:
+        client.close()
+    return url
+
+
+def test_mixed_case_prefix_finds_party(mongo_url):
+    from pymongo import AsyncMongoClient
+
+    from indexes import ensure_indexes
+
+    async def run():
+        client = AsyncMongoClient(mongo_url)
+        db = client.get_database(f"test-search-{uuid.uuid4().hex[:8]}")
+        try:
+            await ensure_indexes(db)
+            await db.deal.insert_many([
+                with_search_keys("deal", {
+                    "public_id": "D1", "name": "Kharif 1", "party_name": "Sharma Agro",
+                    "rice_agreement": "AGR-1", "status": "Initialized",
+                }),
+                with_search_keys("deal", {
+                    "public_id": "D2", "name": "Kharif 2", "party_name": "Verma Traders",
+                    "rice_agreement": "AGR-2", "status": "Initialized",
+                }),
+            ])
+            return await search(db, "sHA", ["deal"])
+        finally:
+            await client.drop_database(db.name)
+            await client.close()
+
+    hits = asyncio.run(run())
+    assert [hit["public_id"] for hit in hits] == ["D1"]
+    assert "search" not in hits[0]
+
+
+def test_lots_of_deleting_deals_are_hidden(mongo_url):
+    from pymongo import AsyncMongoClient
+
+    from indexes import ensure_indexes
+
+    async def run():
+        client = AsyncMongoClient(mongo_url)
+        db = client.get_database(f"test-search-{uuid.uuid4().hex[:8]}")
+        try:
+            await ensure_indexes(db)
+            await db.deal.insert_many([
+                {"public_id": "D1", "status": "Initialized"},
+                {"public_id": "D2", "status": "Deleting"},
+            ])
+            await db.lot.insert_many([
+                with_search_keys("lot", {"public_id": "L1", "sauda_id": "D1", "rice_lot_no": "AGR-1"}),
+                with_search_keys("lot", {"public_id": "L2", "sauda_id": "D2", "rice_lot_no": "AGR-2"}),
+            ])
+            return await search(db, "agr", ["lot"])
+        finally:
+            await client.drop_database(db.name)
+            await client.close()
+
+    hits = asyncio.run(run())
+    assert [hit["public_id"] for hit in hits] == ["L1"]
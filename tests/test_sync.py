@@ -0,0 +1,135 @@
+"""changes_since paging, the consistent cut, the `started` marker and expiry.
+
+Runs against in-memory stand-ins for the synced collections.
+"""
+import asyncio
+import datetime
+
+import sync
+from sync import NEVER, changes_since, expired, stamp
+
+HOUR_AGO = datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=1)
+
+
+def at(minutes: int) -> datetime.datetime:
+    return HOUR_AGO + datetime.timedelta(minutes=minutes)
+
+
+def matches(value, condition) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    if "$not" in condition:
+        return not matches(value, condition["$not"])
+    if value is None:
+        return False
+    return all(
+        {"$gt": value > bound, "$lte": value <= bound}[operator]
+        for operator, bound in condition.items()
+    )
+
+
+class FakeCursor:
+    def __init__(self, rows, hidden):
+        self.rows = rows
+        self.hidden = hidden
+
+    def sort(self, keys):
+        ((field, _), _) = keys
+        self.rows.sort(key=lambda row: (stamp(row, field), row["_id"]))
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    async def to_list(self):
+        return [{k: v for k, v in row.items() if k not in self.hidden} for row in self.rows]
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def find(self, query, projection=None):
+        ((field, condition),) = query.items()
+        hidden = {k for k, shown in (projection or {}).items() if not shown}
+        return FakeCursor(
+            [row for row in self.rows if matches(row.get(field), condition)], hidden
+        )
+
+
+def lots(*minutes):
+    return [{"_id": i, "public_id": f"L{i}", "updated_at": at(m)} for i, m in enumerate(minutes)]
+
+
+def sync_once(sources, since=None, started=None, page_size=2, tombstones=()):
+    sources = {name: (FakeCollection(rows), {"_id": False}) for name, rows in sources.items()}
+    return asyncio.run(
+        changes_since(sources, FakeCollection(list(tombstones)), since, page_size, started)
+    )
+
+
+def ids(result, name="lot"):
+    return [row["public_id"] for row in result["changes"][name]]
+
+
+def test_full_sync_includes_legacy_rows():
+    legacy = {"_id": 9, "public_id": "L9"}
+    result = sync_once({"lot": lots(1, 2) + [legacy]}, page_size=10)
+    assert ids(result) == ["L9", "L0", "L1"]
+    assert not result["has_more"]
+    assert result["started"] == result["watermark"]
+
+
+def test_pages_resume_from_the_watermark():
+    rows = lots(1, 2, 3, 4, 5)
+    first = sync_once({"lot": rows})
+    assert ids(first) == ["L0", "L1"]
+    assert first["has_more"] and first["watermark"] == at(2)
+
+    second = sync_once({"lot": rows}, since=first["watermark"], started=first["started"])
+    assert ids(second) == ["L2", "L3"]
+    assert second["started"] == first["started"]
+
+    third = sync_once({"lot": rows}, since=second["watermark"], started=second["started"])
+    assert ids(third) == ["L4"]
+    assert not third["has_more"]
+
+
+def test_every_collection_is_cut_at_the_same_time():
+    deals = [{"_id": i, "public_id": f"D{i}", "updated_at": at(m)} for i, m in enumerate((1, 2, 3))]
+    tombstones = [
+        {"_id": i, "public_id": f"S{i}", "deleted_at": at(m)} for i, m in enumerate((2, 3))
+    ]
+    result = sync_once({"lot": lots(1, 4), "deal": deals}, tombstones=tombstones)
+    # The deals page ends before minute 3, so nothing from minute 3 on is sent yet.
+    assert ids(result, "deal") == ["D0", "D1"]
+    assert ids(result) == ["L0"]
+    assert ids(result, "deleted") == ["S0"]
+    assert result["watermark"] == at(2) and result["has_more"]
+
+
+def test_more_than_a_page_at_one_instant_comes_whole():
+    result = sync_once({"lot": lots(1, 1, 1, 2)})
+    assert ids(result) == ["L0", "L1", "L2"]
+    assert result["watermark"] == at(1) and result["has_more"]
+
+
+def test_more_than_a_page_of_legacy_rows_comes_whole():
+    legacy = [{"_id": 10 + i, "public_id": f"X{i}"} for i in range(3)]
+    result = sync_once({"lot": legacy + lots(1)})
+    assert ids(result) == ["X0", "X1", "X2"]
+    assert result["watermark"] == stamp({}, "updated_at") and result["has_more"]
+
+
+def test_expiry_follows_the_pass_start(monkeypatch):
+    monkeypatch.setattr(sync, "TOMBSTONE_TTL", 24 * 60 * 60)
+    old = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=2)
+    recent = datetime.datetime.now(datetime.UTC) - datetime.timedelta(minutes=5)
+    assert not expired(None, None)
+    assert not expired(recent, None)
+    assert expired(old, None)
+    # A paged pass resumed from an old watermark is still checked from its start.
+    assert expired(recent, old)
+    # Legacy rows put the watermark at NEVER; the pass start keeps it servable.
+    assert not expired(NEVER, recent)